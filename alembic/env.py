@@ -1,6 +1,6 @@
 from logging.config import fileConfig
 from app.core.database import Base
-from app.models import Word, UserWord
+from app.models import Word, UserWord, ParseJob, UrlCacheEntry
 
 from sqlalchemy import engine_from_config
 from sqlalchemy import pool
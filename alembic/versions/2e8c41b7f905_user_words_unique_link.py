@@ -0,0 +1,38 @@
+"""user_words unique link
+
+Revision ID: 2e8c41b7f905
+Revises: 9b47e0d2a6f1
+Create Date: 2026-10-18 11:48:52.661390
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '2e8c41b7f905'
+down_revision: Union[str, Sequence[str], None] = '9b47e0d2a6f1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Дубликаты могли появиться из-за гонок в старом коде: оставляем самую раннюю связь
+    op.execute(
+        """
+        DELETE FROM user_words a
+        USING user_words b
+        WHERE a.user_id = b.user_id
+          AND a.word_id = b.word_id
+          AND a.id > b.id
+        """
+    )
+    op.create_unique_constraint('uq_user_words_user_word', 'user_words', ['user_id', 'word_id'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_constraint('uq_user_words_user_word', 'user_words', type_='unique')
@@ -0,0 +1,51 @@
+"""parse jobs
+
+Revision ID: 5d2f8a61c3e4
+Revises: c56ccf7284b8
+Create Date: 2026-10-18 10:12:41.503217
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5d2f8a61c3e4'
+down_revision: Union[str, Sequence[str], None] = 'c56ccf7284b8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+ACTIVE_URL_JOB = sa.text("status IN ('queued', 'running') AND url IS NOT NULL")
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('parse_jobs',
+    sa.Column('id', sa.String(length=32), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('url', sa.String(), nullable=True),
+    sa.Column('status', sa.String(), nullable=False),
+    sa.Column('stage', sa.String(), nullable=True),
+    sa.Column('progress', sa.Float(), nullable=False),
+    sa.Column('result', sa.JSON(), nullable=True),
+    sa.Column('error', sa.String(), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('idx_parse_jobs_user_url_status', 'parse_jobs', ['user_id', 'url', 'status'], unique=False)
+    op.create_index(
+        'uq_parse_jobs_active_url', 'parse_jobs', ['user_id', 'url'], unique=True,
+        postgresql_where=ACTIVE_URL_JOB, sqlite_where=ACTIVE_URL_JOB,
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('uq_parse_jobs_active_url', table_name='parse_jobs')
+    op.drop_index('idx_parse_jobs_user_url_status', table_name='parse_jobs')
+    op.drop_table('parse_jobs')
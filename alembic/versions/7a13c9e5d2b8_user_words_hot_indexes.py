@@ -0,0 +1,40 @@
+"""user_words hot query index
+
+Revision ID: 7a13c9e5d2b8
+Revises: 2e8c41b7f905
+Create Date: 2026-10-18 12:21:06.918342
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7a13c9e5d2b8'
+down_revision: Union[str, Sequence[str], None] = '2e8c41b7f905'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# (user_id, word_id) уже покрыт уникальным ограничением uq_user_words_user_word.
+# Индекс строится CONCURRENTLY, чтобы не блокировать запись в большую таблицу.
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'idx_user_words_user_score', 'user_words', ['user_id', 'score'],
+            unique=False, postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            'idx_user_words_user_score', table_name='user_words',
+            postgresql_concurrently=True,
+        )
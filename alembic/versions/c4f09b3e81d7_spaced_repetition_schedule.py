@@ -0,0 +1,64 @@
+"""spaced repetition schedule
+
+Revision ID: c4f09b3e81d7
+Revises: 7a13c9e5d2b8
+Create Date: 2026-10-18 13:05:44.120583
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c4f09b3e81d7'
+down_revision: Union[str, Sequence[str], None] = '7a13c9e5d2b8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# Выборка сессии фильтрует score < 7 и идет по due_at. Выученные слова
+# сохраняют старый due_at (при переносе схемы всем проставлен now(), "remove"
+# его не двигает), поэтому индекс частичный и содержит только активные
+# карточки: иначе скан проходил бы все выученные слова пользователя прежде,
+# чем найдет активные.
+ACTIVE_CARD = sa.text("score < 7")
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('user_words', sa.Column('due_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False))
+    op.add_column('user_words', sa.Column('interval_days', sa.Float(), server_default='0', nullable=False))
+    op.add_column('user_words', sa.Column('ease', sa.Float(), server_default='2.5', nullable=False))
+    op.add_column('user_words', sa.Column('repetitions', sa.Integer(), server_default='0', nullable=False))
+    # Индекс по due_at заменяет (user_id, score) из 7a13c9e5d2b8: с ним
+    # планировщик фильтровал по score и сортировал все активные слова
+    # пользователя вместо чтения первых строк по due_at.
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'idx_user_words_user_due_active', 'user_words', ['user_id', 'due_at'],
+            unique=False, postgresql_concurrently=True,
+            postgresql_where=ACTIVE_CARD, sqlite_where=ACTIVE_CARD,
+        )
+        op.drop_index(
+            'idx_user_words_user_score', table_name='user_words',
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'idx_user_words_user_score', 'user_words', ['user_id', 'score'],
+            unique=False, postgresql_concurrently=True,
+        )
+        op.drop_index(
+            'idx_user_words_user_due_active', table_name='user_words',
+            postgresql_concurrently=True,
+        )
+    op.drop_column('user_words', 'repetitions')
+    op.drop_column('user_words', 'ease')
+    op.drop_column('user_words', 'interval_days')
+    op.drop_column('user_words', 'due_at')
@@ -1,24 +1,57 @@
-from fastapi import APIRouter, HTTPException, Depends, Form, Request
-from fastapi.responses import RedirectResponse
+import io
+from fastapi import APIRouter, HTTPException, Depends, File, Form, Query, Request, UploadFile
+from fastapi.responses import JSONResponse, PlainTextResponse, RedirectResponse, StreamingResponse
 from fastapi.templating import Jinja2Templates
 from typing import Optional
+from sqlalchemy.orm import Session
 from app.core.auth import get_current_user
+from app.core.concurrency import run_blocking, run_db
+from app.core.config import settings
+from app.core.metrics import registry
 from app.services.parser import TextParser
 from app.services.translator import TranslationService
 from app.services.learning import LearningService
-from app.services.users import get_or_create_user
-from app.models.word import Word
-from app.models.user_word import UserWord
-from app.core.database import get_db
-from sqlalchemy.orm import Session
+from app.services.parse_pipeline import ParsePipeline
+from app.services.jobs import ParseJobService
+from app.services.url_cache import UrlCache
+from app.services.word_ranks import WordRanks
+from app.services.vocabulary import (
+        EXPORT_FORMATS,
+        count_user_words,
+        delete_user_word,
+        edit_translation,
+        get_words_page,
+        import_words_file,
+        iter_words_export,
+        set_word_score,
+        )
+from app.services.users import get_or_create_user_id
+from app.schemas.learning import LearningStats, ReviewBatch, ReviewResult
+from app.core.database import DBSession, get_db
 
 
 router = APIRouter()
 templates = Jinja2Templates(directory="app/static/html")
 
-parser = TextParser()
+word_ranks = WordRanks.load(settings.word_ranks_path)
+parser = TextParser(word_ranks)
 translator = TranslationService()
 learning_service = LearningService()
+url_cache = UrlCache(settings.url_cache_max_entries) if settings.url_cache_enabled else None
+pipeline = ParsePipeline(
+        parser,
+        translator,
+        url_cache,
+        ranks=word_ranks,
+        skip_top=settings.parse_skip_top_words,
+        max_new_words=settings.parse_max_new_words or None,
+        )
+parse_jobs = ParseJobService(pipeline, workers=settings.parse_job_workers)
+
+registry.register_stats("translation_cache", "Кэш переводов", translator.cache_stats)
+registry.register_stats("translation_pending", "Очередь отложенных переводов", translator.pending.stats)
+if url_cache is not None:
+    registry.register_stats("url_cache", "Кэш слов страниц", url_cache.stats)
 
 
 @router.get("/")
@@ -28,72 +61,71 @@ async def index_page(request: Request):
             name="index.html"
             )
 
+@router.get("/metrics")
+async def metrics():
+    """Метрики в текстовом формате Prometheus"""
+    return PlainTextResponse(
+            registry.render(),
+            media_type="text/plain; version=0.0.4; charset=utf-8",
+            )
+
 @router.post("/parse")
 async def parse_content(
     request: Request,
     url: Optional[str] = Form(None), 
     text: Optional[str] = Form(None), 
-    db: Session = Depends(get_db),
+    background: bool = Form(False),
+    db: DBSession = Depends(get_db),
     current_user: dict = Depends(get_current_user),
 ):
     """Парсит текст/URL, добавляет новые слова в базу, показывает результат"""
     if not url and not text:
         raise HTTPException(status_code=400, detail="Нужно указать URL или текст")
 
-    try:
-        if url:
-            if not url.startswith(('http://', 'https://')):
-                url = 'http://' + url
-            words = parser.parser_url(url)
-            source_message = f"URL: {url}"
-        else:
-            words = parser.extract_words(text)
-            source_message = "введенного текста"
-
-        translations = translator.translate_words(words, db)
-        
-        db_user = get_or_create_user(db, current_user)
-
-        added_word_ids = (
-                db.query(Word.id)
-                .filter(Word.word.in_(words))
-                .all()
+    if background:
+        job = await parse_jobs.submit(db, current_user, url=url, text=text)
+        return JSONResponse(
+                status_code=202,
+                content={"job_id": job.id, "status": job.status},
                 )
 
-        for (word_id,) in added_word_ids:
-            existing = db.query(UserWord).filter(
-                    UserWord.user_id == db_user.id,
-                    UserWord.word_id == word_id
-                    ).first()
-            if not existing:
-                db.add(UserWord(user_id=db_user.id, word_id=word_id, score=0.0))
-
-        db.commit()
+    try:
+        result = await pipeline.run(db, current_user, url=url, text=text)
 
         return templates.TemplateResponse(
                 request=request,
                 name="results.html",
-                context={
-                    "source_message": source_message,
-                    "translations": translations,
-                    "total_count": len(words),
-                    }
+                context=result,
                 )
-        
+
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Ошибка парсинга: {str(e)}")
 
 
+@router.get("/parse/jobs/{job_id}")
+async def parse_job_status(
+        job_id: str,
+        db: DBSession = Depends(get_db),
+        current_user: dict = Depends(get_current_user),):
+    """Статус и результат фонового парсинга"""
+    job = await run_db(db, parse_jobs.get_job, current_user, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Задача не найдена")
+    return job
+
+
 @router.get("/study")
 async def study_page(
         request: Request, 
-        db: Session = Depends(get_db),
+        db: DBSession = Depends(get_db),
         current_user: dict = Depends(get_current_user),):
     """Страница обучения с карточками"""
 
-    db_user = get_or_create_user(db, current_user)
+    def session(db: Session) -> list:
+        user_id = get_or_create_user_id(db, current_user)
+        return learning_service.get_study_session(db, user_id)
 
-    cards = learning_service.get_study_session(db, db_user.id)
+    cards = await run_db(db, session)
     
     if not cards:
         return templates.TemplateResponse(
@@ -116,77 +148,152 @@ async def study_page(
             )
 
 
+@router.get("/stats", response_model=LearningStats)
+async def learning_stats(
+        db: DBSession = Depends(get_db),
+        current_user: dict = Depends(get_current_user),):
+    """Статистика изучения текущего пользователя"""
+    def stats(db: Session) -> dict:
+        user_id = get_or_create_user_id(db, current_user)
+        return learning_service.get_learning_stats(db, user_id)
+
+    return await run_db(db, stats)
+
+
 @router.post("/study/progress/{word_id}")
 async def update_word_progress(
     word_id: int,
     action: str = Form(...),
-    db: Session = Depends(get_db),
+    db: DBSession = Depends(get_db),
     current_user: dict = Depends(get_current_user),
 ):
     """Обновляет прогресс изучения слова"""
     if action not in ["know", "dont_know", "remove"]:
         raise HTTPException(status_code=400, detail="Неизвестное действие")
     
+    def update(db: Session) -> None:
+        user_id = get_or_create_user_id(db, current_user)
+        learning_service.update_progress(db, user_id, word_id, action)
+
     try:
-        db_user = get_or_create_user(db, current_user)
-        learning_service.update_progress(db, db_user.id, word_id, action)
+        await run_db(db, update)
         return RedirectResponse(url="/study", status_code=303)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Ошибка обновления: {str(e)}")
 
 
+@router.post("/study/review", response_model=ReviewResult)
+async def submit_review(
+    batch: ReviewBatch,
+    db: DBSession = Depends(get_db),
+    current_user: dict = Depends(get_current_user),
+):
+    """Принимает ответы всей сессии и возвращает следующую сессию"""
+    if any(answer.action not in learning_service.actions for answer in batch.answers):
+        raise HTTPException(status_code=400, detail="Неизвестное действие")
+
+    def review(db: Session) -> dict:
+        user_id = get_or_create_user_id(db, current_user)
+        results = learning_service.apply_reviews(
+                db,
+                user_id,
+                [(answer.word_id, answer.action) for answer in batch.answers],
+                )
+        cards = learning_service.get_study_session(db, user_id)
+        return {
+                "results": results,
+                "session": {"cards": cards, "count": len(cards)},
+                }
+
+    try:
+        return await run_db(db, review)
+    except Exception as e:
+        await run_db(db, Session.rollback)
+        raise HTTPException(status_code=500, detail=f"Ошибка обновления: {str(e)}")
+
+
 @router.get("/words")
 async def words_page(
         request: Request,
-        db: Session = Depends(get_db),
+        after: Optional[str] = None,
+        limit: int = Query(settings.words_page_size, ge=1, le=500),
+        db: DBSession = Depends(get_db),
         current_user: dict = Depends(get_current_user),):
-    """Страница управления всеми словами"""
-    db_user = get_or_create_user(db, current_user)
-    words_with_scores = (
-            db.query(Word, UserWord.score)
-            .outerjoin(
-                UserWord,
-                (UserWord.word_id == Word.id) & (UserWord.user_id == db_user.id),
-                )
-            .order_by(Word.word)
-            .all()
-            )
-    
-    words_data = []
-    for word, score in words_with_scores:
-        words_data.append({
-            'id': word.id,
-            'word': word.word,
-            'translation': word.translation,
-            'score': score if score is not None else 0.0
-        })
-    
+    """Страница управления словами пользователя"""
+    def load(db: Session) -> tuple:
+        user_id = get_or_create_user_id(db, current_user)
+        page = get_words_page(db, user_id, after=after, limit=limit)
+        return page, count_user_words(db, user_id)
+
+    page, total_words = await run_db(db, load)
+
     return templates.TemplateResponse(
             request=request,
             name="words.html",
             context={
-        "words": words_data,
-        "total_words": len(words_data)
+        "words": page["words"],
+        "next_after": page["next_after"],
+        "after": after,
+        "limit": limit,
+        "total_words": total_words,
     })
 
 
+@router.get("/words/export")
+async def export_words(
+        format: str = Query("csv"),
+        db: DBSession = Depends(get_db),
+        current_user: dict = Depends(get_current_user),):
+    """Выгружает слова пользователя потоком: CSV или TSV для Anki"""
+    if format not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail="Неизвестный формат")
+    user_id = await run_db(db, get_or_create_user_id, current_user)
+    if format == "anki":
+        media_type, filename = "text/tab-separated-values; charset=utf-8", "words.txt"
+    else:
+        media_type, filename = "text/csv; charset=utf-8", "words.csv"
+    return StreamingResponse(
+            iter_words_export(user_id, format),
+            media_type=media_type,
+            headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+            )
+
+
+@router.post("/words/import")
+async def import_words(
+        file: UploadFile = File(...),
+        format: str = Form("csv"),
+        db: DBSession = Depends(get_db),
+        current_user: dict = Depends(get_current_user),):
+    """Импортирует слова из CSV или TSV Anki и добавляет их пользователю
+
+    Существующие переводы общего словаря не перезаписываются.
+    """
+    if format not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail="Неизвестный формат")
+    user_id = await run_db(db, get_or_create_user_id, current_user)
+    source = io.TextIOWrapper(file.file, encoding="utf-8-sig", errors="replace", newline="")
+    try:
+        result = await run_blocking(import_words_file, source, format, user_id)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Ошибка импорта: {str(e)}")
+    finally:
+        source.detach()
+    return result
+
+
 @router.post("/words/{word_id}/delete")
 async def delete_word(
         word_id: int,
-        db: Session = Depends(get_db),
+        db: DBSession = Depends(get_db),
         current_user: dict = Depends(get_current_user),):
     """Удаляет слово из базы"""
-    try:
-        db_user = get_or_create_user(db, current_user)
-        user_word = (
-        db.query(UserWord)
-        .filter(UserWord.user_id == db_user.id, UserWord.word_id == word_id)
-        .first()
-        )
-        if user_word:
-            db.delete(user_word)
-            db.commit()
+    def delete(db: Session) -> None:
+        user_id = get_or_create_user_id(db, current_user)
+        delete_user_word(db, user_id, word_id)
 
+    try:
+        await run_db(db, delete)
         return RedirectResponse(url="/words", status_code=303)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Ошибка удаления: {str(e)}")
@@ -196,22 +303,18 @@ async def delete_word(
 async def edit_word(
     word_id: int,
     translation: str = Form(...),
-    db: Session = Depends(get_db),
+    db: DBSession = Depends(get_db),
     current_user: dict = Depends(get_current_user),
 ):
     """Редактирует перевод слова"""
+    def edit(db: Session) -> Optional[str]:
+        user_id = get_or_create_user_id(db, current_user)
+        return edit_translation(db, user_id, word_id, translation)
+
     try:
-        db_user = get_or_create_user(db, current_user)
-        word = (
-                db.query(Word)
-                .join(UserWord, UserWord.word_id == Word.id)
-                .filter(UserWord.user_id == db_user.id,
-                        Word.id == word_id)
-                .first()
-                )
+        word = await run_db(db, edit)
         if word:
-            word.translation = translation.strip()
-            db.commit()
+            translator.invalidate(word)
         return RedirectResponse(url="/words", status_code=303)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Ошибка редактирования: {str(e)}")
@@ -221,29 +324,19 @@ async def edit_word(
 async def update_word_score(
     word_id: int,
     score: float = Form(...),
-    db: Session = Depends(get_db),
+    db: DBSession = Depends(get_db),
     current_user: dict = Depends(get_current_user),
 ):
     """Обновляет рейтинг слова"""
+    def update(db: Session) -> None:
+        user_id = get_or_create_user_id(db, current_user)
+        set_word_score(db, user_id, word_id, score)
+
     try:
-        db_user = get_or_create_user(db, current_user)
-        user_word = (
-                db.query(UserWord)
-                .filter(UserWord.user_id == db_user.id, 
-                        UserWord.word_id == word_id)
-                .first()
-                )
-        
-        if not user_word:
-            user_word = UserWord(user_id=db_user.id, word_id=word_id, score=0.0)
-            db.add(user_word)
-         
-        user_word.score = float(score)
-        db.commit()
-        
+        await run_db(db, update)
         return RedirectResponse(url="/words", status_code=303)
-        
+
     except Exception as e:
-        db.rollback()
+        await run_db(db, Session.rollback)
         raise HTTPException(status_code=500, detail=f"Ошибка обновления рейтинга: {str(e)}")
 
@@ -0,0 +1,97 @@
+import argparse
+import csv
+import sys
+
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.services.users import get_or_create_user_id
+from app.services.vocabulary import EXPORT_FORMATS, export_words_to_file, import_words_file
+from app.services.translation_backends import LocalDictionaryBackend
+from app.services.word_extraction import WordExtractor, create_lemmatizer
+from app.services.word_ranks import WordRanks, read_frequency_rows
+
+
+def build_dictionary(args: argparse.Namespace) -> None:
+    """Собирает офлайн-словарь из TSV: слово<TAB>перевод"""
+    with open(args.source, encoding="utf-8", newline="") as f:
+        reader = csv.reader(f, delimiter="\t")
+        rows = ((row[0], row[1]) for row in reader if len(row) >= 2 and row[0] and row[1])
+        count = LocalDictionaryBackend.build(args.output, rows)
+    print(f"Словарь {args.output}: {count} слов")
+
+
+def build_word_ranks(args: argparse.Namespace) -> None:
+    """Собирает файл частотных рангов из TSV слово<TAB>частота или списка слов"""
+    extractor = WordExtractor(
+            lemmatizer=create_lemmatizer(settings.word_lemmatizer, settings.translation_source_lang),
+            stop_words=settings.word_stop_words,
+            min_length=settings.word_min_length,
+            )
+    count = WordRanks.build(args.output, read_frequency_rows(args.source), extractor)
+    print(f"Ранги {args.output}: {count} слов")
+
+
+def _user_id(kc_sub: str | None) -> int | None:
+    if kc_sub is None:
+        return None
+    db = SessionLocal()
+    try:
+        return get_or_create_user_id(db, {"sub": kc_sub, "username": kc_sub})
+    finally:
+        db.close()
+
+
+def import_vocabulary(args: argparse.Namespace) -> None:
+    """Импортирует слова из CSV или TSV Anki, при --user добавляет их пользователю"""
+    with open(args.source, encoding="utf-8-sig", newline="") as f:
+        result = import_words_file(f, args.format, _user_id(args.user), overwrite=args.overwrite)
+    print(
+        f"Строк: {result['rows']}, записано слов: {result['words_written']}, "
+        f"привязано к пользователю: {result['linked']}"
+    )
+
+
+def export_vocabulary(args: argparse.Namespace) -> None:
+    """Выгружает весь словарь или слова пользователя (--user)"""
+    db = SessionLocal()
+    try:
+        with open(args.output, "w", encoding="utf-8", newline="") as f:
+            export_words_to_file(db, f, _user_id(args.user), args.format)
+    finally:
+        db.close()
+    print(f"Выгружено в {args.output}")
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(prog="python -m app.cli")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    build = subparsers.add_parser("build-dictionary", help="собрать локальный словарь")
+    build.add_argument("source", help="TSV-файл: слово<TAB>перевод")
+    build.add_argument("output", help="путь к файлу словаря SQLite")
+    build.set_defaults(func=build_dictionary)
+
+    ranks = subparsers.add_parser("build-word-ranks", help="собрать частотные ранги слов")
+    ranks.add_argument("source", help="TSV: слово<TAB>частота или слова по одному в строке от частых к редким")
+    ranks.add_argument("output", help="путь к файлу рангов")
+    ranks.set_defaults(func=build_word_ranks)
+
+    import_ = subparsers.add_parser("import-words", help="массовый импорт слов")
+    import_.add_argument("source", help="CSV word,translation[,score] или TSV-экспорт Anki")
+    import_.add_argument("--format", choices=EXPORT_FORMATS, default="csv")
+    import_.add_argument("--user", help="kc_sub пользователя, которому добавить слова")
+    import_.add_argument("--overwrite", action="store_true", help="заменять существующие переводы")
+    import_.set_defaults(func=import_vocabulary)
+
+    export = subparsers.add_parser("export-words", help="выгрузка слов")
+    export.add_argument("output", help="путь к файлу")
+    export.add_argument("--format", choices=EXPORT_FORMATS, default="csv")
+    export.add_argument("--user", help="kc_sub пользователя; без него выгружается весь словарь")
+    export.set_defaults(func=export_vocabulary)
+
+    args = parser.parse_args(argv)
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
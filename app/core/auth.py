@@ -1,9 +1,15 @@
+import asyncio
+import hashlib
+import time
+
 from fastapi import Header, HTTPException
 import httpx
 from jose import jwt
 from jose.exceptions import JWTError
 
+from app.core.cache import LRUCache
 from app.core.config import settings
+from app.core.metrics import registry
 
 JWKS_URL = (
     f"{settings.keycloak_url}/realms/{settings.keycloak_realm}/protocol/"
@@ -12,6 +18,128 @@ JWKS_URL = (
 ISSUER = settings.keycloak_issuer or f"{settings.keycloak_url}/realms/{settings.keycloak_realm}"
 
 
+_http_client: httpx.AsyncClient | None = None
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """Долгоживущий клиент с пулом соединений до Keycloak"""
+    global _http_client
+    if _http_client is None or _http_client.is_closed:
+        _http_client = httpx.AsyncClient(timeout=settings.jwks_http_timeout, trust_env=False)
+    return _http_client
+
+
+async def close_http_client() -> None:
+    global _http_client
+    if _http_client is not None:
+        await _http_client.aclose()
+        _http_client = None
+
+
+class JWKSCache:
+    """Кэш JWKS на процесс: TTL, обновление при неизвестном kid, один запрос на всех"""
+
+    def __init__(self, url: str, ttl: float, min_refresh_interval: float):
+        self.url = url
+        self.ttl = ttl
+        self.min_refresh_interval = min_refresh_interval
+        self._jwks: dict | None = None
+        self._fetched_at = 0.0
+        self._failed_at: float | None = None
+        self._lock = asyncio.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.refreshes = 0
+        self.failures = 0
+
+    def _kids(self) -> set:
+        return {key.get("kid") for key in (self._jwks or {}).get("keys", [])}
+
+    def _is_fresh(self) -> bool:
+        return self._jwks is not None and time.monotonic() - self._fetched_at < self.ttl
+
+    async def get(self, kid: str | None = None) -> dict:
+        if self._is_fresh() and (kid is None or kid in self._kids()):
+            self.hits += 1
+            return self._jwks
+
+        # Неизвестный kid не должен приводить к запросу в Keycloak на каждый токен
+        if (
+            self._jwks is not None
+            and time.monotonic() - self._fetched_at < self.min_refresh_interval
+        ):
+            self.hits += 1
+            return self._jwks
+
+        # После неудачного запроса Keycloak не дергается чаще min_refresh_interval
+        if self._recently_failed():
+            return self._stale_or_fail()
+
+        self.misses += 1
+        return await self.refresh()
+
+    def _recently_failed(self) -> bool:
+        return (
+            self._failed_at is not None
+            and time.monotonic() - self._failed_at < self.min_refresh_interval
+        )
+
+    def _stale_or_fail(self) -> dict:
+        if self._jwks is not None:
+            return self._jwks
+        raise HTTPException(status_code=401, detail="Cannot fetch JWKS: Keycloak unavailable")
+
+    async def refresh(self) -> dict:
+        started = time.monotonic()
+        async with self._lock:
+            # Пока ждали блокировку, ключи мог обновить другой запрос
+            if self._jwks is not None and self._fetched_at >= started:
+                return self._jwks
+            if self._failed_at is not None and self._failed_at >= started:
+                return self._stale_or_fail()
+
+            try:
+                r = await get_http_client().get(self.url)
+                r.raise_for_status()
+                jwks = r.json()
+            except httpx.HTTPError as exc:
+                self._failed_at = time.monotonic()
+                self.failures += 1
+                if self._jwks is not None:
+                    return self._jwks
+                raise HTTPException(status_code=401, detail=f"Cannot fetch JWKS: {exc}") from exc
+
+            self._jwks = jwks
+            self._fetched_at = time.monotonic()
+            self._failed_at = None
+            self.refreshes += 1
+            return jwks
+
+    def clear(self) -> None:
+        self._jwks = None
+        self._fetched_at = 0.0
+        self._failed_at = None
+
+    def stats(self) -> dict:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "refreshes": self.refreshes,
+            "failures": self.failures,
+        }
+
+
+jwks_cache = JWKSCache(
+    JWKS_URL,
+    ttl=settings.jwks_cache_ttl,
+    min_refresh_interval=settings.jwks_min_refresh_interval,
+)
+token_cache = LRUCache(maxsize=settings.token_cache_size)
+
+registry.register_stats("auth_jwks_cache", "Кэш ключей Keycloak", jwks_cache.stats)
+registry.register_stats("auth_token_cache", "Кэш проверенных токенов", token_cache.stats)
+
+
 def extract_bearer_token(authorization: str | None) -> str:
     if not authorization:
         raise HTTPException(status_code=401, detail="Missing Authorization header")
@@ -20,18 +148,26 @@ def extract_bearer_token(authorization: str | None) -> str:
     return authorization[len("Bearer "):]
 
 
-async def get_jwks() -> dict:
-    try:
-        async with httpx.AsyncClient(timeout=5.0, trust_env=False) as client:
-            r = await client.get(JWKS_URL)
-            r.raise_for_status()
-            return r.json()
-    except httpx.HTTPError as exc:
-        raise HTTPException(status_code=401, detail=f"Cannot fetch JWKS: {exc}") from exc
+async def get_jwks(kid: str | None = None) -> dict:
+    return await jwks_cache.get(kid)
+
+
+def _token_key(token: str) -> str:
+    return hashlib.sha256(token.encode()).hexdigest()
 
 
 async def decode_access_token(token: str) -> dict:
-    jwks = await get_jwks()
+    key = _token_key(token)
+    cached = token_cache.get(key)
+    if cached is not None:
+        return cached
+
+    try:
+        kid = jwt.get_unverified_header(token).get("kid")
+    except JWTError as exc:
+        raise HTTPException(status_code=401, detail=f"Invalid token: {exc}") from exc
+
+    jwks = await get_jwks(kid)
     try:
         payload = jwt.decode(
             token,
@@ -46,9 +182,22 @@ async def decode_access_token(token: str) -> dict:
     if payload.get("azp") != settings.keycloak_client_id:
         raise HTTPException(status_code=401, detail="Invalid azp")
 
+    exp = payload.get("exp")
+    if isinstance(exp, (int, float)):
+        ttl = exp - time.time()
+        if ttl > 0:
+            token_cache.set(key, payload, expires_at=time.monotonic() + ttl)
+
     return payload
 
 
+def auth_cache_stats() -> dict:
+    return {
+        "jwks": jwks_cache.stats(),
+        "tokens": token_cache.stats(),
+    }
+
+
 async def get_current_user(
     authorization: str | None = Header(default=None),
 ) -> dict:
@@ -59,4 +208,3 @@ async def get_current_user(
         "username": payload.get("preferred_username"),
         "roles": payload.get("realm_access", {}).get("roles", []),
     }
-
@@ -0,0 +1,48 @@
+import asyncio
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+
+
+# Общий ограниченный пул для блокирующих вызовов: синхронный SQLAlchemy,
+# разбор HTML, синхронные клиенты переводчиков
+blocking_executor = ThreadPoolExecutor(
+        max_workers=settings.blocking_workers,
+        thread_name_prefix="blocking",
+        )
+
+# Сколько /parse одновременно выполняется в одном воркере, остальные ждут
+parse_slots = asyncio.Semaphore(settings.parse_max_concurrency)
+
+
+async def run_blocking(func, *args, **kwargs):
+    """Выполняет блокирующую функцию в пуле, не останавливая event loop
+
+    Контекстные переменные запроса передаются в поток, как в asyncio.to_thread.
+    """
+    loop = asyncio.get_running_loop()
+    context = contextvars.copy_context()
+    return await loop.run_in_executor(
+            blocking_executor,
+            partial(context.run, func, *args, **kwargs),
+            )
+
+
+async def run_db(db, func, *args, **kwargs):
+    """Выполняет синхронные запросы к базе с сессией db первым аргументом
+
+    Для AsyncSession функция получает ее синхронную сессию через run_sync, и
+    запросы идут через асинхронный драйвер без потоков. Для обычной Session —
+    в пуле blocking_executor.
+
+    run_sync выполняет функцию прямо в event loop, поэтому в func должны быть
+    только обращения к базе: сетевые вызовы, паузы и тяжелые вычисления
+    нужно выносить в run_blocking, а не передавать сюда целые методы сервисов.
+    """
+    if isinstance(db, AsyncSession):
+        return await db.run_sync(lambda session: func(session, *args, **kwargs))
+    return await run_blocking(func, db, *args, **kwargs)
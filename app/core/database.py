@@ -1,20 +1,182 @@
-from sqlalchemy import create_engine
+import logging
+import time
+from typing import Union
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import sessionmaker, Session
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
 from .config import settings
+from .metrics import registry
 
 
-engine = create_engine(settings.database_url)
+logger = logging.getLogger("app.db")
+
+POOL_WAIT_BUCKETS = (0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0)
+
+pool_checkout_seconds = registry.histogram(
+        "db_pool_checkout_seconds",
+        "Время ожидания соединения из пула",
+        buckets=POOL_WAIT_BUCKETS,
+        )
+pool_timeouts = registry.counter(
+        "db_pool_timeouts_total",
+        "Сколько раз соединение не удалось получить за pool_timeout",
+        )
+query_seconds = registry.histogram(
+        "db_query_seconds",
+        "Длительность SQL-запросов",
+        )
+slow_queries = registry.counter(
+        "db_slow_queries_total",
+        "Запросы дольше db_slow_query_ms",
+        )
+
+
+class _TimedCheckout:
+    """Измеряет ожидание свободного соединения из пула"""
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            pool_timeouts.inc()
+            raise
+        finally:
+            pool_checkout_seconds.observe(time.perf_counter() - started)
+
+
+class TimedQueuePool(_TimedCheckout, QueuePool):
+    pass
+
+
+class TimedAsyncQueuePool(_TimedCheckout, AsyncAdaptedQueuePool):
+    pass
+
+
+ASYNC_DRIVERS = {
+        "postgresql": "postgresql+asyncpg",
+        "postgresql+psycopg2": "postgresql+asyncpg",
+        "sqlite": "sqlite+aiosqlite",
+        }
+
+
+def async_database_url(url: str) -> str:
+    """Подставляет в URL асинхронный драйвер: asyncpg для Postgres, aiosqlite для SQLite"""
+    scheme, sep, rest = url.partition("://")
+    return ASYNC_DRIVERS.get(scheme, scheme) + sep + rest
+
+
+def _engine_options(poolclass=TimedQueuePool) -> dict:
+    if settings.database_url.startswith("sqlite"):
+        return {}
+    return {
+            "poolclass": poolclass,
+            "pool_size": settings.db_pool_size,
+            "max_overflow": settings.db_max_overflow,
+            "pool_timeout": settings.db_pool_timeout,
+            "pool_pre_ping": settings.db_pool_pre_ping,
+            "pool_recycle": settings.db_pool_recycle,
+            }
+
+
+engine = create_engine(settings.database_url, **_engine_options())
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False,
                             bind=engine)
 
+# Синхронный движок остается для миграций, CLI, экспорта и фоновых задач;
+# асинхронный включается DATABASE_ASYNC и используется зависимостью get_db
+async_engine = None
+AsyncSessionLocal = None
+if settings.database_async:
+    from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+    async_engine = create_async_engine(
+            async_database_url(settings.database_url),
+            **_engine_options(TimedAsyncQueuePool),
+            )
+    AsyncSessionLocal = async_sessionmaker(
+            async_engine,
+            autoflush=False,
+            expire_on_commit=False,
+            )
+
 Base = declarative_base()
 
 
-def get_db():
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info["query_started"].pop()
+    elapsed = time.perf_counter() - started
+    query_seconds.observe(elapsed)
+    if elapsed * 1000 >= settings.db_slow_query_ms:
+        slow_queries.inc()
+        logger.warning("Медленный запрос %.1f мс: %s", elapsed * 1000, statement)
+
+
+def _pool_metrics():
+    pools = [("sync", engine.pool)]
+    if async_engine is not None:
+        pools.append(("async", async_engine.pool))
+    pools = [(name, pool) for name, pool in pools if isinstance(pool, QueuePool)]
+    if not pools:
+        return []
+    return [
+            ("db_pool_size", "gauge", "Размер пула",
+             [("db_pool_size", {"engine": name}, pool.size()) for name, pool in pools]),
+            ("db_pool_checked_out", "gauge", "Соединения, выданные приложению",
+             [("db_pool_checked_out", {"engine": name}, pool.checkedout()) for name, pool in pools]),
+            ("db_pool_checked_in", "gauge", "Свободные соединения в пуле",
+             [("db_pool_checked_in", {"engine": name}, pool.checkedin()) for name, pool in pools]),
+            ("db_pool_overflow", "gauge", "Соединения сверх pool_size",
+             [("db_pool_overflow", {"engine": name}, max(0, pool.overflow())) for name, pool in pools]),
+            ]
+
+
+registry.register_collector(_pool_metrics)
+
+
+def get_sync_db():
     db = SessionLocal()
     try:
         yield db
     finally:
         db.close()
+
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+DBSession = Union[Session, AsyncSession]
+
+# Зависимость для маршрутов: сессия того типа, который выбран DATABASE_ASYNC.
+# Код сервисов синхронный и вызывается через run_db из app.core.concurrency.
+get_db = get_async_db if settings.database_async else get_sync_db
+
+
+async def dispose_engines() -> None:
+    if async_engine is not None:
+        await async_engine.dispose()
+
+
+def dialect_insert(db: Session):
+    """Возвращает insert() диалекта с поддержкой ON CONFLICT"""
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        raise NotImplementedError(f"ON CONFLICT не поддерживается для {dialect}")
+    return insert
@@ -0,0 +1,109 @@
+import random
+import threading
+import time
+from collections import deque
+
+from app.core.metrics import registry
+
+
+breaker_state = registry.gauge(
+        "circuit_breaker_open",
+        "Состояние предохранителя: 0 — замкнут, 0.5 — пробный вызов, 1 — разомкнут",
+        labelnames=("name",),
+        )
+breaker_transitions = registry.counter(
+        "circuit_breaker_transitions_total",
+        "Переключения предохранителя",
+        labelnames=("name", "state"),
+        )
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+_STATE_VALUES = {CLOSED: 0.0, HALF_OPEN: 0.5, OPEN: 1.0}
+
+
+def backoff_delay(attempt: int, base: float, cap: float) -> float:
+    """Пауза перед повтором: экспонента со случайным разбросом (full jitter)
+
+    Разброс нужен, чтобы потоки, упавшие одновременно, не повторяли
+    запросы тоже одновременно.
+    """
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+class CircuitBreaker:
+    """Предохранитель для внешнего сервиса
+
+    Помнит исходы последних window вызовов. Когда их набралось не меньше
+    min_calls и доля ошибок достигла threshold, размыкается: allow()
+    отвечает False без обращения к сервису. Через reset_timeout секунд
+    пропускает один пробный вызов — успех замыкает предохранитель, ошибка
+    размыкает снова.
+    """
+
+    def __init__(
+            self,
+            name: str,
+            threshold: float = 0.5,
+            window: int = 20,
+            min_calls: int = 10,
+            reset_timeout: float = 30.0,
+            ):
+        self.name = name
+        self.threshold = threshold
+        self.min_calls = min(min_calls, window)
+        self.reset_timeout = reset_timeout
+        self._results: "deque[bool]" = deque(maxlen=window)
+        self._state = CLOSED
+        self._opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+        breaker_state.set(0.0, name=name)
+
+    def _switch(self, state: str) -> None:
+        self._state = state
+        breaker_state.set(_STATE_VALUES[state], name=self.name)
+        breaker_transitions.inc(name=self.name, state=state)
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._state == OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+                return HALF_OPEN
+            return self._state
+
+    def allow(self) -> bool:
+        """Можно ли сейчас обращаться к сервису"""
+        with self._lock:
+            if self._state == CLOSED:
+                return True
+            if self._state == OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+                self._switch(HALF_OPEN)
+            if self._state == HALF_OPEN and not self._probing:
+                self._probing = True
+                return True
+            return False
+
+    def record(self, success: bool) -> None:
+        with self._lock:
+            if self._state == HALF_OPEN:
+                self._probing = False
+                self._results.clear()
+                if success:
+                    self._switch(CLOSED)
+                else:
+                    self._opened_at = time.monotonic()
+                    self._switch(OPEN)
+                return
+            if self._state == OPEN:
+                return
+
+            self._results.append(success)
+            failures = self._results.count(False)
+            if (
+                    len(self._results) >= self.min_calls
+                    and failures / len(self._results) >= self.threshold
+                    ):
+                self._opened_at = time.monotonic()
+                self._switch(OPEN)
@@ -0,0 +1,439 @@
+import hashlib
+import logging
+import mmap
+import os
+import struct
+import threading
+import time
+import weakref
+import zlib
+from typing import Any, Dict, Iterable, Optional
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+try:
+    import redis
+except ImportError:
+    redis = None
+
+from app.core.cache import LRUCache
+
+
+logger = logging.getLogger("app.cache")
+
+_FILE_HEADER = struct.Struct("<8sIII")
+_FILE_HEADER_SIZE = 64
+_MAGIC = b"LPCACHE1"
+_VERSION = 1
+
+# state, длина ключа, длина значения, момент записи, срок жизни, crc32
+_SLOT_HEADER = struct.Struct("<BBHddI")
+_EMPTY = 0
+_USED = 1
+
+# Открытые MmapCache процесса; после fork каждый переоткрывает свой файл
+_live_caches: "weakref.WeakSet[MmapCache]" = weakref.WeakSet()
+
+
+def _reopen_after_fork() -> None:
+    """flock принадлежит открытому файлу, а не процессу: после fork
+    (gunicorn --preload) каждому воркеру нужен свой дескриптор"""
+    for cache in list(_live_caches):
+        if not cache.closed:
+            cache._reopen()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reopen_after_fork)
+
+
+class MmapCache:
+    """Общий для процессов кэш строк в файле, отображенном в память
+
+    Таблица фиксированного размера с открытой адресацией: ключ попадает в
+    один из probe_limit слотов подряд от своего хэша. Запись идет под
+    flock на весь файл, поэтому воркеры gunicorn не портят слоты друг
+    другу; чтение без блокировки, а недописанный слот отсекается по crc32
+    и считается промахом. Если все слоты окна заняты, вытесняется самая
+    старая запись. Значения, не влезающие в слот, не кэшируются.
+    """
+
+    def __init__(
+            self,
+            path: str,
+            slots: int,
+            slot_size: int = 256,
+            ttl: Optional[float] = None,
+            probe_limit: int = 8,
+            ):
+        if fcntl is None:
+            raise RuntimeError("MmapCache требует fcntl (POSIX)")
+        self.path = path
+        self.maxsize = max(1, slots)
+        self.slot_size = max(slot_size, _SLOT_HEADER.size + 16)
+        self.ttl = ttl
+        self.probe_limit = min(probe_limit, self.maxsize)
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.skipped = 0
+        self.closed = False
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._length = _FILE_HEADER_SIZE + self.maxsize * self.slot_size
+        self._open()
+        _live_caches.add(self)
+
+    def _open(self) -> None:
+        self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+        fcntl.flock(self._fd, fcntl.LOCK_EX)
+        try:
+            self._init_file()
+            self._mm = mmap.mmap(self._fd, self._length)
+        finally:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+        self._lock = threading.Lock()
+
+    def _reopen(self) -> None:
+        """Новый дескриптор и отображение в дочернем процессе после fork
+
+        Файл уже подготовлен родителем, поэтому flock здесь не берется:
+        если родитель держал блокировку в момент fork, ребенок ждал бы ее
+        вечно, а родитель — ребенка.
+        """
+        self._mm.close()
+        os.close(self._fd)
+        self._fd = os.open(self.path, os.O_RDWR)
+        self._mm = mmap.mmap(self._fd, self._length)
+        self._lock = threading.Lock()
+
+    def _init_file(self) -> None:
+        """Создает файл или пересоздает его, если размеры таблицы изменились"""
+        expected = _FILE_HEADER.pack(_MAGIC, _VERSION, self.maxsize, self.slot_size)
+        if os.fstat(self._fd).st_size >= self._length:
+            if os.pread(self._fd, _FILE_HEADER.size, 0) == expected:
+                return
+        # Файл не укорачивается: другие процессы могут держать его отображенным
+        if os.fstat(self._fd).st_size < self._length:
+            os.ftruncate(self._fd, self._length)
+        zeros = bytes(self.slot_size * 1024)
+        for offset in range(0, self._length, len(zeros)):
+            os.pwrite(self._fd, zeros[:self._length - offset], offset)
+        os.pwrite(self._fd, expected, 0)
+
+    def _start(self, key: bytes) -> int:
+        digest = hashlib.blake2b(key, digest_size=8).digest()
+        return int.from_bytes(digest, "little") % self.maxsize
+
+    def _offsets(self, key: bytes) -> Iterable[int]:
+        start = self._start(key)
+        for step in range(self.probe_limit):
+            yield _FILE_HEADER_SIZE + ((start + step) % self.maxsize) * self.slot_size
+
+    def _read(self, offset: int, key: bytes, now: float) -> Optional[str]:
+        state, key_len, value_len, stored_at, expires_at, crc = _SLOT_HEADER.unpack_from(self._mm, offset)
+        if state != _USED or key_len != len(key):
+            return None
+        start = offset + _SLOT_HEADER.size
+        if self._mm[start:start + key_len] != key:
+            return None
+        value = self._mm[start + key_len:start + key_len + value_len]
+        if zlib.crc32(value, zlib.crc32(key)) != crc:
+            return None
+        if expires_at and expires_at <= now:
+            return None
+        return value.decode("utf-8")
+
+    def get(self, key: str, default: Any = None) -> Any:
+        encoded = key.encode("utf-8")
+        now = time.time()
+        for offset in self._offsets(encoded):
+            value = self._read(offset, encoded, now)
+            if value is not None:
+                self.hits += 1
+                return value
+        self.misses += 1
+        return default
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, str]:
+        found = {}
+        for key in keys:
+            value = self.get(key)
+            if value is not None:
+                found[key] = value
+        return found
+
+    def _write(self, key: bytes, value: bytes, expires_at: float, now: float) -> None:
+        target = None
+        oldest = None
+        for offset in self._offsets(key):
+            state, key_len, _, stored_at, slot_expires, _ = _SLOT_HEADER.unpack_from(self._mm, offset)
+            start = offset + _SLOT_HEADER.size
+            if state == _USED and key_len == len(key) and self._mm[start:start + key_len] == key:
+                target = offset
+                break
+            if state != _USED or (slot_expires and slot_expires <= now):
+                if target is None:
+                    target = offset
+            elif oldest is None or stored_at < oldest[0]:
+                oldest = (stored_at, offset)
+        if target is None:
+            target = oldest[1]
+            self.evictions += 1
+
+        start = target + _SLOT_HEADER.size
+        crc = zlib.crc32(value, zlib.crc32(key))
+        self._mm[start:start + len(key) + len(value)] = key + value
+        _SLOT_HEADER.pack_into(self._mm, target, _USED, len(key), len(value), now, expires_at, crc)
+
+    def set_many(self, items: Dict[str, str], expires_at: Optional[float] = None) -> None:
+        """Сохраняет пачку значений одной блокировкой файла
+
+        expires_at задается в секундах time.monotonic(), как у LRUCache.
+        """
+        now = time.time()
+        if expires_at is not None:
+            deadline = now + (expires_at - time.monotonic())
+        else:
+            deadline = now + self.ttl if self.ttl else 0.0
+        limit = self.slot_size - _SLOT_HEADER.size
+        encoded = []
+        for key, value in items.items():
+            key_bytes = key.encode("utf-8")
+            value_bytes = value.encode("utf-8")
+            if len(key_bytes) > 255 or len(key_bytes) + len(value_bytes) > limit:
+                self.skipped += 1
+                continue
+            encoded.append((key_bytes, value_bytes))
+        if not encoded:
+            return
+
+        with self._lock:
+            fcntl.flock(self._fd, fcntl.LOCK_EX)
+            try:
+                for key_bytes, value_bytes in encoded:
+                    self._write(key_bytes, value_bytes, deadline, now)
+            finally:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+    def set(self, key: str, value: str, expires_at: Optional[float] = None) -> None:
+        self.set_many({key: value}, expires_at)
+
+    def pop(self, key: str) -> None:
+        encoded = key.encode("utf-8")
+        with self._lock:
+            fcntl.flock(self._fd, fcntl.LOCK_EX)
+            try:
+                for offset in self._offsets(encoded):
+                    if self._read(offset, encoded, 0.0) is not None:
+                        self._mm[offset] = _EMPTY
+            finally:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+    def clear(self) -> None:
+        with self._lock:
+            fcntl.flock(self._fd, fcntl.LOCK_EX)
+            try:
+                for offset in range(_FILE_HEADER_SIZE, self._length, self.slot_size):
+                    self._mm[offset] = _EMPTY
+            finally:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+    def __len__(self) -> int:
+        now = time.time()
+        size = 0
+        for offset in range(_FILE_HEADER_SIZE, self._length, self.slot_size):
+            state, _, _, _, expires_at, _ = _SLOT_HEADER.unpack_from(self._mm, offset)
+            if state == _USED and not (expires_at and expires_at <= now):
+                size += 1
+        return size
+
+    def close(self) -> None:
+        if self.closed:
+            return
+        self.closed = True
+        _live_caches.discard(self)
+        self._mm.close()
+        os.close(self._fd)
+
+    def stats(self) -> Dict[str, int]:
+        """Счетчики попаданий свои у каждого процесса, размер — общий"""
+        return {
+            "size": len(self),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "skipped": self.skipped,
+        }
+
+
+class LocalKV:
+    """Замена Redis в одном процессе для тестов и бенчмарков
+
+    Поддерживает только те команды, которыми пользуется RedisCache.
+    """
+
+    def __init__(self):
+        self._data: Dict[str, tuple[bytes, Optional[float]]] = {}
+        self._lock = threading.Lock()
+
+    def _alive(self, key: str) -> Optional[bytes]:
+        item = self._data.get(key)
+        if item is None:
+            return None
+        value, expires_at = item
+        if expires_at is not None and expires_at <= time.monotonic():
+            del self._data[key]
+            return None
+        return value
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            return self._alive(key)
+
+    def mget(self, keys: Iterable[str]) -> list:
+        with self._lock:
+            return [self._alive(key) for key in keys]
+
+    def set(self, key: str, value: str, ex: Optional[int] = None) -> bool:
+        expires_at = time.monotonic() + ex if ex else None
+        with self._lock:
+            self._data[key] = (value.encode("utf-8"), expires_at)
+        return True
+
+    def mset(self, mapping: Dict[str, str]) -> bool:
+        for key, value in mapping.items():
+            self.set(key, value)
+        return True
+
+    def delete(self, *keys: str) -> int:
+        with self._lock:
+            return sum(self._data.pop(key, None) is not None for key in keys)
+
+    def scan_iter(self, match: str) -> Iterable[str]:
+        prefix = match.rstrip("*")
+        with self._lock:
+            keys = [key for key in self._data if key.startswith(prefix)]
+        return iter(keys)
+
+
+class RedisCache:
+    """Кэш во внешнем KV-хранилище с протоколом Redis
+
+    Ограничение размера и вытеснение — на стороне сервера (maxmemory и
+    политика allkeys-lru), здесь только TTL и префикс ключей. Ошибки
+    соединения считаются промахом: без кэша перевод все равно найдется
+    в базе.
+    """
+
+    def __init__(
+            self,
+            url: str = "",
+            namespace: str = "linguaparser:translation:",
+            ttl: Optional[float] = None,
+            client=None,
+            ):
+        if client is None:
+            if redis is None:
+                raise RuntimeError("redis не установлен")
+            client = redis.Redis.from_url(url)
+        self.client = client
+        self.namespace = namespace
+        self.ttl = ttl
+        self.maxsize = 0
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+
+    def _key(self, key: str) -> str:
+        return self.namespace + key
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, str]:
+        keys = list(keys)
+        if not keys:
+            return {}
+        try:
+            values = self.client.mget([self._key(key) for key in keys])
+        except Exception as e:
+            self.errors += 1
+            self.misses += len(keys)
+            logger.warning("Кэш переводов недоступен: %s", e)
+            return {}
+        found = {key: value.decode("utf-8") for key, value in zip(keys, values) if value is not None}
+        self.hits += len(found)
+        self.misses += len(keys) - len(found)
+        return found
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return self.get_many([key]).get(key, default)
+
+    def set_many(self, items: Dict[str, str], expires_at: Optional[float] = None) -> None:
+        if not items:
+            return
+        ttl = self.ttl
+        if expires_at is not None:
+            ttl = expires_at - time.monotonic()
+        try:
+            if ttl:
+                for key, value in items.items():
+                    self.client.set(self._key(key), value, ex=max(1, int(ttl)))
+            else:
+                self.client.mset({self._key(key): value for key, value in items.items()})
+        except Exception as e:
+            self.errors += 1
+            logger.warning("Кэш переводов недоступен: %s", e)
+
+    def set(self, key: str, value: str, expires_at: Optional[float] = None) -> None:
+        self.set_many({key: value}, expires_at)
+
+    def pop(self, key: str) -> None:
+        try:
+            self.client.delete(self._key(key))
+        except Exception as e:
+            self.errors += 1
+            logger.warning("Кэш переводов недоступен: %s", e)
+
+    def clear(self) -> None:
+        try:
+            keys = list(self.client.scan_iter(match=self.namespace + "*"))
+            if keys:
+                self.client.delete(*keys)
+        except Exception as e:
+            self.errors += 1
+            logger.warning("Кэш переводов недоступен: %s", e)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "errors": self.errors,
+        }
+
+
+def create_cache(
+        kind: str,
+        maxsize: int,
+        ttl: Optional[float] = None,
+        path: str = "",
+        slot_size: int = 256,
+        redis_url: str = "",
+        namespace: str = "linguaparser:translation:",
+        ):
+    """memory — свой LRU в каждом процессе, mmap — общий файл на хосте,
+    redis — внешнее хранилище, local — LocalKV вместо Redis"""
+    if kind == "memory":
+        return LRUCache(maxsize=maxsize, ttl=ttl)
+    if kind == "mmap":
+        return MmapCache(path, slots=maxsize, slot_size=slot_size, ttl=ttl)
+    if kind == "redis":
+        return RedisCache(redis_url, namespace=namespace, ttl=ttl)
+    if kind == "local":
+        return RedisCache(namespace=namespace, ttl=ttl, client=LocalKV())
+    raise ValueError(f"Неизвестный кэш: {kind}")
@@ -1,16 +1,39 @@
+import asyncio
+import time
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
+from app.core.concurrency import run_blocking
 from app.core.config import settings
-from app.core.database import Base, engine
-from app.api.routes import router
+from app.core.database import Base, engine, dispose_engines
+from app.core.auth import close_http_client
+from app.core.metrics import http_request_seconds, http_requests
+from app.api.routes import parse_jobs, pipeline, router
+from app.services.fetcher import close_fetcher
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await run_blocking(parse_jobs.reap_all_stale)
+    retry_task = asyncio.create_task(pipeline.retry_pending_loop(
+        settings.translation_retry_interval,
+        settings.translation_retry_batch,
+        ))
+    yield
+    retry_task.cancel()
+    await close_http_client()
+    await close_fetcher()
+    await dispose_engines()
 
 
 app = FastAPI(
         title=settings.app_name,
         debug=settings.debug,
-        version="1.0.0"
+        version="1.0.0",
+        lifespan=lifespan,
         )
 
 templates = Jinja2Templates(directory="app/static/html")
@@ -24,6 +47,22 @@ app.add_middleware(
         )
 
 
+@app.middleware("http")
+async def record_metrics(request: Request, call_next):
+    """Задержка и коды ответов по шаблону маршрута, а не по конкретному URL"""
+    started = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        route = request.scope.get("route")
+        path = getattr(route, "path", "unmatched")
+        http_request_seconds.observe(time.perf_counter() - started, method=request.method, route=path)
+        http_requests.inc(method=request.method, route=path, status=str(status))
+
+
 app.mount("/static", StaticFiles(directory="app/static"), name="static")
 app.include_router(router)
 
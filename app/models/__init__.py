@@ -1,5 +1,7 @@
 from .word import Word
 from .user_word import UserWord
 from .user import User
+from .parse_job import ParseJob
+from .url_cache import UrlCacheEntry
 
-__all__ = ["Word", "UserWord", "User"]
+__all__ = ["Word", "UserWord", "User", "ParseJob", "UrlCacheEntry"]
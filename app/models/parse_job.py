@@ -0,0 +1,37 @@
+from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, JSON, Index, text
+from sqlalchemy.sql import func
+from app.core.database import Base
+
+
+ACTIVE_STATUSES = ("queued", "running")
+
+# Одна активная задача на (пользователь, URL): условие частичного уникального индекса
+ACTIVE_URL_JOB = text("status IN ('queued', 'running') AND url IS NOT NULL")
+
+
+class ParseJob(Base):
+    __tablename__ = "parse_jobs"
+
+    id = Column(String(32), primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    url = Column(String, nullable=True)
+    status = Column(String, nullable=False, default="queued")
+    stage = Column(String, nullable=True)
+    progress = Column(Float, nullable=False, default=0.0)
+    result = Column(JSON, nullable=True)
+    error = Column(String, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+    __table_args__ = (
+            Index("idx_parse_jobs_user_url_status", "user_id", "url", "status"),
+            Index(
+                "uq_parse_jobs_active_url", "user_id", "url",
+                unique=True,
+                postgresql_where=ACTIVE_URL_JOB,
+                sqlite_where=ACTIVE_URL_JOB,
+                ),
+            )
+
+    def __repr__(self):
+        return f"<ParseJob(id={self.id}, status='{self.status}', progress={self.progress})>"
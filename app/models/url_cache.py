@@ -0,0 +1,23 @@
+from sqlalchemy import Column, Integer, String, Text, DateTime, Index
+from sqlalchemy.sql import func
+from app.core.database import Base
+
+
+class UrlCacheEntry(Base):
+    __tablename__ = "url_cache"
+
+    url = Column(String, primary_key=True)
+    etag = Column(String, nullable=True)
+    last_modified = Column(String, nullable=True)
+    content_hash = Column(String(64), nullable=False)
+    words = Column(Text, nullable=False)
+    word_count = Column(Integer, nullable=False, default=0)
+    fetched_at = Column(DateTime(timezone=True), server_default=func.now())
+    last_used_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    __table_args__ = (
+            Index("idx_url_cache_last_used_at", "last_used_at"),
+            )
+
+    def __repr__(self):
+        return f"<UrlCacheEntry(url='{self.url}', word_count={self.word_count})>"
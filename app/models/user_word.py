@@ -1,9 +1,15 @@
-from sqlalchemy import Column, Integer, Float, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, Float, DateTime, ForeignKey, Index, UniqueConstraint, text
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from app.core.database import Base
 
 
+# Слова с таким score и выше считаются выученными и не попадают в сессии.
+# Значение зашито в условие частичного индекса: при изменении нужна миграция.
+RELEASE_THRESHOLD = 7
+ACTIVE_CARD = text(f"score < {RELEASE_THRESHOLD}")
+
+
 class UserWord(Base):
     __tablename__ = "user_words"
 
@@ -12,9 +18,24 @@ class UserWord(Base):
     word_id = Column(Integer, ForeignKey("words.id"), nullable=False)
     score = Column(Float, default=0.0, nullable=False)
     last_reviewed = Column(DateTime(timezone=True), server_default=func.now())
+    due_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    interval_days = Column(Float, default=0.0, server_default="0", nullable=False)
+    ease = Column(Float, default=2.5, server_default="2.5", nullable=False)
+    repetitions = Column(Integer, default=0, server_default="0", nullable=False)
 
     user = relationship("User", back_populates="user_words")
     word = relationship("Word", back_populates="user_words")
 
+    __table_args__ = (
+            UniqueConstraint("user_id", "word_id", name="uq_user_words_user_word"),
+            # Только активные карточки: выученные слова сохраняют старый due_at
+            # и иначе стояли бы в начале индекса перед карточками сессии
+            Index(
+                "idx_user_words_user_due_active", "user_id", "due_at",
+                postgresql_where=ACTIVE_CARD,
+                sqlite_where=ACTIVE_CARD,
+                ),
+            )
+
     def __repr__(self):
         return f"<UserWord(id={self.id}, word_id={self.word_id}, score={self.score})>"
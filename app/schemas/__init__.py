@@ -1,10 +1,14 @@
 from .word import Word, WordCreate, WordUpdate, WordWithProgress
 from .user_word import UserWord, UserWordCreate, UserWordUpdate, UserWordWithWord
-from .learning import ProgressUpdate, StudyCard, StudySession, ProgressResponse, LearningStats
+from .learning import (
+    ProgressUpdate, ReviewAnswer, ReviewBatch, StudyCard, StudySession,
+    ProgressResponse, ReviewResult, LearningStats,
+)
 
 
 __all__ = [
     "Word", "WordCreate", "WordUpdate", "WordWithProgress",
     "UserWord", "UserWordCreate", "UserWordUpdate", "UserWordWithWord",
-    "ProgressUpdate", "StudyCard", "StudySession", "ProgressResponse", "LearningStats"
+    "ProgressUpdate", "ReviewAnswer", "ReviewBatch", "StudyCard", "StudySession",
+    "ProgressResponse", "ReviewResult", "LearningStats"
 ]
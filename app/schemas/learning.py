@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import List
 
 
@@ -6,6 +6,15 @@ class ProgressUpdate(BaseModel):
     action: str
 
 
+class ReviewAnswer(BaseModel):
+    word_id: int
+    action: str
+
+
+class ReviewBatch(BaseModel):
+    answers: List[ReviewAnswer] = Field(..., max_length=100)
+
+
 class StudyCard(BaseModel):
     id: int
     word: str
@@ -24,8 +33,14 @@ class ProgressResponse(BaseModel):
     message: str
 
 
+class ReviewResult(BaseModel):
+    results: List[ProgressResponse]
+    session: StudySession
+
+
 class LearningStats(BaseModel):
     total_words: int
     learned_words: int
     in_progress: int
+    due_words: int
     completion_percentage: float
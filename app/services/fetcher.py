@@ -0,0 +1,494 @@
+import asyncio
+import ipaddress
+import logging
+import socket
+import threading
+from contextlib import asynccontextmanager, contextmanager
+from typing import AsyncIterator, Dict, Iterator, List, Optional, Tuple
+
+import httpcore
+import httpx
+
+from app.core.cache import LRUCache
+from app.core.config import settings
+from app.core.metrics import registry
+
+
+logger = logging.getLogger("app.parser")
+
+fetch_connections = registry.counter(
+        "fetch_connections_total",
+        "Запросы загрузчика страниц: на новом соединении или на keep-alive",
+        labelnames=("result",),
+        )
+fetch_dns = registry.counter(
+        "fetch_dns_lookups_total",
+        "Разрешение имен загрузчиком: из кэша или запросом к резолверу",
+        labelnames=("result",),
+        )
+fetch_bytes = registry.counter(
+        "fetch_bytes_total",
+        "Байты тела ответа: wire — по сети, decoded — после распаковки",
+        labelnames=("kind",),
+        )
+fetch_host_waits = registry.counter(
+        "fetch_host_waits_total",
+        "Запросы, ждавшие свободного слота своего хоста",
+        )
+
+
+def _is_ip(host: str) -> bool:
+    try:
+        ipaddress.ip_address(host)
+        return True
+    except ValueError:
+        return False
+
+
+class DNSCache:
+    """Кэш адресов хостов с TTL, общий для синхронного и асинхронного клиента"""
+
+    def __init__(self, ttl: float, maxsize: int = 1024):
+        self._cache = LRUCache(maxsize=maxsize, ttl=ttl)
+
+    @staticmethod
+    def _addresses(infos) -> List[str]:
+        return list(dict.fromkeys(info[4][0] for info in infos))
+
+    def lookup(self, host: str, port: int) -> List[str]:
+        addresses = self._cache.get(host)
+        if addresses is not None:
+            fetch_dns.inc(result="hit")
+            return addresses
+        fetch_dns.inc(result="miss")
+        addresses = self._addresses(socket.getaddrinfo(host, port, type=socket.SOCK_STREAM))
+        self._cache.set(host, addresses)
+        return addresses
+
+    async def alookup(self, host: str, port: int) -> List[str]:
+        addresses = self._cache.get(host)
+        if addresses is not None:
+            fetch_dns.inc(result="hit")
+            return addresses
+        fetch_dns.inc(result="miss")
+        loop = asyncio.get_running_loop()
+        addresses = self._addresses(await loop.getaddrinfo(host, port, type=socket.SOCK_STREAM))
+        self._cache.set(host, addresses)
+        return addresses
+
+    def forget(self, host: str) -> None:
+        self._cache.pop(host)
+
+
+class _CachingBackend(httpcore.NetworkBackend):
+    """Соединяется с адресом из DNSCache; TLS по-прежнему проверяет имя хоста"""
+
+    def __init__(self, dns: DNSCache):
+        self._dns = dns
+        self._backend = httpcore.SyncBackend()
+
+    def connect_tcp(self, host, port, timeout=None, local_address=None, socket_options=None):
+        if _is_ip(host):
+            return self._backend.connect_tcp(host, port, timeout, local_address, socket_options)
+        error = None
+        for address in self._dns.lookup(host, port):
+            try:
+                return self._backend.connect_tcp(address, port, timeout, local_address, socket_options)
+            except httpcore.ConnectError as e:
+                error = e
+        self._dns.forget(host)
+        raise error or httpcore.ConnectError(f"Нет адресов для {host}")
+
+    def connect_unix_socket(self, path, timeout=None, socket_options=None):
+        return self._backend.connect_unix_socket(path, timeout, socket_options)
+
+    def sleep(self, seconds):
+        self._backend.sleep(seconds)
+
+
+class _AsyncCachingBackend(httpcore.AsyncNetworkBackend):
+    """Асинхронный вариант _CachingBackend"""
+
+    def __init__(self, dns: DNSCache):
+        self._dns = dns
+        self._backend = httpcore.AnyIOBackend()
+
+    async def connect_tcp(self, host, port, timeout=None, local_address=None, socket_options=None):
+        if _is_ip(host):
+            return await self._backend.connect_tcp(host, port, timeout, local_address, socket_options)
+        error = None
+        for address in await self._dns.alookup(host, port):
+            try:
+                return await self._backend.connect_tcp(address, port, timeout, local_address, socket_options)
+            except httpcore.ConnectError as e:
+                error = e
+        self._dns.forget(host)
+        raise error or httpcore.ConnectError(f"Нет адресов для {host}")
+
+    async def connect_unix_socket(self, path, timeout=None, socket_options=None):
+        return await self._backend.connect_unix_socket(path, timeout, socket_options)
+
+    async def sleep(self, seconds):
+        await self._backend.sleep(seconds)
+
+
+class _ConnectionTrace:
+    """Через trace-расширение httpx узнает, открывалось ли для запроса новое соединение"""
+
+    def __init__(self):
+        self.connected = False
+
+    def __call__(self, event: str, info: dict) -> None:
+        if event == "connection.connect_tcp.started":
+            self.connected = True
+
+    async def atrace(self, event: str, info: dict) -> None:
+        self(event, info)
+
+    def record(self) -> None:
+        fetch_connections.inc(result="new" if self.connected else "reused")
+
+
+# httpcore -> httpx, от частных исключений к общим, как в httpx.HTTPTransport
+_ERRORS = (
+    (httpcore.ConnectTimeout, httpx.ConnectTimeout),
+    (httpcore.ReadTimeout, httpx.ReadTimeout),
+    (httpcore.WriteTimeout, httpx.WriteTimeout),
+    (httpcore.PoolTimeout, httpx.PoolTimeout),
+    (httpcore.TimeoutException, httpx.TimeoutException),
+    (httpcore.ConnectError, httpx.ConnectError),
+    (httpcore.ReadError, httpx.ReadError),
+    (httpcore.WriteError, httpx.WriteError),
+    (httpcore.NetworkError, httpx.NetworkError),
+    (httpcore.RemoteProtocolError, httpx.RemoteProtocolError),
+    (httpcore.LocalProtocolError, httpx.LocalProtocolError),
+    (httpcore.ProtocolError, httpx.ProtocolError),
+    (httpcore.UnsupportedProtocol, httpx.UnsupportedProtocol),
+)
+
+
+@contextmanager
+def _httpx_errors() -> Iterator[None]:
+    try:
+        yield
+    except httpcore.ProxyError as e:
+        raise httpx.ProxyError(str(e)) from e
+    except Exception as e:
+        for core_error, httpx_error in _ERRORS:
+            if isinstance(e, core_error):
+                raise httpx_error(str(e)) from e
+        raise
+
+
+def _core_request(request: httpx.Request) -> httpcore.Request:
+    return httpcore.Request(
+            method=request.method,
+            url=httpcore.URL(
+                scheme=request.url.raw_scheme,
+                host=request.url.raw_host,
+                port=request.url.port,
+                target=request.url.raw_path,
+                ),
+            headers=request.headers.raw,
+            content=request.stream,
+            extensions=request.extensions,
+            )
+
+
+class _ResponseStream(httpx.SyncByteStream):
+    def __init__(self, stream):
+        self._stream = stream
+
+    def __iter__(self) -> Iterator[bytes]:
+        with _httpx_errors():
+            for part in self._stream:
+                yield part
+
+    def close(self) -> None:
+        self._stream.close()
+
+
+class _AsyncResponseStream(httpx.AsyncByteStream):
+    def __init__(self, stream):
+        self._stream = stream
+
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        with _httpx_errors():
+            async for part in self._stream:
+                yield part
+
+    async def aclose(self) -> None:
+        await self._stream.aclose()
+
+
+class _PoolTransport(httpx.BaseTransport):
+    """Транспорт httpx поверх своего пула httpcore
+
+    httpx.HTTPTransport не принимает network_backend, поэтому пул с
+    _CachingBackend собирается здесь, а транспорт только переводит
+    запросы и ответы между httpx и httpcore.
+    """
+
+    def __init__(self, pool: httpcore.ConnectionPool):
+        self._pool = pool
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        with _httpx_errors():
+            response = self._pool.handle_request(_core_request(request))
+        return httpx.Response(
+                status_code=response.status,
+                headers=response.headers,
+                stream=_ResponseStream(response.stream),
+                extensions=response.extensions,
+                )
+
+    def close(self) -> None:
+        self._pool.close()
+
+
+class _AsyncPoolTransport(httpx.AsyncBaseTransport):
+    """Асинхронный вариант _PoolTransport"""
+
+    def __init__(self, pool: httpcore.AsyncConnectionPool):
+        self._pool = pool
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        with _httpx_errors():
+            response = await self._pool.handle_async_request(_core_request(request))
+        return httpx.Response(
+                status_code=response.status,
+                headers=response.headers,
+                stream=_AsyncResponseStream(response.stream),
+                extensions=response.extensions,
+                )
+
+    async def aclose(self) -> None:
+        await self._pool.aclose()
+
+
+class Fetcher:
+    """Загрузчик страниц, общий для всех парсингов воркера
+
+    Держит пул keep-alive соединений, ограничивает число одновременных
+    запросов к одному хосту, кэширует DNS, распаковывает gzip и brotli
+    (если установлен brotli), ограничивает число редиректов и размер
+    прочитанного тела. Редиректы обрабатываются здесь, а не в httpx, чтобы
+    каждый переход занимал слот своего хоста. Синхронный клиент создается
+    только по требованию.
+    """
+
+    def __init__(
+            self,
+            timeout: float = 5.0,
+            max_connections: int = 20,
+            max_keepalive: int = 10,
+            keepalive_expiry: float = 30.0,
+            per_host_limit: int = 2,
+            max_redirects: int = 5,
+            max_bytes: int = 5_000_000,
+            dns_ttl: float = 300.0,
+            user_agent: str = "LinguaParser",
+            ):
+        self.timeout = timeout
+        self.limits = httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_keepalive,
+                keepalive_expiry=keepalive_expiry,
+                )
+        self.per_host_limit = per_host_limit
+        self.max_redirects = max_redirects
+        self.max_bytes = max_bytes
+        self.headers = {"User-Agent": user_agent}
+        self.dns = DNSCache(dns_ttl)
+        self._client: Optional[httpx.AsyncClient] = None
+        self._sync_client: Optional[httpx.Client] = None
+        self._host_slots: Dict[str, Tuple[asyncio.Semaphore, int]] = {}
+        self._sync_host_slots: Dict[str, Tuple[threading.BoundedSemaphore, int]] = {}
+        self._sync_lock = threading.Lock()
+
+    @classmethod
+    def from_settings(cls) -> "Fetcher":
+        return cls(
+                timeout=settings.fetch_timeout,
+                max_connections=settings.fetch_max_connections,
+                max_keepalive=settings.fetch_max_keepalive,
+                keepalive_expiry=settings.fetch_keepalive_expiry,
+                per_host_limit=settings.fetch_per_host_limit,
+                max_redirects=settings.fetch_max_redirects,
+                max_bytes=settings.fetch_max_bytes,
+                dns_ttl=settings.fetch_dns_ttl,
+                user_agent=settings.fetch_user_agent,
+                )
+
+    def _pool_options(self) -> dict:
+        return {
+            "ssl_context": httpx.create_ssl_context(),
+            "max_connections": self.limits.max_connections,
+            "max_keepalive_connections": self.limits.max_keepalive_connections,
+            "keepalive_expiry": self.limits.keepalive_expiry,
+        }
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None or self._client.is_closed:
+            pool = httpcore.AsyncConnectionPool(
+                    network_backend=_AsyncCachingBackend(self.dns),
+                    **self._pool_options(),
+                    )
+            self._client = httpx.AsyncClient(
+                    transport=_AsyncPoolTransport(pool),
+                    timeout=self.timeout,
+                    headers=self.headers,
+                    )
+        return self._client
+
+    @property
+    def sync_client(self) -> httpx.Client:
+        with self._sync_lock:
+            if self._sync_client is None or self._sync_client.is_closed:
+                pool = httpcore.ConnectionPool(
+                        network_backend=_CachingBackend(self.dns),
+                        **self._pool_options(),
+                        )
+                self._sync_client = httpx.Client(
+                        transport=_PoolTransport(pool),
+                        timeout=self.timeout,
+                        headers=self.headers,
+                        )
+            return self._sync_client
+
+    @asynccontextmanager
+    async def _host_slot(self, host: str) -> AsyncIterator[None]:
+        """Не больше per_host_limit одновременных запросов к хосту
+
+        Семафор живет, пока к хосту есть запросы, так что словарь не растет
+        вместе с числом когда-либо открытых сайтов.
+        """
+        semaphore, users = self._host_slots.get(host, (None, 0))
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(self.per_host_limit)
+        self._host_slots[host] = (semaphore, users + 1)
+        try:
+            if semaphore.locked():
+                fetch_host_waits.inc()
+            async with semaphore:
+                yield
+        finally:
+            semaphore, users = self._host_slots[host]
+            if users > 1:
+                self._host_slots[host] = (semaphore, users - 1)
+            else:
+                del self._host_slots[host]
+
+    @contextmanager
+    def _sync_host_slot(self, host: str) -> Iterator[None]:
+        with self._sync_lock:
+            semaphore, users = self._sync_host_slots.get(host, (None, 0))
+            if semaphore is None:
+                semaphore = threading.BoundedSemaphore(self.per_host_limit)
+            self._sync_host_slots[host] = (semaphore, users + 1)
+        try:
+            if not semaphore.acquire(blocking=False):
+                fetch_host_waits.inc()
+                semaphore.acquire()
+            try:
+                yield
+            finally:
+                semaphore.release()
+        finally:
+            with self._sync_lock:
+                semaphore, users = self._sync_host_slots[host]
+                if users > 1:
+                    self._sync_host_slots[host] = (semaphore, users - 1)
+                else:
+                    del self._sync_host_slots[host]
+
+    def _too_many_redirects(self, request: httpx.Request) -> httpx.TooManyRedirects:
+        return httpx.TooManyRedirects(f"Больше {self.max_redirects} редиректов", request=request)
+
+    @asynccontextmanager
+    async def stream(self, url: str, headers: Optional[Dict[str, str]] = None) -> AsyncIterator[httpx.Response]:
+        """GET с потоковым телом; слот хоста занят, пока тело читается
+
+        Каждый переход по редиректу занимает слот своего хоста.
+        """
+        request = self.client.build_request("GET", url, headers=headers)
+        for _ in range(self.max_redirects + 1):
+            trace = _ConnectionTrace()
+            request.extensions = {**request.extensions, "trace": trace.atrace}
+            async with self._host_slot(request.url.host):
+                response = await self.client.send(request, stream=True)
+                trace.record()
+                try:
+                    if response.next_request is None:
+                        yield response
+                        return
+                    request = response.next_request
+                finally:
+                    await response.aclose()
+        raise self._too_many_redirects(request)
+
+    @contextmanager
+    def stream_sync(self, url: str, headers: Optional[Dict[str, str]] = None) -> Iterator[httpx.Response]:
+        request = self.sync_client.build_request("GET", url, headers=headers)
+        for _ in range(self.max_redirects + 1):
+            trace = _ConnectionTrace()
+            request.extensions = {**request.extensions, "trace": trace}
+            with self._sync_host_slot(request.url.host):
+                response = self.sync_client.send(request, stream=True)
+                trace.record()
+                try:
+                    if response.next_request is None:
+                        yield response
+                        return
+                    request = response.next_request
+                finally:
+                    response.close()
+        raise self._too_many_redirects(request)
+
+    async def aiter_body(self, response: httpx.Response, chunk_size: int) -> AsyncIterator[bytes]:
+        """Распакованное тело, обрезанное после max_bytes"""
+        received = 0
+        async for chunk in response.aiter_bytes(chunk_size):
+            chunk = chunk[:self.max_bytes - received]
+            received += len(chunk)
+            yield chunk
+            if received >= self.max_bytes:
+                break
+        fetch_bytes.inc(received, kind="decoded")
+        fetch_bytes.inc(response.num_bytes_downloaded, kind="wire")
+
+    def iter_body(self, response: httpx.Response, chunk_size: int) -> Iterator[bytes]:
+        received = 0
+        for chunk in response.iter_bytes(chunk_size):
+            chunk = chunk[:self.max_bytes - received]
+            received += len(chunk)
+            yield chunk
+            if received >= self.max_bytes:
+                break
+        fetch_bytes.inc(received, kind="decoded")
+        fetch_bytes.inc(response.num_bytes_downloaded, kind="wire")
+
+    async def aclose(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+        if self._sync_client is not None:
+            self._sync_client.close()
+            self._sync_client = None
+
+
+_fetcher: Optional[Fetcher] = None
+
+
+def get_fetcher() -> Fetcher:
+    """Общий на воркер загрузчик"""
+    global _fetcher
+    if _fetcher is None:
+        _fetcher = Fetcher.from_settings()
+    return _fetcher
+
+
+async def close_fetcher() -> None:
+    if _fetcher is not None:
+        await _fetcher.aclose()
@@ -0,0 +1,177 @@
+import asyncio
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Optional, Set, Tuple
+from sqlalchemy.orm import Session
+from app.core.concurrency import run_blocking, run_db
+from app.core.config import settings
+from app.core.database import SessionLocal, dialect_insert
+from app.models.parse_job import ACTIVE_STATUSES, ACTIVE_URL_JOB, ParseJob
+from app.services.parse_pipeline import ParsePipeline, normalize_url
+from app.services.users import get_or_create_user_id
+
+
+class ParseJobService:
+    """Фоновые задачи парсинга: статус хранится в БД, выполнение — в пуле воркера"""
+
+    def __init__(self, pipeline: ParsePipeline, workers: int):
+        self.pipeline = pipeline
+        self._slots = asyncio.Semaphore(workers)
+        self._tasks: Set[asyncio.Task] = set()
+
+    def reap_stale(self, db: Session, job_id: Optional[str] = None) -> int:
+        """Помечает упавшими активные задачи, которые давно не обновлялись
+
+        Такие задачи остаются после перезапуска воркера: их некому
+        доделать, а без этого дедупликация возвращала бы их бесконечно.
+        """
+        stale_before = datetime.now(timezone.utc) - timedelta(seconds=settings.parse_job_stale_after)
+        query = db.query(ParseJob).filter(
+                ParseJob.status.in_(ACTIVE_STATUSES),
+                ParseJob.updated_at < stale_before,
+                )
+        if job_id is not None:
+            query = query.filter(ParseJob.id == job_id)
+        reaped = query.update(
+                {"status": "failed", "stage": "failed", "error": "Задача прервана перезапуском"},
+                synchronize_session=False,
+                )
+        db.commit()
+        return reaped
+
+    def reap_all_stale(self) -> int:
+        db = SessionLocal()
+        try:
+            return self.reap_stale(db)
+        finally:
+            db.close()
+
+    def _active_job(self, db: Session, user_id: int, url: str) -> Optional[ParseJob]:
+        return (
+                db.query(ParseJob)
+                .filter(
+                    ParseJob.user_id == user_id,
+                    ParseJob.url == url,
+                    ParseJob.status.in_(ACTIVE_STATUSES),
+                    )
+                .first()
+                )
+
+    def _create_job(self, db: Session, current_user: dict, url: Optional[str]) -> Tuple[ParseJob, bool]:
+        """Создает задачу или возвращает уже идущую для того же URL
+
+        Гонку двух одновременных запросов решает частичный уникальный
+        индекс: вставка с ON CONFLICT DO NOTHING проигравшего ничего не
+        создает, и он получает задачу победителя.
+        """
+        user_id = get_or_create_user_id(db, current_user)
+        self.reap_stale(db)
+
+        if url:
+            existing = self._active_job(db, user_id, url)
+            if existing:
+                return existing, False
+
+        expired_before = datetime.now(timezone.utc) - timedelta(seconds=settings.parse_job_ttl)
+        (
+            db.query(ParseJob)
+            .filter(
+                ParseJob.status.notin_(ACTIVE_STATUSES),
+                ParseJob.updated_at < expired_before,
+                )
+            .delete(synchronize_session=False)
+        )
+
+        while True:
+            job_id = uuid.uuid4().hex
+            stmt = (
+                    dialect_insert(db)(ParseJob)
+                    .values(
+                        id=job_id,
+                        user_id=user_id,
+                        url=url,
+                        status="queued",
+                        stage="queued",
+                        progress=0.0,
+                        )
+                    .on_conflict_do_nothing(
+                        index_elements=["user_id", "url"],
+                        index_where=ACTIVE_URL_JOB,
+                        )
+                    )
+            created = db.execute(stmt).rowcount > 0
+            db.commit()
+            if created:
+                return db.get(ParseJob, job_id), True
+            # Задача победителя могла успеть завершиться — тогда пробуем снова
+            existing = self._active_job(db, user_id, url)
+            if existing:
+                return existing, False
+
+    def _update(self, job_id: str, **fields) -> None:
+        db = SessionLocal()
+        try:
+            db.query(ParseJob).filter(ParseJob.id == job_id).update(fields)
+            db.commit()
+        finally:
+            db.close()
+
+    async def submit(
+            self,
+            db: Session,
+            current_user: dict,
+            url: Optional[str] = None,
+            text: Optional[str] = None,
+            ) -> ParseJob:
+        """Ставит парсинг в очередь и сразу возвращает задачу"""
+        if url:
+            url = normalize_url(url)
+        job, created = await run_db(db, self._create_job, current_user, url)
+        if created:
+            task = asyncio.create_task(self._run(job.id, current_user, url, text))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+        return job
+
+    async def _run(self, job_id: str, current_user: dict, url: Optional[str], text: Optional[str]) -> None:
+        async with self._slots:
+            await run_blocking(self._update, job_id, status="running", stage="start", progress=0.0)
+
+            def progress(stage: str, value: float) -> None:
+                self._update(job_id, stage=stage, progress=value)
+
+            db = SessionLocal()
+            try:
+                result = await self.pipeline.run(db, current_user, url=url, text=text, progress=progress)
+                await run_blocking(
+                        self._update, job_id,
+                        status="done", stage="done", progress=1.0, result=result,
+                        )
+            except Exception as e:
+                await run_blocking(db.rollback)
+                await run_blocking(
+                        self._update, job_id,
+                        status="failed", stage="failed", error=str(e),
+                        )
+            finally:
+                await run_blocking(db.close)
+
+    def get_job(self, db: Session, current_user: dict, job_id: str) -> Optional[Dict]:
+        user_id = get_or_create_user_id(db, current_user)
+        self.reap_stale(db, job_id)
+        job = (
+                db.query(ParseJob)
+                .filter(ParseJob.id == job_id, ParseJob.user_id == user_id)
+                .first()
+                )
+        if job is None:
+            return None
+        return {
+                "job_id": job.id,
+                "url": job.url,
+                "status": job.status,
+                "stage": job.stage,
+                "progress": job.progress,
+                "result": job.result,
+                "error": job.error,
+                }
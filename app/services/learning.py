@@ -1,9 +1,10 @@
-from typing import Optional, Dict, List
+from typing import Optional, Dict, List, Tuple
+from sqlalchemy import func, literal_column
 from sqlalchemy.orm import Session
+from app.core.database import dialect_insert
 from app.models.word import Word
-from app.models.user_word import UserWord
-import random
-from datetime import datetime
+from app.models.user_word import RELEASE_THRESHOLD, UserWord
+from datetime import datetime, timedelta, timezone
 
 
 class LearningService:
@@ -15,49 +16,62 @@ class LearningService:
         self.know_bonus = 1
         self.dont_know_penalty = 1.5
         self.cards_per_session = 10
-        self.release_threshold = 7
+        self.actions = ("know", "dont_know", "remove")
+        self.release_threshold = RELEASE_THRESHOLD
+        # Окно ближайших карточек, из которого SQL случайно выбирает сессию
+        self.session_window = 3
+        self.initial_ease = 2.5
+        self.min_ease = 1.3
+        self.relearn_minutes = 10
+        self.know_quality = 4
+        self.dont_know_quality = 1
 
     def get_study_session(self, db: Session, user_id: int) -> List[Dict]:
-        """Получает 10 слов для изучения"""
-        
-        active_words = (
-            db.query(UserWord)
-            .filter(
-                UserWord.user_id == user_id,
-                UserWord.score < self.release_threshold
-                )
-            .all()
-        )
-
-        if len(active_words) < self.cards_per_session:
-            needed = self.cards_per_session - len(active_words)
-            new_words = self._get_new_words(db, user_id, needed)
-            active_words.extend(new_words)
-
-        random.shuffle(active_words)
+        """Получает 10 слов для изучения
 
-        session_words = active_words[:self.cards_per_session]
-        
-        words_ids = [uw.word_id for uw in session_words]
+        Карточки берутся по частичному индексу (user_id, due_at) WHERE
+        score < RELEASE_THRESHOLD: сначала просроченные, затем ближайшие,
+        выученные слова индекс не содержит. Случайный порядок внутри окна задается в SQL.
+        """
+        now = datetime.now(timezone.utc)
+        window = (
+                db.query(
+                    UserWord.word_id,
+                    UserWord.score,
+                    UserWord.due_at,
+                    )
+                .filter(
+                    UserWord.user_id == user_id,
+                    # Литерал, а не параметр: иначе планировщик не докажет
+                    # условие частичного индекса для подготовленного запроса
+                    UserWord.score < literal_column(str(RELEASE_THRESHOLD)),
+                    )
+                .order_by(UserWord.due_at)
+                .limit(self.cards_per_session * self.session_window)
+                .subquery()
+                )
 
-        words = (
-                db.query(Word)
-                .filter(Word.id.in_(words_ids))
+        rows = (
+                db.query(Word.id, Word.word, Word.translation, window.c.score)
+                .join(window, window.c.word_id == Word.id)
+                .order_by(window.c.due_at > now, func.random())
+                .limit(self.cards_per_session)
                 .all()
                 )
 
-        words_by_id = {word.id: word for word in words}
+        cards = [
+                {
+                    "id": word_id,
+                    "word": word,
+                    "translation": translation,
+                    "score": score,
+                    }
+                for word_id, word, translation, score in rows
+                ]
 
-        cards = []
-        for user_word in session_words:
-            word = words_by_id.get(user_word.word_id)
-            if word:
-                cards.append({
-                    "id": word.id,
-                    "word": word.word,
-                    "translation": word.translation,
-                    "score": user_word.score
-                    })
+        if len(cards) < self.cards_per_session:
+            needed = self.cards_per_session - len(cards)
+            cards.extend(self._get_new_words(db, user_id, needed))
 
         return cards
 
@@ -66,10 +80,10 @@ class LearningService:
             db: Session,
             user_id: int,
             count: int
-            ) -> List[UserWord]:
+            ) -> List[Dict]:
         """Добавляет новые слова в изучение"""
         new_words = (
-                db.query(Word)
+                db.query(Word.id, Word.word, Word.translation)
                 .outerjoin(
                     UserWord,
                     (UserWord.word_id == Word.id) & (UserWord.user_id == user_id),
@@ -78,17 +92,87 @@ class LearningService:
                 .limit(count)
                 .all()
                 )
-        
-        
-        user_words = []
-        for word in new_words:
-            user_word = UserWord(user_id=user_id, word_id=word.id, score=0)
-            db.add(user_word)
-            user_words.append(user_word)
 
+        if not new_words:
+            return []
+
+        insert = dialect_insert(db)
+        db.execute(
+                insert(UserWord)
+                .values([
+                    {"user_id": user_id, "word_id": word_id, "score": 0.0}
+                    for word_id, _, _ in new_words
+                    ])
+                .on_conflict_do_nothing(index_elements=["user_id", "word_id"])
+                )
         db.commit()
-        return user_words
-    
+
+        return [
+                {
+                    "id": word_id,
+                    "word": word,
+                    "translation": translation,
+                    "score": 0.0,
+                    }
+                for word_id, word, translation in new_words
+                ]
+
+    def _schedule(self, user_word: UserWord, quality: int, now: datetime) -> None:
+        """Пересчитывает интервал повторения по SM-2 (quality от 0 до 5)"""
+        ease = user_word.ease if user_word.ease is not None else self.initial_ease
+        repetitions = user_word.repetitions or 0
+        interval = user_word.interval_days or 0.0
+
+        if quality < 3:
+            repetitions = 0
+            interval = 0.0
+            due_at = now + timedelta(minutes=self.relearn_minutes)
+        else:
+            repetitions += 1
+            if repetitions == 1:
+                interval = 1.0
+            elif repetitions == 2:
+                interval = 6.0
+            else:
+                interval = round(interval * ease, 2)
+            due_at = now + timedelta(days=interval)
+
+        ease += 0.1 - (5 - quality) * (0.08 + (5 - quality) * 0.02)
+        user_word.ease = max(self.min_ease, ease)
+        user_word.repetitions = repetitions
+        user_word.interval_days = interval
+        user_word.due_at = due_at
+
+    def _apply_action(self, user_word: UserWord, action: str, now: datetime) -> str:
+        """Применяет ответ к карточке и возвращает сообщение для пользователя"""
+        if action == "know":
+            user_word.score += self.know_bonus
+            self._schedule(user_word, self.know_quality, now)
+            message = "Отлично! Слово изучено лучше"
+        elif action == "dont_know":
+            user_word.score -= self.dont_know_penalty
+            self._schedule(user_word, self.dont_know_quality, now)
+            message = "Плохо, пробуйте еще раз"
+        elif action == "remove":
+            user_word.score = self.max_score
+            message = "Слово убрано из изучения"
+        else:
+            raise ValueError("Неизвестное действие")
+
+        user_word.score = max(0, user_word.score)
+        user_word.last_reviewed = now
+        return message
+
+    def _new_user_word(self, user_id: int, word_id: int) -> UserWord:
+        return UserWord(
+                user_id=user_id,
+                word_id=word_id,
+                score=0,
+                ease=self.initial_ease,
+                interval_days=0.0,
+                repetitions=0,
+                )
+
     def update_progress(
             self,
             db: Session,
@@ -103,23 +187,10 @@ class LearningService:
                 ).first()
 
         if not user_word:
-            user_word = UserWord(user_id=user_id, word_id=word_id, score=0)
+            user_word = self._new_user_word(user_id, word_id)
             db.add(user_word)
 
-        if action == "know":
-            user_word.score += self.know_bonus
-            message = "Отлично! Слово изучено лучше"
-        elif action == "dont_know":
-            user_word.score -= self.dont_know_penalty
-            message = "Плохо, пробуйте еще раз"
-        elif action == "remove":
-            user_word.score = self.max_score
-            message = "Слово убрано из изучения"
-        else:
-            raise ValueError("Неизвестное действие")
-
-        user_word.score = max(0, user_word.score)
-        user_word.last_reviewed = datetime.now()
+        message = self._apply_action(user_word, action, datetime.now(timezone.utc))
         db.commit()
 
         return {
@@ -128,16 +199,62 @@ class LearningService:
                 "message": message
                 }
 
-    def get_learning_stats(self, db: Session) -> Dict:
-        """Получает статистику изучения"""
+    def apply_reviews(
+            self,
+            db: Session,
+            user_id: int,
+            answers: List[Tuple[int, str]],
+            ) -> List[Dict]:
+        """Применяет ответы всей сессии одной транзакцией
+
+        Карточки загружаются одним запросом, изменения уходят одним flush,
+        который SQLAlchemy отправляет пакетным UPDATE.
+        """
+        for _, action in answers:
+            if action not in self.actions:
+                raise ValueError("Неизвестное действие")
+
+        word_ids = {word_id for word_id, _ in answers}
+        user_words = {
+                user_word.word_id: user_word
+                for user_word in db.query(UserWord).filter(
+                    UserWord.user_id == user_id,
+                    UserWord.word_id.in_(word_ids),
+                    )
+                }
 
-        total_words = db.query(Word).count()
-        learned_words = db.query(UserWord).filter(
-                UserWord.score >= 10
-                ).count()
-        in_progress = db.query(UserWord).filter(
-                UserWord.score < 7
-                ).count()
+        now = datetime.now(timezone.utc)
+        results = []
+        for word_id, action in answers:
+            user_word = user_words.get(word_id)
+            if user_word is None:
+                user_word = self._new_user_word(user_id, word_id)
+                db.add(user_word)
+                user_words[word_id] = user_word
+            message = self._apply_action(user_word, action, now)
+            results.append({
+                "word_id": word_id,
+                "new_score": user_word.score,
+                "message": message,
+                })
+
+        db.commit()
+        return results
+
+    def get_learning_stats(self, db: Session, user_id: int) -> Dict:
+        """Получает статистику изучения пользователя одним агрегирующим запросом"""
+        now = datetime.now(timezone.utc)
+        active = UserWord.score < self.release_threshold
+        total_words, learned_words, in_progress, due_words = (
+                db.query(
+                    func.count(UserWord.id),
+                    func.count(UserWord.id).filter(UserWord.score >= self.release_threshold),
+                    func.count(UserWord.id).filter(active),
+                    func.count(UserWord.id).filter(active, UserWord.due_at <= now),
+                    )
+                .filter(UserWord.user_id == user_id)
+                .one()
+                )
 
         completion_percentage = 0
         if total_words > 0:
@@ -147,5 +264,6 @@ class LearningService:
                 "total_words": total_words,
                 "learned_words": learned_words,
                 "in_progress": in_progress,
+                "due_words": due_words,
                 "completion_percentage": completion_percentage
                 }
@@ -0,0 +1,216 @@
+import asyncio
+import logging
+from typing import Callable, Dict, List, Optional, Tuple
+from sqlalchemy import Float, Integer, literal, select
+from sqlalchemy.orm import Session
+from app.core.concurrency import parse_slots, run_blocking, run_db
+from app.core.database import SessionLocal, dialect_insert
+from app.core.metrics import parse_stage_seconds
+from app.models.word import Word
+from app.models.user_word import UserWord
+from app.services.parser import TextParser
+from app.services.translator import TranslationService
+from app.services.url_cache import UrlCache
+from app.services.word_ranks import WordRanks
+from app.services.users import get_or_create_user_id
+
+
+ProgressCallback = Callable[[str, float], None]
+
+logger = logging.getLogger("app.translation")
+
+
+def normalize_url(url: str) -> str:
+    if not url.startswith(('http://', 'https://')):
+        url = 'http://' + url
+    return url
+
+
+class ParsePipeline:
+    """Полный цикл /parse: загрузка, извлечение слов, перевод, привязка к пользователю"""
+
+    def __init__(
+            self,
+            parser: TextParser,
+            translator: TranslationService,
+            url_cache: Optional[UrlCache] = None,
+            ranks: Optional[WordRanks] = None,
+            skip_top: int = 0,
+            max_new_words: Optional[int] = None,
+            ):
+        self.parser = parser
+        self.translator = translator
+        self.url_cache = url_cache
+        self.ranks = ranks or WordRanks()
+        self.skip_top = skip_top
+        self.max_new_words = max_new_words
+
+    async def _fetch_url_words(self, db: Session, url: str) -> List[str]:
+        """Загружает слова страницы, используя кэш и условные запросы"""
+        if self.url_cache is None:
+            return await self.parser.aparser_url(url)
+
+        with parse_stage_seconds.time(stage="url_cache"):
+            cached = await run_db(db, self.url_cache.get, url)
+        result = await self.parser.afetch_words(
+                url,
+                etag=cached.etag if cached else None,
+                last_modified=cached.last_modified if cached else None,
+                )
+        if result.failed:
+            return []
+        if result.not_modified:
+            if cached is None:
+                return await self.parser.aparser_url(url)
+            await run_db(db, self.url_cache.touch, url, result.etag, result.last_modified)
+            return cached.words
+
+        await run_db(
+                db, self.url_cache.store, url,
+                result.etag, result.last_modified, result.words,
+                )
+        return result.words
+
+    async def extract(self, db: Session, url: Optional[str], text: Optional[str]) -> Tuple[List[str], str]:
+        """Возвращает слова и подпись источника"""
+        if url:
+            url = normalize_url(url)
+            words = await self._fetch_url_words(db, url)
+            return words, f"URL: {url}"
+
+        with parse_stage_seconds.time(stage="word_extract"):
+            words = await run_blocking(self.parser.extract_words, text)
+        return words, "введенного текста"
+
+    def link_words(self, db: Session, user_id: int, words: List[str]) -> int:
+        """Привязывает слова к пользователю одной вставкой, возвращает число новых связей"""
+        insert = dialect_insert(db)
+        created = 0
+        batch_size = self.translator.batch_size
+        for start in range(0, len(words), batch_size):
+            chunk = words[start:start + batch_size]
+            word_ids = select(
+                    literal(user_id, Integer),
+                    Word.id,
+                    literal(0.0, Float),
+                    ).where(Word.word.in_(chunk))
+            stmt = (
+                    insert(UserWord)
+                    .from_select(["user_id", "word_id", "score"], word_ids)
+                    .on_conflict_do_nothing(index_elements=["user_id", "word_id"])
+                    )
+            created += db.execute(stmt).rowcount
+        return created
+
+    def _user_words(self, db: Session, user_id: int, words: List[str]) -> set:
+        """Какие из слов уже есть у пользователя"""
+        existing = set()
+        batch_size = self.translator.batch_size
+        for start in range(0, len(words), batch_size):
+            chunk = words[start:start + batch_size]
+            rows = (
+                    db.query(Word.word)
+                    .join(UserWord, UserWord.word_id == Word.id)
+                    .filter(UserWord.user_id == user_id, Word.word.in_(chunk))
+                    )
+            existing.update(word for (word,) in rows)
+        return existing
+
+    def select_words(self, db: Session, user_id: int, words: List[str]) -> Tuple[List[str], Dict[str, int]]:
+        """Отбирает слова для перевода и добавления пользователю
+
+        Уже добавленные и самые частые слова языка пропускаются, остальные
+        упорядочиваются по частотному рангу и обрезаются до max_new_words.
+        """
+        existing = self._user_words(db, user_id, words)
+        fresh = [word for word in words if word not in existing]
+        selected, skipped_common = self.ranks.prioritize(fresh, self.skip_top, self.max_new_words)
+        return selected, {
+                "already_added": len(existing),
+                "skipped_common": skipped_common,
+                "skipped_limit": len(fresh) - skipped_common - len(selected),
+                }
+
+    def _select_for_user(self, db: Session, current_user: dict, words: List[str]) -> Tuple[int, List[str], Dict[str, int]]:
+        user_id = get_or_create_user_id(db, current_user)
+        with parse_stage_seconds.time(stage="select"):
+            words, skipped = self.select_words(db, user_id, words)
+        return user_id, words, skipped
+
+    def _link_and_commit(self, db: Session, user_id: int, words: List[str]) -> int:
+        with parse_stage_seconds.time(stage="link"):
+            new_links = self.link_words(db, user_id, words)
+            db.commit()
+        return new_links
+
+    async def save_words(
+            self,
+            db: Session,
+            current_user: dict,
+            words: List[str],
+            progress: Optional[ProgressCallback] = None,
+            ) -> Dict:
+        """Отбирает, переводит и добавляет слова пользователю
+
+        Через run_db идут только запросы к базе; перевод с его сетевыми
+        вызовами и паузами выполняется в пуле потоков, чтобы с AsyncSession
+        он не занимал event loop. Возвращает переводы, число новых слов у
+        пользователя и счетчики пропущенных слов.
+        """
+        user_id, words, skipped = await run_db(db, self._select_for_user, current_user, words)
+        translations = await self.translator.atranslate_words(words, db, user_id)
+        if progress:
+            await run_blocking(progress, "link", 0.8)
+        new_links = await run_db(db, self._link_and_commit, user_id, words)
+        return {"translations": translations, "new_links": new_links, **skipped}
+
+    def retry_pending(self, db: Session, limit: int) -> int:
+        """Переводит отложенные слова и добавляет их пользователям, возвращает число новых связей"""
+        by_user = self.translator.retranslate_pending(db, limit)
+        created = 0
+        for user_id, words in by_user.items():
+            created += self.link_words(db, user_id, words)
+        db.commit()
+        return created
+
+    async def retry_pending_loop(self, interval: float, limit: int) -> None:
+        """Фоновый цикл: раз в interval секунд разбирает очередь отложенных слов"""
+        while True:
+            await asyncio.sleep(interval)
+            if not self.translator.pending:
+                continue
+            db = SessionLocal()
+            try:
+                created = await run_blocking(self.retry_pending, db, limit)
+                if created:
+                    logger.info("Добавлено отложенных слов: %d", created)
+            except Exception:
+                logger.exception("Ошибка перевода отложенных слов")
+            finally:
+                db.close()
+
+    async def run(
+            self,
+            db: Session,
+            current_user: dict,
+            url: Optional[str] = None,
+            text: Optional[str] = None,
+            progress: Optional[ProgressCallback] = None,
+            ) -> Dict:
+        """Выполняет парсинг с ограничением числа одновременных запусков
+
+        progress(stage, value) — синхронный колбэк, вызывается в пуле потоков.
+        """
+        async with parse_slots:
+            if progress:
+                await run_blocking(progress, "extract", 0.1)
+            words, source_message = await self.extract(db, url, text)
+            if progress:
+                await run_blocking(progress, "translate", 0.4)
+            saved = await self.save_words(db, current_user, words, progress)
+
+        return {
+                "source_message": source_message,
+                "total_count": len(words),
+                **saved,
+                }
@@ -1,25 +1,206 @@
+import codecs
+import logging
 import re
-from typing import List
-import requests
-from bs4 import BeautifulSoup
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from html.parser import HTMLParser
+from typing import Container, Iterable, Iterator, List, Optional
+import httpx
 from urllib.parse import urlparse
+from app.core.concurrency import run_blocking
+from app.core.config import settings
+from app.core.metrics import parse_stage_seconds
+from app.services.fetcher import Fetcher, get_fetcher
+from app.services.word_extraction import WordExtractor, create_lemmatizer
+
+try:
+    from lxml import etree
+except ImportError:
+    etree = None
+
+
+logger = logging.getLogger("app.parser")
+
+SKIP_TAGS = frozenset(("script", "style"))
+
+@dataclass
+class FetchResult:
+    words: List[str]
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    not_modified: bool = False
+    failed: bool = False
+    counts: Counter = field(default_factory=Counter)
+
+
+class _StdlibTextExtractor(HTMLParser):
+    """Потоковое извлечение текста на html.parser без построения DOM"""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self._skip = 0
+        self._parts: List[str] = []
+
+    def handle_starttag(self, tag, attrs):
+        if tag in SKIP_TAGS:
+            self._skip += 1
+        self._parts.append(" ")
+
+    def handle_endtag(self, tag):
+        if tag in SKIP_TAGS and self._skip:
+            self._skip -= 1
+        self._parts.append(" ")
+
+    def handle_data(self, data):
+        if not self._skip:
+            self._parts.append(data)
+
+    def feed_text(self, chunk: str) -> str:
+        self.feed(chunk)
+        return self._drain()
+
+    def close_text(self) -> str:
+        self.close()
+        return self._drain()
+
+    def _drain(self) -> str:
+        text = "".join(self._parts)
+        self._parts = []
+        return text
+
+
+class _LxmlTarget:
+    """Цель для потокового парсера lxml: собирает текст вне script/style"""
+
+    def __init__(self):
+        self.skip = 0
+        self.parts: List[str] = []
+
+    def start(self, tag, attrib):
+        if tag in SKIP_TAGS:
+            self.skip += 1
+        self.parts.append(" ")
+
+    def end(self, tag):
+        if tag in SKIP_TAGS and self.skip:
+            self.skip -= 1
+        self.parts.append(" ")
+
+    def data(self, data):
+        if not self.skip:
+            self.parts.append(data)
+
+    def comment(self, text):
+        pass
+
+    def close(self):
+        return None
+
+
+class _LxmlTextExtractor:
+    """Потоковое извлечение текста на lxml (если установлен)"""
+
+    def __init__(self):
+        self._target = _LxmlTarget()
+        self._parser = etree.HTMLParser(target=self._target)
+
+    def feed_text(self, chunk: str) -> str:
+        self._parser.feed(chunk)
+        return self._drain()
+
+    def close_text(self) -> str:
+        self._parser.close()
+        return self._drain()
+
+    def _drain(self) -> str:
+        text = "".join(self._target.parts)
+        self._target.parts = []
+        return text
+
+
+class HTMLWordStream:
+    """Принимает HTML по кускам и отдает сырые токены по мере разбора
+
+    Хвост, который может быть началом слова на границе кусков (в том числе
+    перенос через дефис), придерживается до следующего вызова.
+    """
+
+    _tail_pattern = re.compile(r"(?:[\w'’\u00ad]+-[ \t]*\r?\n\s*)*[\w'’\u00ad-]*\s*$")
+    # Слов такой длины не бывает: сплошной поток без границ (base64, минифицированный
+    # текст) не должен копиться в памяти, поэтому длинный хвост разбирается сразу
+    max_carry = 1024
+
+    def __init__(self, extractor: WordExtractor, backend: str = "auto"):
+        self.extractor = extractor
+        if backend == "lxml" or (backend == "auto" and etree is not None):
+            if etree is None:
+                raise RuntimeError("lxml не установлен")
+            self._extractor = _LxmlTextExtractor()
+        else:
+            self._extractor = _StdlibTextExtractor()
+        self._carry = ""
+
+    def feed(self, chunk: str) -> List[str]:
+        text = self._carry + self._extractor.feed_text(chunk)
+        tail = self._tail_pattern.search(text)
+        if tail and len(tail.group()) <= self.max_carry:
+            self._carry = tail.group()
+            text = text[:tail.start()]
+        else:
+            self._carry = ""
+        return self._words(text)
+
+    def close(self) -> List[str]:
+        text = self._carry + self._extractor.close_text()
+        self._carry = ""
+        return self._words(text)
+
+    def _words(self, text: str) -> List[str]:
+        return self.extractor.tokenize(text)
 
 
 class TextParser:
     """Парсер для английских слов из текста"""
-    def __init__(self):
-        self.word_pattern = re.compile(r'\b[a-zA-Z]+\b')
-        self.timeout = 5
+    def __init__(self, known_words: Optional[Container[str]] = None, fetcher: Optional[Fetcher] = None):
+        """known_words подтверждают леммы, найденные правилами (например, частотный словарь)
+
+        fetcher по умолчанию общий на воркер, чтобы все парсинги делили пул соединений.
+        """
+        self.extractor = WordExtractor(
+                lemmatizer=create_lemmatizer(
+                    settings.word_lemmatizer,
+                    settings.translation_source_lang,
+                    known_words,
+                    ),
+                stop_words=settings.word_stop_words,
+                min_length=settings.word_min_length,
+                )
+        self.fetcher = fetcher or get_fetcher()
+        self.chunk_size = settings.fetch_chunk_size
+        self.html_backend = settings.html_parser_backend
+
+    def count_words(self, text: str) -> Counter:
+        """Частоты нормальных форм слов текста"""
+        return self.extractor.count(text)
 
     def extract_words(self, text: str) -> List[str]:
-        """Извлекает английские слова"""
-        words = self.word_pattern.findall(text)
-        filtered_words = [
-                word.lower() for word in words
-                if len(word) >= 2 and word.isalpha()
-                ]
-        unique_words = list(set(filtered_words))
-        return unique_words
+        """Извлекает английские слова, самые частые первыми"""
+        return [word for word, _ in self.count_words(text).most_common()]
+
+    def iter_html_words(self, chunks: Iterable[str]) -> Iterator[str]:
+        """Генератор сырых токенов из HTML, поступающего кусками"""
+        stream = HTMLWordStream(self.extractor, self.html_backend)
+        for chunk in chunks:
+            yield from stream.feed(chunk)
+        yield from stream.close()
+
+    def count_html_words(self, chunks: Iterable[str]) -> Counter:
+        return self.extractor.normalize(Counter(self.iter_html_words(chunks)))
+
+    def extract_html_words(self, html: str) -> List[str]:
+        """Извлекает слова из HTML-документа"""
+        return [word for word, _ in self.count_html_words([html]).most_common()]
 
     def parser_url(self, url:str) -> List[str]:
         """Парсит веб-страницу"""
@@ -27,19 +208,95 @@ class TextParser:
             if not self._is_valid_url(url):
                 raise ValueError("Некорректный URL")
 
-            response = requests.get(url, timeout=self.timeout)
-            response.raise_for_status()
+            with self.fetcher.stream_sync(url) as response:
+                response.raise_for_status()
+                decoder = codecs.getincrementaldecoder(response.encoding or "utf-8")(errors="replace")
+
+                def chunks() -> Iterator[str]:
+                    for chunk in self.fetcher.iter_body(response, self.chunk_size):
+                        yield decoder.decode(chunk)
+                    yield decoder.decode(b"", final=True)
 
-            soup = BeautifulSoup(response.text, 'html.parser')
-            text = self._extract_clean_text(soup)
-            return self.extract_words(text)
-        except requests.RequestException as e:
-            print(f"Ошибка при запросе к url: {e}")
+                counts = self.count_html_words(chunks())
+                return [word for word, _ in counts.most_common()]
+        except httpx.HTTPError as e:
+            logger.warning("Ошибка при запросе к %s: %s", url, e)
             return []
         except Exception as e:
-            print(f"Ошибка при парсинге: {e}")
+            logger.warning("Ошибка при парсинге %s: %s", url, e)
             return []
 
+    async def afetch_words(
+            self,
+            url: str,
+            etag: Optional[str] = None,
+            last_modified: Optional[str] = None,
+            ) -> FetchResult:
+        """Потоково загружает страницу; с валидаторами делает условный запрос"""
+        try:
+            if not self._is_valid_url(url):
+                raise ValueError("Некорректный URL")
+
+            headers = {}
+            if etag:
+                headers["If-None-Match"] = etag
+            if last_modified:
+                headers["If-Modified-Since"] = last_modified
+
+            stream = HTMLWordStream(self.extractor, self.html_backend)
+            tokens = Counter()
+            started = time.perf_counter()
+            extract_seconds = 0.0
+
+            async def feed(text: str) -> None:
+                nonlocal extract_seconds
+                feed_started = time.perf_counter()
+                tokens.update(await run_blocking(stream.feed, text))
+                extract_seconds += time.perf_counter() - feed_started
+
+            async with self.fetcher.stream(url, headers=headers) as response:
+                if response.status_code == 304:
+                    parse_stage_seconds.observe(time.perf_counter() - started, stage="fetch")
+                    return FetchResult(
+                            words=[],
+                            not_modified=True,
+                            etag=response.headers.get("ETag", etag),
+                            last_modified=response.headers.get("Last-Modified", last_modified),
+                            )
+                response.raise_for_status()
+                decoder = codecs.getincrementaldecoder(response.encoding or "utf-8")(errors="replace")
+                async for chunk in self.fetcher.aiter_body(response, self.chunk_size):
+                    await feed(decoder.decode(chunk))
+                result_etag = response.headers.get("ETag")
+                result_last_modified = response.headers.get("Last-Modified")
+
+            await feed(decoder.decode(b"", final=True))
+            close_started = time.perf_counter()
+            tokens.update(await run_blocking(stream.close))
+            counts = await run_blocking(self.extractor.normalize, tokens)
+            extract_seconds += time.perf_counter() - close_started
+
+            # Разбор идет между чтениями тела, поэтому сеть — это остаток времени
+            parse_stage_seconds.observe(time.perf_counter() - started - extract_seconds, stage="fetch")
+            parse_stage_seconds.observe(extract_seconds, stage="html_extract")
+            return FetchResult(
+                    words=[word for word, _ in counts.most_common()],
+                    etag=result_etag,
+                    last_modified=result_last_modified,
+                    counts=counts,
+                    )
+        except httpx.HTTPError as e:
+            logger.warning("Ошибка при запросе к %s: %s", url, e)
+            return FetchResult(words=[], failed=True)
+        except Exception as e:
+            logger.warning("Ошибка при парсинге %s: %s", url, e)
+            return FetchResult(words=[], failed=True)
+
+    async def aparser_url(self, url: str) -> List[str]:
+        """Парсит веб-страницу потоково, не блокируя event loop"""
+        result = await self.afetch_words(url)
+        return result.words
+
     def _is_valid_url(self, url: str) -> bool:
         """Проверяет, является ли строка валидным url"""
         try:
@@ -47,15 +304,3 @@ class TextParser:
             return all([result.scheme, result.netloc])
         except:
             return False
-
-    def _extract_clean_text(self, soup: BeautifulSoup) -> str:
-        """Извлекает чистый текст из HTML, игнорируя скрипты и стили"""
-        for script in soup(["script", "style"]):
-            script.decompose()
-
-        text = soup.get_text()
-
-        lines = (line.strip() for line in text.splitlines())
-        chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
-        text = ' '.join(chunk for chunk in chunks if chunk)
-        return text
@@ -0,0 +1,308 @@
+import logging
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from deep_translator import GoogleTranslator
+
+from app.core.cache import LRUCache
+from app.core.config import Settings
+from app.core.metrics import registry
+from app.core.resilience import OPEN, CircuitBreaker, backoff_delay
+
+
+logger = logging.getLogger("app.translation")
+
+remote_calls = registry.counter(
+        "translation_remote_calls_total",
+        "Запросы к удаленному переводчику",
+        labelnames=("backend", "result"),
+        )
+remote_seconds = registry.histogram(
+        "translation_remote_seconds",
+        "Длительность одного запроса к удаленному переводчику",
+        labelnames=("backend",),
+        )
+
+
+class TranslationBackend:
+    """Интерфейс провайдера переводов"""
+
+    name = "base"
+
+    def translate(self, word: str) -> Optional[str]:
+        """Возвращает перевод или None, если провайдер его не знает"""
+        raise NotImplementedError
+
+    def translate_many(self, words: List[str]) -> Dict[str, str]:
+        """Переводит пачку слов; в ответе только найденные слова"""
+        translations = {}
+        for word in words:
+            translation = self.translate(word)
+            if translation:
+                translations[word] = translation
+        return translations
+
+    def translate_batch(self, words: List[str]) -> Tuple[Dict[str, str], List[str]]:
+        """Как translate_many, но еще возвращает слова, которые не удалось
+        перевести из-за недоступности провайдера: их стоит повторить позже"""
+        return self.translate_many(words), []
+
+    def available(self) -> bool:
+        """Стоит ли сейчас обращаться к провайдеру"""
+        return True
+
+    def suppressed(self, word: str) -> bool:
+        """Слово недавно не перевелось, и до истечения негативного кэша его не спрашивают"""
+        return False
+
+
+class GoogleBackend(TranslationBackend):
+    """Удаленный перевод через deep_translator.GoogleTranslator
+
+    Ошибка запроса повторяется retries раз с паузой backoff_delay. Слово,
+    которое так и не перевелось, попадает в негативный кэш на negative_ttl
+    секунд и до его истечения не запрашивается: повторный запрос такого
+    слова считается обычным промахом, а не недоступностью. Когда доля ошибок
+    превышает порог предохранителя, запросы не отправляются вовсе, пока
+    пробный вызов не пройдет успешно.
+    """
+
+    name = "google"
+
+    def __init__(
+            self,
+            source: str,
+            target: str,
+            workers: int,
+            breaker: Optional[CircuitBreaker] = None,
+            retries: int = 2,
+            backoff: float = 0.2,
+            backoff_max: float = 2.0,
+            negative_ttl: float = 600.0,
+            negative_size: int = 10000,
+            ):
+        self.source = source
+        self.target = target
+        self._local = threading.local()
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="translate")
+        self.breaker = breaker or CircuitBreaker(f"translation_{self.name}")
+        self.retries = retries
+        self.backoff = backoff
+        self.backoff_max = backoff_max
+        self.failed = LRUCache(maxsize=negative_size, ttl=negative_ttl)
+
+    def _translator(self):
+        """GoogleTranslator хранит параметры запроса в себе, поэтому у каждого потока свой"""
+        translator = getattr(self._local, "translator", None)
+        if translator is None:
+            translator = GoogleTranslator(source=self.source, target=self.target)
+            self._local.translator = translator
+        return translator
+
+    def _request(self, word: str) -> Optional[str]:
+        started = time.perf_counter()
+        try:
+            translation = self._translator().translate(word)
+            remote_calls.inc(backend=self.name, result="ok")
+            return translation
+        except Exception:
+            remote_calls.inc(backend=self.name, result="error")
+            raise
+        finally:
+            remote_seconds.observe(time.perf_counter() - started, backend=self.name)
+
+    def _translate(self, word: str) -> Tuple[Optional[str], bool]:
+        """Возвращает перевод и признак того, что провайдер был недоступен"""
+        if self.failed.get(word) is not None:
+            # Провайдер тут ни при чем: слово само не переводится, и его
+            # не стоит ставить в очередь на повтор
+            remote_calls.inc(backend=self.name, result="negative")
+            return None, False
+
+        for attempt in range(self.retries + 1):
+            if not self.breaker.allow():
+                remote_calls.inc(backend=self.name, result="open")
+                return None, True
+            try:
+                translation = self._request(word)
+            except Exception as e:
+                self.breaker.record(False)
+                error = e
+                if attempt < self.retries:
+                    time.sleep(backoff_delay(attempt, self.backoff, self.backoff_max))
+                continue
+            self.breaker.record(True)
+            return translation, False
+
+        logger.warning("Ошибка перевода слова '%s': %s", word, error)
+        self.failed.set(word, True)
+        return None, True
+
+    def translate(self, word: str) -> Optional[str]:
+        return self._translate(word)[0]
+
+    def translate_batch(self, words: List[str]) -> Tuple[Dict[str, str], List[str]]:
+        translations = {}
+        unavailable = []
+        for word, (translation, failed) in zip(words, self._pool.map(self._translate, words)):
+            if translation:
+                translations[word] = translation
+            elif failed:
+                unavailable.append(word)
+        return translations, unavailable
+
+    def translate_many(self, words: List[str]) -> Dict[str, str]:
+        return self.translate_batch(words)[0]
+
+    def available(self) -> bool:
+        return self.breaker.state != OPEN
+
+    def suppressed(self, word: str) -> bool:
+        return self.failed.get(word) is not None
+
+
+class LocalDictionaryBackend(TranslationBackend):
+    """Офлайн-словарь в SQLite: таблица WITHOUT ROWID, отсортированная по слову"""
+
+    name = "local"
+    chunk_size = 500
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+
+    def _connection(self) -> Optional[sqlite3.Connection]:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            if not os.path.exists(self.path):
+                return None
+            conn = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True, check_same_thread=False)
+            conn.execute("PRAGMA query_only = ON")
+            conn.execute("PRAGMA mmap_size = 268435456")
+            self._local.conn = conn
+        return conn
+
+    def translate(self, word: str) -> Optional[str]:
+        conn = self._connection()
+        if conn is None:
+            return None
+        row = conn.execute(
+                "SELECT translation FROM dictionary WHERE word = ?", (word,)
+                ).fetchone()
+        return row[0] if row else None
+
+    def translate_many(self, words: List[str]) -> Dict[str, str]:
+        conn = self._connection()
+        if conn is None:
+            return {}
+        translations = {}
+        for start in range(0, len(words), self.chunk_size):
+            chunk = words[start:start + self.chunk_size]
+            placeholders = ",".join("?" * len(chunk))
+            rows = conn.execute(
+                    f"SELECT word, translation FROM dictionary WHERE word IN ({placeholders})",
+                    chunk,
+                    )
+            translations.update(rows)
+        return translations
+
+    @staticmethod
+    def build(path: str, rows: Iterable[Tuple[str, str]]) -> int:
+        """Собирает файл словаря из пар (слово, перевод)"""
+        tmp_path = f"{path}.tmp"
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        conn = sqlite3.connect(tmp_path)
+        try:
+            conn.execute(
+                    "CREATE TABLE dictionary ("
+                    "word TEXT PRIMARY KEY, translation TEXT NOT NULL"
+                    ") WITHOUT ROWID"
+                    )
+            conn.executemany(
+                    "INSERT OR REPLACE INTO dictionary (word, translation) VALUES (?, ?)",
+                    ((word.strip().lower(), translation.strip()) for word, translation in rows),
+                    )
+            conn.commit()
+            count = conn.execute("SELECT COUNT(*) FROM dictionary").fetchone()[0]
+            conn.execute("VACUUM")
+        finally:
+            conn.close()
+        os.replace(tmp_path, path)
+        return count
+
+
+class ChainBackend(TranslationBackend):
+    """Опрашивает провайдеров по очереди, дальше передаются только промахи"""
+
+    name = "chain"
+
+    def __init__(self, backends: List[TranslationBackend]):
+        self.backends = backends
+
+    def translate(self, word: str) -> Optional[str]:
+        for backend in self.backends:
+            translation = backend.translate(word)
+            if translation:
+                return translation
+        return None
+
+    def translate_many(self, words: List[str]) -> Dict[str, str]:
+        return self.translate_batch(words)[0]
+
+    def translate_batch(self, words: List[str]) -> Tuple[Dict[str, str], List[str]]:
+        translations = {}
+        unavailable = set()
+        remaining = list(words)
+        for backend in self.backends:
+            if not remaining:
+                break
+            found, failed = backend.translate_batch(remaining)
+            translations.update(found)
+            unavailable.update(failed)
+            remaining = [word for word in remaining if word not in translations]
+        return translations, [word for word in remaining if word in unavailable]
+
+    def available(self) -> bool:
+        return all(backend.available() for backend in self.backends)
+
+    def suppressed(self, word: str) -> bool:
+        return any(backend.suppressed(word) for backend in self.backends)
+
+
+def _google_backend(settings: Settings) -> GoogleBackend:
+    return GoogleBackend(
+            settings.translation_source_lang,
+            settings.translation_target_lang,
+            settings.translation_workers,
+            breaker=CircuitBreaker(
+                "translation_google",
+                threshold=settings.translation_breaker_threshold,
+                window=settings.translation_breaker_window,
+                min_calls=settings.translation_breaker_min_calls,
+                reset_timeout=settings.translation_breaker_reset,
+                ),
+            retries=settings.translation_retries,
+            backoff=settings.translation_backoff,
+            backoff_max=settings.translation_backoff_max,
+            negative_ttl=settings.translation_negative_ttl,
+            )
+
+
+def create_backend(settings: Settings) -> TranslationBackend:
+    """Создает провайдер по settings.translation_backend"""
+    kind = settings.translation_backend
+    if kind == "google":
+        return _google_backend(settings)
+    if kind == "local":
+        return LocalDictionaryBackend(settings.local_dictionary_path)
+    if kind == "chain":
+        return ChainBackend([
+            LocalDictionaryBackend(settings.local_dictionary_path),
+            _google_backend(settings),
+            ])
+    raise ValueError(f"Неизвестный провайдер перевода: {kind}")
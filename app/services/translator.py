@@ -1,40 +1,301 @@
-from deep_translator import GoogleTranslator
-from typing import Dict
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+from app.core.concurrency import run_blocking, run_db
+from app.core.config import settings
+from app.core.database import dialect_insert
+from app.core.metrics import parse_stage_seconds, registry
+from app.core.shared_cache import create_cache
 from app.models.word import Word
+from app.services.translation_backends import TranslationBackend, create_backend
 from sqlalchemy.orm import Session
 
+translated_words = registry.counter(
+        "translation_words_total",
+        "Откуда взят перевод слова при пакетном переводе",
+        labelnames=("source",),
+        )
+
+
+def _chunks(items: List[str], size: int) -> Iterator[List[str]]:
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+class PendingWords:
+    """Очередь слов, не переведенных из-за недоступности провайдера
+
+    Для каждого слова помнит пользователей, которым его нужно добавить
+    после перевода, и число неудачных повторов. Слово, которое не
+    перевелось max_attempts раз при работающем провайдере, выбрасывается.
+    При переполнении отбрасываются самые старые слова.
+    """
+
+    def __init__(self, maxsize: int, max_attempts: int = 5):
+        self.maxsize = maxsize
+        self.max_attempts = max_attempts
+        self._words: "OrderedDict[str, Tuple[Set[int], int]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.dropped = 0
+        self.given_up = 0
+
+    def add(self, words: Iterable[str], user_ids: Iterable[Optional[int]] = (), attempts: int = 0) -> None:
+        """Ставит слова в конец очереди; attempts — сколько повторов уже не удалось"""
+        users = {user_id for user_id in user_ids if user_id is not None}
+        with self._lock:
+            for word in words:
+                queued_users, queued_attempts = self._words.pop(word, (set(), 0))
+                word_attempts = max(attempts, queued_attempts)
+                if word_attempts >= self.max_attempts:
+                    self.given_up += 1
+                    continue
+                self._words[word] = (queued_users | users, word_attempts)
+            while len(self._words) > self.maxsize:
+                self._words.popitem(last=False)
+                self.dropped += 1
+
+    def take(self, limit: int) -> Dict[str, Tuple[Set[int], int]]:
+        """Забирает из очереди до limit самых старых слов с пользователями и числом повторов"""
+        with self._lock:
+            batch = {}
+            while self._words and len(batch) < limit:
+                word, item = self._words.popitem(last=False)
+                batch[word] = item
+            return batch
+
+    def __len__(self) -> int:
+        return len(self._words)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "size": len(self._words),
+            "maxsize": self.maxsize,
+            "dropped": self.dropped,
+            "given_up": self.given_up,
+        }
+
 
 class TranslationService:
     """Сервис для перевода слов"""
-    
-    def __init__(self):
-        self.translator = GoogleTranslator(source='en', target='ru')
-    
+
+    def __init__(self, backend: TranslationBackend | None = None):
+        self.backend = backend or create_backend(settings)
+        self.batch_size = settings.translation_batch_size
+        self.last_batch_metrics: Dict[str, float] = {}
+        self.cache = create_cache(
+                settings.translation_cache_backend,
+                maxsize=settings.translation_cache_size,
+                ttl=settings.translation_cache_ttl,
+                path=settings.translation_cache_path,
+                slot_size=settings.translation_cache_slot_size,
+                redis_url=settings.translation_cache_redis_url,
+                )
+        self.pending = PendingWords(settings.translation_pending_size, settings.translation_pending_attempts)
+
     def translate_word(self, word: str, db: Session) -> str:
-        """Переводит слово или берет из базы"""
-        
-        existing_word = db.query(Word).filter(Word.word == word.lower()).first()
-        
+        """Переводит слово или берет из кэша/базы"""
+        key = word.lower()
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+
+        existing_word = db.query(Word).filter(Word.word == key).first()
+
         if existing_word is not None and existing_word.translation is not None:
-            return str(existing_word.translation)  
-        
-        try:
-            translation = self.translator.translate(word)
-            
-            new_word = Word(word=word.lower(), translation=translation)
-            db.add(new_word)
-            db.commit()
-            
-            return translation
-            
-        except Exception as e:
-            print(f"Ошибка перевода слова '{word}': {e}")
-            return word  
-    
-    def translate_words(self, words: list[str], db: Session) -> Dict[str, str]:
-        """Переводит список слов"""
+            self.cache.set(key, str(existing_word.translation))
+            return str(existing_word.translation)
+
+        translations, unavailable = self.backend.translate_batch([key])
+        translation = translations.get(key)
+        if not translation:
+            self.pending.add(unavailable)
+            return word
+
+        new_word = Word(word=key, translation=translation)
+        db.add(new_word)
+        db.commit()
+        self.cache.set(key, translation)
+
+        return translation
+
+    def invalidate(self, word: str) -> None:
+        """Сбрасывает кэш слова после ручного изменения перевода"""
+        self.cache.pop(word.lower())
+
+    def cache_stats(self) -> Dict[str, int]:
+        return self.cache.stats()
+
+    def _lookup_known(self, words: List[str], db: Session) -> Dict[str, str]:
+        """Одним запросом на пачку достает уже переведенные слова"""
+        known = {}
+        for chunk in _chunks(words, self.batch_size):
+            rows = (
+                    db.query(Word.word, Word.translation)
+                    .filter(Word.word.in_(chunk))
+                    .all()
+                    )
+            known.update({word: translation for word, translation in rows if translation is not None})
+        return known
+
+    def _store_translations(self, translations: Dict[str, str], db: Session) -> None:
+        """Сохраняет новые переводы одной вставкой, дубликаты пропускаются"""
+        if not translations:
+            return
+        insert = dialect_insert(db)
+        rows = [{"word": word, "translation": translation} for word, translation in translations.items()]
+        for chunk in _chunks(rows, self.batch_size):
+            stmt = (
+                    insert(Word)
+                    .values(chunk)
+                    .on_conflict_do_nothing(index_elements=["word"])
+                    )
+            db.execute(stmt)
+        db.commit()
+
+    def translate_words(self, words: list[str], db: Session, user_id: Optional[int] = None) -> Dict[str, str]:
+        """Переводит список слов пачкой: один запрос к базе, перевод только промахов
+
+        Слова, которые не перевелись из-за недоступности провайдера, уходят
+        в очередь pending вместе с user_id и переводятся позже в фоне.
+        """
+        started = time.perf_counter()
+        unique_words = list(dict.fromkeys(word.lower() for word in words))
+        cached = self.cache.get_many(unique_words)
+        from_db = self._lookup_known([word for word in unique_words if word not in cached], db)
+        lookup_done = time.perf_counter()
+
+        misses = [word for word in unique_words if word not in cached and word not in from_db]
+        translated, unavailable = self.backend.translate_batch(misses) if misses else ({}, [])
+        translate_done = time.perf_counter()
+
+        self._store_translations(translated, db)
+        self.cache.set_many({**from_db, **translated})
+        return self._finish_batch(
+                words, unique_words, cached, from_db, translated, unavailable, user_id,
+                (started, lookup_done, translate_done, time.perf_counter()),
+                )
+
+    async def atranslate_words(self, words: list[str], db, user_id: Optional[int] = None) -> Dict[str, str]:
+        """То же, что translate_words, для event loop
+
+        Через run_db идут только запросы к базе; обращения к провайдеру с
+        повторами и паузами, а также к внешнему кэшу выполняются в пуле
+        run_blocking и не держат event loop даже с AsyncSession.
+        """
+        started = time.perf_counter()
+        unique_words = list(dict.fromkeys(word.lower() for word in words))
+        cached = await run_blocking(self.cache.get_many, unique_words)
+        from_db = await run_db(db, self._lookup_known_db, [word for word in unique_words if word not in cached])
+        lookup_done = time.perf_counter()
+
+        misses = [word for word in unique_words if word not in cached and word not in from_db]
+        translated, unavailable = (
+                await run_blocking(self.backend.translate_batch, misses) if misses else ({}, [])
+                )
+        translate_done = time.perf_counter()
+
+        await run_db(db, self._store_translations_db, translated)
+        await run_blocking(self.cache.set_many, {**from_db, **translated})
+        return self._finish_batch(
+                words, unique_words, cached, from_db, translated, unavailable, user_id,
+                (started, lookup_done, translate_done, time.perf_counter()),
+                )
+
+    def _lookup_known_db(self, db: Session, words: List[str]) -> Dict[str, str]:
+        return self._lookup_known(words, db)
+
+    def _store_translations_db(self, db: Session, translations: Dict[str, str]) -> None:
+        self._store_translations(translations, db)
+
+    def _finish_batch(
+            self,
+            words: List[str],
+            unique_words: List[str],
+            cached: Dict[str, str],
+            from_db: Dict[str, str],
+            translated: Dict[str, str],
+            unavailable: List[str],
+            user_id: Optional[int],
+            timings: tuple,
+            ) -> Dict[str, str]:
+        """Ставит недоступные слова в очередь, пишет метрики и собирает ответ"""
+        if unavailable:
+            self.pending.add(unavailable, [user_id])
+        started, lookup_done, translate_done, finished = timings
+        misses = len(unique_words) - len(cached) - len(from_db)
+        failed = misses - len(translated) - len(unavailable)
+
+        self.last_batch_metrics = {
+                "words": len(words),
+                "unique": len(unique_words),
+                "cached": len(cached),
+                "known": len(cached) + len(from_db),
+                "translated": len(translated),
+                "failed": failed,
+                "pending": len(unavailable),
+                "lookup_seconds": lookup_done - started,
+                "translate_seconds": translate_done - lookup_done,
+                "store_seconds": finished - translate_done,
+                "total_seconds": finished - started,
+                }
+        parse_stage_seconds.observe(lookup_done - started, stage="db_lookup")
+        parse_stage_seconds.observe(translate_done - lookup_done, stage="translate_remote")
+        parse_stage_seconds.observe(finished - translate_done, stage="store")
+        translated_words.inc(len(cached), source="cache")
+        translated_words.inc(len(from_db), source="db")
+        translated_words.inc(len(translated), source="backend")
+        translated_words.inc(failed, source="failed")
+        translated_words.inc(len(unavailable), source="pending")
+
         translations = {}
         for word in words:
-            translation = self.translate_word(word, db)
-            translations[word] = translation
+            key = word.lower()
+            translations[word] = cached.get(key) or from_db.get(key) or translated.get(key) or word
         return translations
+
+    def retranslate_pending(self, db: Session, limit: int) -> Dict[int, List[str]]:
+        """Переводит слова из очереди pending, если провайдер снова доступен
+
+        Переводы сохраняются в базу и кэш. Слова из негативного кэша
+        провайдера не запрашиваются и ждут в очереди его истечения. Слово,
+        которое не перевелось при работающем провайдере, возвращается в
+        очередь с увеличенным счетчиком повторов; во время простоя счетчик
+        не растет. Возвращает переведенные слова по пользователям, которым
+        их нужно добавить.
+        """
+        if not self.pending or not self.backend.available():
+            return {}
+        batch = self.pending.take(limit)
+        words = list(batch)
+
+        known = self._lookup_known(words, db)
+        deferred = [word for word in words if word not in known and self.backend.suppressed(word)]
+        skipped = set(deferred)
+        misses = [word for word in words if word not in known and word not in skipped]
+        # Первое слово идет пробным вызовом: после простоя предохранитель
+        # пропускает один запрос, и остальные слова пачки не должны в него упереться
+        translated, unavailable = self.backend.translate_batch(misses[:1]) if misses else ({}, [])
+        if misses[1:] and not unavailable:
+            rest, unavailable = self.backend.translate_batch(misses[1:])
+            translated.update(rest)
+        else:
+            deferred += misses[1:]
+        self._store_translations(translated, db)
+        self.cache.set_many({**known, **translated})
+
+        # Если предохранитель разомкнулся, виноват простой, а не слова
+        own_failure = self.backend.available()
+        for word in unavailable:
+            users, attempts = batch[word]
+            self.pending.add([word], users, attempts + 1 if own_failure else attempts)
+        for word in deferred:
+            users, attempts = batch[word]
+            self.pending.add([word], users, attempts)
+        translated_words.inc(len(translated), source="retry")
+
+        by_user: Dict[int, List[str]] = {}
+        for word in {**known, **translated}:
+            for user_id in batch[word][0]:
+                by_user.setdefault(user_id, []).append(word)
+        return by_user
@@ -0,0 +1,131 @@
+import hashlib
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+from sqlalchemy import func
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from app.models.url_cache import UrlCacheEntry
+
+
+@dataclass
+class CachedPage:
+    etag: Optional[str]
+    last_modified: Optional[str]
+    content_hash: str
+    words: List[str]
+
+
+class UrlCache:
+    """Кэш извлеченных со страниц слов в БД с вытеснением давно не использованных"""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self.not_modified = 0
+        self.unchanged = 0
+        self.stored = 0
+        self.evictions = 0
+
+    @staticmethod
+    def hash_words(words: List[str]) -> str:
+        return hashlib.sha256(" ".join(sorted(words)).encode()).hexdigest()
+
+    def get(self, db: Session, url: str) -> Optional[CachedPage]:
+        entry = db.get(UrlCacheEntry, url)
+        if entry is None:
+            return None
+        return CachedPage(
+                etag=entry.etag,
+                last_modified=entry.last_modified,
+                content_hash=entry.content_hash,
+                words=entry.words.split(),
+                )
+
+    def touch(self, db: Session, url: str, etag: Optional[str], last_modified: Optional[str]) -> None:
+        """Отмечает использование записи после ответа 304"""
+        self.not_modified += 1
+        (
+            db.query(UrlCacheEntry)
+            .filter(UrlCacheEntry.url == url)
+            .update({
+                "etag": etag,
+                "last_modified": last_modified,
+                "last_used_at": datetime.now(timezone.utc),
+                })
+        )
+        db.commit()
+
+    def store(
+            self,
+            db: Session,
+            url: str,
+            etag: Optional[str],
+            last_modified: Optional[str],
+            words: List[str],
+            ) -> None:
+        """Сохраняет результат; если набор слов не изменился, обновляет только валидаторы"""
+        if not etag and not last_modified:
+            return
+
+        now = datetime.now(timezone.utc)
+        content_hash = self.hash_words(words)
+        entry = db.get(UrlCacheEntry, url)
+        if entry is None:
+            db.add(UrlCacheEntry(
+                url=url,
+                etag=etag,
+                last_modified=last_modified,
+                content_hash=content_hash,
+                words=" ".join(words),
+                word_count=len(words),
+                fetched_at=now,
+                last_used_at=now,
+                ))
+            self.stored += 1
+        else:
+            entry.etag = etag
+            entry.last_modified = last_modified
+            entry.last_used_at = now
+            if entry.content_hash == content_hash:
+                self.unchanged += 1
+            else:
+                entry.content_hash = content_hash
+                entry.words = " ".join(words)
+                entry.word_count = len(words)
+                entry.fetched_at = now
+                self.stored += 1
+
+        try:
+            db.commit()
+        except IntegrityError:
+            # Ту же страницу одновременно сохранил другой воркер
+            db.rollback()
+            return
+        self._evict(db)
+
+    def _evict(self, db: Session) -> None:
+        count = db.query(func.count(UrlCacheEntry.url)).scalar()
+        excess = count - self.max_entries
+        if excess <= 0:
+            return
+        stale = (
+                db.query(UrlCacheEntry.url)
+                .order_by(UrlCacheEntry.last_used_at)
+                .limit(excess)
+                .subquery()
+                )
+        (
+            db.query(UrlCacheEntry)
+            .filter(UrlCacheEntry.url.in_(db.query(stale.c.url)))
+            .delete(synchronize_session=False)
+        )
+        db.commit()
+        self.evictions += excess
+
+    def stats(self) -> Dict[str, int]:
+        return {
+                "not_modified": self.not_modified,
+                "unchanged": self.unchanged,
+                "stored": self.stored,
+                "evictions": self.evictions,
+                }
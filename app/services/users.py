@@ -1,15 +1,57 @@
+from typing import Dict
 from sqlalchemy.orm import Session
+from app.core.cache import LRUCache
+from app.core.config import settings
+from app.core.database import dialect_insert
+from app.core.metrics import registry
 from app.models.user import User
 
 
-def get_or_create_user(db: Session, current_user: dict) -> User:
-    user = db.query(User).filter(User.kc_sub == current_user["sub"]).first()
-    if user is None:
-        user = User(
-                kc_sub=current_user["sub"],
-                username=current_user.get("username") or "unknown",
-                )
-        db.add(user)
+# kc_sub -> users.id; запись пользователя после создания не меняется,
+# поэтому кэш не нужно инвалидировать
+_user_ids = LRUCache(maxsize=settings.user_cache_size)
+
+
+def get_or_create_user_id(db: Session, current_user: dict) -> int:
+    """Возвращает id пользователя по kc_sub, создавая запись при первом входе
+
+    Вставка идет через ON CONFLICT DO NOTHING, поэтому одновременный первый
+    вход в нескольких воркерах не падает на уникальном индексе.
+    """
+    kc_sub = current_user["sub"]
+    user_id = _user_ids.get(kc_sub)
+    if user_id is not None:
+        return user_id
+
+    user_id = db.query(User.id).filter(User.kc_sub == kc_sub).scalar()
+    if user_id is None:
+        insert = dialect_insert(db)
+        user_id = db.execute(
+                insert(User)
+                .values(
+                    kc_sub=kc_sub,
+                    username=current_user.get("username") or "unknown",
+                    )
+                .on_conflict_do_nothing(index_elements=["kc_sub"])
+                .returning(User.id)
+                ).scalar()
+        if user_id is None:
+            user_id = db.query(User.id).filter(User.kc_sub == kc_sub).scalar()
         db.commit()
-        db.refresh(user)
-    return user
+
+    _user_ids.set(kc_sub, user_id)
+    return user_id
+
+
+def get_or_create_user(db: Session, current_user: dict) -> User:
+    return db.get(User, get_or_create_user_id(db, current_user))
+
+
+def user_cache_stats() -> Dict[str, int]:
+    """Попадания в кэш — это сэкономленные запросы к users"""
+    stats = _user_ids.stats()
+    stats["queries_saved"] = stats["hits"]
+    return stats
+
+
+registry.register_stats("user_id_cache", "Кэш kc_sub -> users.id", user_cache_stats)
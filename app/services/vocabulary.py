@@ -0,0 +1,374 @@
+import csv
+import io
+import re
+from typing import IO, Dict, Iterable, Iterator, List, Optional, Tuple
+from sqlalchemy import Column, Float, Integer, MetaData, String, Table, func, literal, select
+from sqlalchemy.orm import Query, Session
+from app.core.database import SessionLocal, dialect_insert
+from app.models.word import Word
+from app.models.user_word import UserWord
+
+
+def words_page_query(db: Session, user_id: int, after: Optional[str] = None, limit: int = 100) -> Query:
+    """Запрос страницы слов: на одну строку больше limit, чтобы узнать, есть ли следующая"""
+    query = (
+            db.query(Word.id, Word.word, Word.translation, UserWord.score)
+            .join(UserWord, UserWord.word_id == Word.id)
+            .filter(UserWord.user_id == user_id)
+            )
+    if after:
+        query = query.filter(Word.word > after)
+    return query.order_by(Word.word).limit(limit + 1)
+
+
+def get_words_page(
+        db: Session,
+        user_id: int,
+        after: Optional[str] = None,
+        limit: int = 100,
+        ) -> Dict:
+    """Страница слов пользователя с keyset-пагинацией по Word.word"""
+    rows = words_page_query(db, user_id, after, limit).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    words: List[Dict] = [
+            {
+                "id": word_id,
+                "word": word,
+                "translation": translation,
+                "score": score,
+                }
+            for word_id, word, translation, score in rows
+            ]
+    return {
+            "words": words,
+            "next_after": words[-1]["word"] if has_more else None,
+            }
+
+
+def count_user_words(db: Session, user_id: int) -> int:
+    return (
+            db.query(func.count(UserWord.id))
+            .filter(UserWord.user_id == user_id)
+            .scalar()
+            )
+
+
+def delete_user_word(db: Session, user_id: int, word_id: int) -> bool:
+    """Убирает слово из словаря пользователя"""
+    user_word = (
+            db.query(UserWord)
+            .filter(UserWord.user_id == user_id, UserWord.word_id == word_id)
+            .first()
+            )
+    if user_word is None:
+        return False
+    db.delete(user_word)
+    db.commit()
+    return True
+
+
+def edit_translation(db: Session, user_id: int, word_id: int, translation: str) -> Optional[str]:
+    """Меняет перевод слова пользователя, возвращает само слово или None"""
+    word = (
+            db.query(Word)
+            .join(UserWord, UserWord.word_id == Word.id)
+            .filter(UserWord.user_id == user_id, Word.id == word_id)
+            .first()
+            )
+    if word is None:
+        return None
+    word.translation = translation.strip()
+    db.commit()
+    return word.word
+
+
+def set_word_score(db: Session, user_id: int, word_id: int, score: float) -> None:
+    """Выставляет рейтинг слова, при необходимости добавляя его пользователю"""
+    user_word = (
+            db.query(UserWord)
+            .filter(UserWord.user_id == user_id, UserWord.word_id == word_id)
+            .first()
+            )
+    if user_word is None:
+        user_word = UserWord(user_id=user_id, word_id=word_id, score=0.0)
+        db.add(user_word)
+    user_word.score = float(score)
+    db.commit()
+
+
+EXPORT_FORMATS = ("csv", "anki")
+ANKI_HEADER = "#separator:tab\n#html:false\n"
+
+# Строка импорта: слово, перевод, рейтинг
+ImportRow = Tuple[str, str, Optional[float]]
+
+_staging = Table(
+        "vocabulary_import",
+        MetaData(),
+        Column("word", String, nullable=False),
+        Column("translation", String, nullable=False),
+        Column("score", Float),
+        prefixes=["TEMPORARY"],
+        )
+
+_html_tag = re.compile(r"<[^>]+>")
+
+
+def _export_query(db: Session, user_id: Optional[int], fmt: str):
+    """Запрос выгрузки: слова пользователя или весь словарь, если user_id не задан"""
+    score = UserWord.score if user_id is not None else literal(None).label("score")
+    columns = [Word.word, Word.translation] if fmt == "anki" else [Word.word, Word.translation, score]
+    query = db.query(*columns)
+    if user_id is not None:
+        query = query.join(UserWord, UserWord.word_id == Word.id).filter(UserWord.user_id == user_id)
+    return query.order_by(Word.word)
+
+
+def _export_header(fmt: str) -> str:
+    return ANKI_HEADER if fmt == "anki" else "word,translation,score\r\n"
+
+
+def _csv_writer(buffer: io.StringIO, fmt: str):
+    if fmt == "anki":
+        return csv.writer(buffer, delimiter="\t", quoting=csv.QUOTE_MINIMAL, lineterminator="\n")
+    return csv.writer(buffer)
+
+
+def iter_words_export(user_id: Optional[int], fmt: str = "csv", chunk_size: int = 1000) -> Iterator[str]:
+    """Потоково отдает слова в CSV или TSV для Anki кусками по chunk_size строк
+
+    Открывает собственную сессию: генератор живет дольше зависимости get_db.
+    Строки читаются с yield_per, поэтому в памяти только текущий кусок.
+    """
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Неизвестный формат: {fmt}")
+    db = SessionLocal()
+    try:
+        rows = _export_query(db, user_id, fmt).execution_options(yield_per=chunk_size)
+        buffer = io.StringIO()
+        buffer.write(_export_header(fmt))
+        writer = _csv_writer(buffer, fmt)
+        for count, row in enumerate(rows, start=1):
+            writer.writerow(row)
+            if count % chunk_size == 0:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+        yield buffer.getvalue()
+    finally:
+        db.close()
+
+
+def iter_words_csv(user_id: int, chunk_size: int = 1000) -> Iterator[str]:
+    return iter_words_export(user_id, "csv", chunk_size)
+
+
+def _copy_cursor(db: Session):
+    """Курсор psycopg2 с copy_expert или None, если COPY недоступен"""
+    if db.get_bind().dialect.name != "postgresql":
+        return None
+    cursor = db.connection().connection.cursor()
+    if not hasattr(cursor, "copy_expert"):
+        cursor.close()
+        return None
+    return cursor
+
+
+def export_words_to_file(db: Session, out: IO[str], user_id: Optional[int], fmt: str = "csv") -> None:
+    """Пишет выгрузку в файл; на PostgreSQL через COPY ... TO STDOUT"""
+    cursor = _copy_cursor(db)
+    if cursor is None:
+        for chunk in iter_words_export(user_id, fmt):
+            out.write(chunk)
+        return
+
+    query = _export_query(db, user_id, fmt).statement.compile(
+            dialect=db.get_bind().dialect,
+            compile_kwargs={"literal_binds": True},
+            )
+    options = "FORMAT csv, DELIMITER E'\\t'" if fmt == "anki" else "FORMAT csv"
+    out.write(_export_header(fmt))
+    try:
+        cursor.copy_expert(f"COPY ({query}) TO STDOUT WITH ({options})", out)
+    finally:
+        cursor.close()
+
+
+def read_import_rows(source: IO[str], fmt: str = "csv") -> Iterator[ImportRow]:
+    """Разбирает CSV (word,translation[,score]) или TSV-экспорт Anki (лицевая<TAB>оборотная)
+
+    Слова приводятся к нижнему регистру, строки без слова или перевода
+    пропускаются.
+    """
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Неизвестный формат: {fmt}")
+    if fmt == "anki":
+        lines = (line for line in source if not line.startswith("#"))
+        reader = csv.reader(lines, delimiter="\t")
+    else:
+        reader = csv.reader(source)
+
+    for index, row in enumerate(reader):
+        if len(row) < 2:
+            continue
+        if fmt == "anki":
+            row = [_html_tag.sub("", field) for field in row]
+        word, translation = row[0].strip().lower(), row[1].strip()
+        if index == 0 and fmt == "csv" and word == "word":
+            continue
+        if not word or not translation:
+            continue
+        score = None
+        if len(row) > 2 and row[2].strip():
+            try:
+                score = float(row[2])
+            except ValueError:
+                pass
+        yield word, translation, score
+
+
+class _CopySource(io.TextIOBase):
+    """Файлоподобная обертка над строками для COPY FROM STDIN без буферизации всего файла"""
+
+    def __init__(self, rows: Iterable[ImportRow]):
+        self._rows = iter(rows)
+        self._buffer = ""
+        self._writer_buffer = io.StringIO()
+        self._writer = csv.writer(self._writer_buffer, lineterminator="\n")
+        self.count = 0
+
+    def _next_line(self) -> str:
+        row = next(self._rows, None)
+        if row is None:
+            return ""
+        self.count += 1
+        self._writer_buffer.seek(0)
+        self._writer_buffer.truncate()
+        self._writer.writerow(row)
+        return self._writer_buffer.getvalue()
+
+    def read(self, size: int = -1) -> str:
+        while size < 0 or len(self._buffer) < size:
+            line = self._next_line()
+            if not line:
+                break
+            self._buffer += line
+        if size < 0:
+            data, self._buffer = self._buffer, ""
+        else:
+            data, self._buffer = self._buffer[:size], self._buffer[size:]
+        return data
+
+    def readline(self, size: int = -1) -> str:
+        return self._next_line()
+
+
+def _load_staging(db: Session, rows: Iterable[ImportRow], batch_size: int) -> int:
+    """Заливает строки во временную таблицу: COPY на PostgreSQL, пачками INSERT иначе"""
+    cursor = _copy_cursor(db)
+    if cursor is not None:
+        source = _CopySource(rows)
+        try:
+            cursor.copy_expert(
+                    f"COPY {_staging.name} (word, translation, score) FROM STDIN WITH (FORMAT csv)",
+                    source,
+                    )
+        finally:
+            cursor.close()
+        return source.count
+
+    loaded = 0
+    batch = []
+    for word, translation, score in rows:
+        batch.append({"word": word, "translation": translation, "score": score})
+        if len(batch) >= batch_size:
+            db.execute(_staging.insert(), batch)
+            loaded += len(batch)
+            batch = []
+    if batch:
+        db.execute(_staging.insert(), batch)
+        loaded += len(batch)
+    return loaded
+
+
+def import_words(
+        db: Session,
+        rows: Iterable[ImportRow],
+        user_id: Optional[int] = None,
+        overwrite: bool = False,
+        batch_size: int = 5000,
+        ) -> Dict[str, int]:
+    """Массовый импорт слов через временную таблицу и слияние одним запросом
+
+    Новые слова добавляются в words, существующие переводы меняются только
+    при overwrite. Если задан user_id, все слова файла привязываются к
+    пользователю с рейтингом из файла (или 0), уже привязанные не трогаются.
+    """
+    insert = dialect_insert(db)
+    connection = db.connection()
+    _staging.drop(connection, checkfirst=True)
+    _staging.create(connection)
+    loaded = _load_staging(db, rows, batch_size)
+
+    # Дубликаты внутри файла схлопываются группировкой
+    staged = (
+            select(
+                _staging.c.word,
+                func.max(_staging.c.translation).label("translation"),
+                func.max(_staging.c.score).label("score"),
+                )
+            .group_by(_staging.c.word)
+            .subquery()
+            )
+    words_stmt = insert(Word).from_select(
+            ["word", "translation"],
+            select(staged.c.word, staged.c.translation).where(staged.c.word != ""),
+            )
+    if overwrite:
+        words_stmt = words_stmt.on_conflict_do_update(
+                index_elements=["word"],
+                set_={"translation": words_stmt.excluded.translation},
+                )
+    else:
+        words_stmt = words_stmt.on_conflict_do_nothing(index_elements=["word"])
+    words_written = db.execute(words_stmt).rowcount
+
+    linked = 0
+    if user_id is not None:
+        links = (
+                select(
+                    literal(user_id, Integer),
+                    Word.id,
+                    func.coalesce(staged.c.score, 0.0),
+                    )
+                .join(staged, staged.c.word == Word.word)
+                .where(staged.c.word != "")
+                )
+        linked = db.execute(
+                insert(UserWord)
+                .from_select(["user_id", "word_id", "score"], links)
+                .on_conflict_do_nothing(index_elements=["user_id", "word_id"])
+                ).rowcount
+    _staging.drop(connection)
+    db.commit()
+
+    return {"rows": loaded, "words_written": words_written, "linked": linked}
+
+
+def import_words_file(
+        source: IO[str],
+        fmt: str = "csv",
+        user_id: Optional[int] = None,
+        overwrite: bool = False,
+        ) -> Dict[str, int]:
+    """Импортирует файл в собственной синхронной сессии (COPY требует psycopg2)"""
+    db = SessionLocal()
+    try:
+        return import_words(db, read_import_rows(source, fmt), user_id=user_id, overwrite=overwrite)
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
@@ -0,0 +1,274 @@
+import re
+from collections import Counter
+from typing import Container, Dict, Iterable, List, Optional
+
+try:
+    import simplemma
+except ImportError:
+    simplemma = None
+
+
+STOP_WORDS = frozenset("""
+a about above after again against all am an and any are as at be because been
+before being below between both but by can could did do does doing down during
+each few for from further had has have having he her here hers herself him
+himself his how if in into is it its itself just me more most my myself no nor
+not now of off on once only or other our ours ourselves out over own same she
+should so some such than that the their theirs them themselves then there these
+they this those through to too under until up us very was we were what when where
+which while who whom why will with would you your yours yourself yourselves
+""".split())
+
+# Неправильные формы, однозначные вне контекста; saw, rose, left, lay и
+# подобные сюда не входят, потому что чаще встречаются как другие слова
+IRREGULAR_FORMS = {
+    "ate": "eat", "eaten": "eat", "began": "begin", "begun": "begin",
+    "bought": "buy", "brought": "bring", "broke": "break", "broken": "break",
+    "built": "build", "came": "come", "caught": "catch", "children": "child",
+    "chose": "choose", "chosen": "choose", "drew": "draw", "drawn": "draw",
+    "drove": "drive", "driven": "drive", "fallen": "fall", "feet": "foot",
+    "felt": "feel", "flew": "fly", "flown": "fly", "forgot": "forget",
+    "forgotten": "forget", "fought": "fight", "gave": "give", "given": "give",
+    "gone": "go", "got": "get", "gotten": "get", "grew": "grow", "grown": "grow",
+    "heard": "hear", "held": "hold", "hidden": "hide", "kept": "keep",
+    "knew": "know", "known": "know", "made": "make", "meant": "mean",
+    "men": "man", "mice": "mouse", "paid": "pay", "ran": "run", "ridden": "ride",
+    "risen": "rise", "rode": "ride", "said": "say", "sang": "sing", "seen": "see",
+    "sent": "send", "shook": "shake", "slept": "sleep", "sold": "sell",
+    "sought": "seek", "spent": "spend", "spoke": "speak", "spoken": "speak",
+    "stole": "steal", "stolen": "steal", "stood": "stand", "sung": "sing",
+    "swam": "swim", "taken": "take", "taught": "teach", "teeth": "tooth",
+    "thought": "think", "threw": "throw", "thrown": "throw", "told": "tell",
+    "took": "take", "understood": "understand", "went": "go", "women": "woman",
+    "woke": "wake", "woken": "wake", "wore": "wear", "worn": "wear",
+    "written": "write", "wrote": "write",
+}
+
+# Слова, которые выглядят как формы других слов, но сами по себе леммы
+NOT_INFLECTED = frozenset((
+    "anything", "ceiling", "during", "evening", "everything", "morning", "news",
+    "nothing", "something",
+))
+
+CONTRACTIONS = {"can't": "can", "won't": "will", "shan't": "shall", "ain't": "be"}
+CONTRACTION_SUFFIXES = frozenset(("s", "re", "ve", "ll", "d", "m"))
+
+
+class RuleLemmatizer:
+    """Осторожная лемматизация по суффиксам без словаря
+
+    Кандидат принимается, только если такое слово уже встречается в тексте,
+    получено из неправильной формы или есть в переданном known. Без
+    подтверждения слово остается как есть: лишний запрос к переводчику
+    лучше неверной леммы.
+
+    Если known — частотные ранги (WordRanks), одного наличия кандидата в
+    таблице мало: в ней есть почти любое частое слово, и united -> unit
+    подтвердилось бы. Когда у самой формы есть ранг, кандидат принимается,
+    только если его ранг не хуже ранга формы больше чем в max_rank_ratio
+    раз. Формы без ранга в таблице, собранной WordRanks.build, уже сведены
+    к своей лемме теми же правилами, поэтому для них достаточно наличия.
+    """
+
+    # Кандидаты короче min_stem не рассматриваются; голая основа -ed/-ing
+    # должна быть не короче min_bare_stem: used -> us, hated -> hat, hoped -> hop
+    min_stem = 3
+    min_bare_stem = 4
+    max_rank_ratio = 1.5
+
+    def __init__(self, known: Optional[Container[str]] = None):
+        self.known = known if known is not None else frozenset()
+
+    @classmethod
+    def _verb_stem(cls, word: str, suffix: str) -> List[str]:
+        """Кандидаты для -ed/-ing: сначала с восстановленной "e" и без удвоения, потом голая основа"""
+        stem = word[:-len(suffix)]
+        result = [stem + "e"]
+        bare = [stem] if len(stem) >= cls.min_bare_stem else []
+        if len(stem) > 2 and stem[-1] == stem[-2]:
+            # fill, pass, buzz, stuff оканчиваются на удвоенную согласную сами
+            if stem[-1] in "lsfz":
+                result += bare + [stem[:-1]]
+            else:
+                result += [stem[:-1]] + bare
+        else:
+            result += bare
+        return result
+
+    @classmethod
+    def candidates(cls, word: str) -> List[str]:
+        if len(word) <= 3 or word in NOT_INFLECTED:
+            return []
+        result = []
+        if word.endswith("ies") and len(word) > 4:
+            result.append(word[:-3] + "y")
+        elif word.endswith("es"):
+            result.append(word[:-1])
+            # boxes, wishes, watches, goes; hates -> hat не годится
+            if word[:-2].endswith(("s", "x", "z", "ch", "sh", "o")):
+                result.append(word[:-2])
+        elif word.endswith("s") and not word.endswith(("ss", "us", "is")):
+            result.append(word[:-1])
+        elif word.endswith("ied") and len(word) > 4:
+            result.append(word[:-3] + "y")
+        elif word.endswith("ed"):
+            result += cls._verb_stem(word, "ed")
+        elif word.endswith("ing") and len(word) > 5:
+            result += cls._verb_stem(word, "ing")
+        return [candidate for candidate in result if len(candidate) >= cls.min_stem]
+
+    @classmethod
+    def bare_stem(cls, word: str) -> Optional[str]:
+        """Основа для подсчета общих основ: для -ed/-ing без восстановления "e" """
+        candidates = cls.candidates(word)
+        if word.endswith("ing") or (word.endswith("ed") and not word.endswith("ied")):
+            return candidates[1] if len(candidates) > 1 else None
+        return candidates[0] if candidates else None
+
+    def _known(self, word: str, candidate: str) -> bool:
+        """Подтверждает ли known кандидата для формы word"""
+        if candidate not in self.known:
+            return False
+        rank = getattr(self.known, "rank", None)
+        if rank is None:
+            return True
+        word_rank = rank(word)
+        return word_rank is None or rank(candidate) <= word_rank * self.max_rank_ratio
+
+    def lemmatize(self, words: Iterable[str]) -> Dict[str, str]:
+        """Возвращает отображение слово -> лемма для набора слов одного текста
+
+        Основа без восстановления "e" и удвоения, общая для двух и более форм
+        (walks, walked, walking -> walk), тоже считается подтвержденной.
+        """
+        words = list(words)
+        vocabulary = set(words)
+        lemmas = {}
+        stems = Counter()
+        for word in words:
+            lemma = IRREGULAR_FORMS.get(word)
+            if lemma:
+                lemmas[word] = lemma
+                vocabulary.add(lemma)
+                continue
+            stem = self.bare_stem(word)
+            if stem:
+                stems[stem] += 1
+        vocabulary.update(stem for stem, count in stems.items() if count > 1)
+        for word in words:
+            if word in lemmas:
+                continue
+            lemmas[word] = word
+            for candidate in self.candidates(word):
+                if candidate in vocabulary or self._known(word, candidate):
+                    lemmas[word] = candidate
+                    break
+        return lemmas
+
+
+class SimplemmaLemmatizer:
+    """Словарная лемматизация через simplemma (если установлен)"""
+
+    def __init__(self, lang: str):
+        self.lang = lang
+
+    def lemmatize(self, words: Iterable[str]) -> Dict[str, str]:
+        return {word: simplemma.lemmatize(word, lang=self.lang).lower() for word in words}
+
+
+def create_lemmatizer(kind: str, lang: str = "en", known: Optional[Container[str]] = None):
+    """auto — simplemma, если установлен, иначе правила; none — без лемматизации"""
+    if kind == "none":
+        return None
+    if kind == "simplemma" or (kind == "auto" and simplemma is not None):
+        if simplemma is None:
+            raise RuntimeError("simplemma не установлен")
+        return SimplemmaLemmatizer(lang)
+    if kind in ("auto", "rules"):
+        return RuleLemmatizer(known)
+    raise ValueError(f"Неизвестный лемматизатор: {kind}")
+
+
+class WordExtractor:
+    """Частоты английских слов в тексте
+
+    Токены считаются одним проходом регулярного выражения по тексту в нижнем
+    регистре; сокращения, дефисы, стоп-слова и леммы обрабатываются уже для
+    уникальных токенов, которых на порядки меньше.
+    """
+
+    # Грубое деление на токены: простой класс символов регулярка проходит
+    # быстрее всего, а проверка и чистка идут уже по уникальным токенам
+    token_pattern = re.compile(r"[\w'’-]+")
+    _word_part = re.compile(r"[a-z]+(?:'[a-z]+)*")
+    # Перенос слова по строкам; проверка буквы перед дефисом идет после
+    # литерала, чтобы поиск не запускался с каждой позиции текста
+    _line_break_hyphen = re.compile(r"-(?<=[a-z]-)[ \t]*\r?\n\s*(?=[a-z])")
+
+    def __init__(self, lemmatizer=None, stop_words: bool = True, min_length: int = 2):
+        self.lemmatizer = lemmatizer
+        self.stop_words = STOP_WORDS if stop_words else frozenset()
+        self.min_length = min_length
+
+    def tokenize(self, text: str) -> List[str]:
+        """Сырые токены без нормализации"""
+        text = self._line_break_hyphen.sub("", text.lower())
+        if "\u00ad" in text:
+            text = text.replace("\u00ad", "")
+        return self.token_pattern.findall(text)
+
+    def _split(self, token: str) -> List[str]:
+        """Разбивает составные слова и снимает сокращения: don't -> do, it's -> it
+
+        Токены с цифрами и не латинскими буквами отбрасываются целиком.
+        """
+        token = token.strip("'’-")
+        if token.isalpha() and token.isascii():
+            parts = [token]
+        else:
+            parts = token.replace("’", "'").split("-")
+            if not all(self._word_part.fullmatch(part) for part in parts if part):
+                return []
+
+        words = []
+        for part in parts:
+            if "'" in part:
+                contraction = CONTRACTIONS.get(part)
+                if contraction:
+                    part = contraction
+                else:
+                    base, suffix = part.rsplit("'", 1)
+                    if suffix == "t" and base.endswith("n"):
+                        part = base[:-1]
+                    elif suffix in CONTRACTION_SUFFIXES:
+                        part = base
+            if len(part) >= self.min_length and part not in self.stop_words:
+                words.append(part)
+        return words
+
+    def normalize(self, tokens: Counter) -> Counter:
+        """Сводит частоты сырых токенов к частотам нормальных форм"""
+        words: Dict[str, int] = {}
+        stop_words = self.stop_words
+        min_length = self.min_length
+        for token, count in tokens.items():
+            if token.isalpha() and token.isascii():
+                # Обычное слово — самый частый случай, без лишних вызовов
+                if len(token) >= min_length and token not in stop_words:
+                    words[token] = words.get(token, 0) + count
+                continue
+            for word in self._split(token):
+                words[word] = words.get(word, 0) + count
+        if self.lemmatizer is None or not words:
+            return Counter(words)
+
+        lemmas = self.lemmatizer.lemmatize(words)
+        result: Dict[str, int] = {}
+        for word, count in words.items():
+            lemma = lemmas.get(word, word)
+            if lemma not in stop_words and len(lemma) >= min_length:
+                result[lemma] = result.get(lemma, 0) + count
+        return Counter(result)
+
+    def count(self, text: str) -> Counter:
+        return self.normalize(Counter(self.tokenize(text)))
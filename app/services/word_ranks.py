@@ -0,0 +1,104 @@
+import csv
+import os
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from app.services.word_extraction import WordExtractor
+
+
+class WordRanks:
+    """Частотный ранг слов языка: 1 — самое частое слово
+
+    Файл — список нормальных форм по одной в строке, от частых к редким.
+    Загружается один раз в словарь слово -> ранг.
+    """
+
+    def __init__(self, ranks: Optional[Dict[str, int]] = None):
+        self._ranks = ranks or {}
+
+    @classmethod
+    def load(cls, path: str) -> "WordRanks":
+        """Читает файл рангов; если файла нет, ранги пустые"""
+        if not os.path.exists(path):
+            return cls()
+        ranks = {}
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                word = line.strip()
+                if word and word not in ranks:
+                    ranks[word] = len(ranks) + 1
+        return cls(ranks)
+
+    def __len__(self) -> int:
+        return len(self._ranks)
+
+    def __contains__(self, word: str) -> bool:
+        return word in self._ranks
+
+    def rank(self, word: str) -> Optional[int]:
+        return self._ranks.get(word)
+
+    def prioritize(
+            self,
+            words: List[str],
+            skip_top: int = 0,
+            limit: Optional[int] = None,
+            ) -> Tuple[List[str], int]:
+        """Отбрасывает skip_top самых частых слов языка и упорядочивает остальные
+
+        Сначала идут слова с меньшим рангом (их полезнее выучить раньше), слова
+        без ранга — в конце; внутри группы сохраняется исходный порядок,
+        то есть частота в тексте. Возвращает отобранные слова и число
+        пропущенных как известные.
+        """
+        ranked = []
+        unranked = []
+        skipped = 0
+        for word in words:
+            rank = self._ranks.get(word)
+            if rank is None:
+                unranked.append(word)
+            elif rank <= skip_top:
+                skipped += 1
+            else:
+                ranked.append((rank, word))
+        ranked.sort(key=lambda item: item[0])
+        ordered = [word for _, word in ranked] + unranked
+        if limit is not None:
+            ordered = ordered[:limit]
+        return ordered, skipped
+
+    @staticmethod
+    def build(path: str, rows: Iterable[Tuple[str, float]], extractor: WordExtractor) -> int:
+        """Собирает файл рангов из пар (слово, частота)
+
+        Слова нормализуются тем же WordExtractor, что и при парсинге, частоты
+        форм одной леммы складываются.
+        """
+        tokens: Dict[str, float] = {}
+        for word, count in rows:
+            token = word.strip().lower()
+            tokens[token] = tokens.get(token, 0.0) + count
+        merged = extractor.normalize(tokens)
+
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            for word, _ in sorted(merged.items(), key=lambda item: -item[1]):
+                f.write(word + "\n")
+        os.replace(tmp_path, path)
+        return len(merged)
+
+
+def read_frequency_rows(path: str) -> Iterable[Tuple[str, float]]:
+    """Читает TSV слово<TAB>частота или просто список слов от частых к редким"""
+    with open(path, encoding="utf-8", newline="") as f:
+        reader = csv.reader(f, delimiter="\t")
+        for index, row in enumerate(reader):
+            if not row or not row[0].strip():
+                continue
+            if len(row) >= 2:
+                try:
+                    yield row[0], float(row[1])
+                    continue
+                except ValueError:
+                    pass
+            yield row[0], 1.0 / (index + 1)
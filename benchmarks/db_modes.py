@@ -0,0 +1,166 @@
+"""Пропускная способность /study и /words в синхронном и асинхронном режиме БД.
+
+Заполняет базу пользователями со словами, затем для каждого режима
+(DATABASE_ASYNC=0 и 1) запускает отдельный процесс, который держит
+--concurrency одновременных запросов к /study и /words через ASGI в течение
+--duration секунд. Печатает запросы в секунду и задержки по маршрутам.
+
+Для асинхронного режима нужны зависимости из extra "async".
+
+Запуск:
+    DATABASE_URL=sqlite:///./bench.db python -m benchmarks.db_modes --concurrency 32
+    DATABASE_URL=postgresql://... python -m benchmarks.db_modes --users 50 --words 5000
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+os.environ.setdefault("DATABASE_URL", "sqlite:///./bench.db")
+
+ROUTES = ("/study", "/words")
+BATCH = 5000
+
+
+def seed(users: int, words: int) -> None:
+    from app.core.database import Base, SessionLocal, engine
+    from app.models.user import User
+    from app.models.user_word import UserWord
+    from app.models.word import Word
+
+    Base.metadata.create_all(engine)
+    db = SessionLocal()
+    try:
+        existing = db.query(Word.id).filter(Word.word.like("db-bench-%")).count()
+        for start in range(existing, words, BATCH):
+            db.execute(Word.__table__.insert(), [
+                {"word": f"db-bench-{i}", "translation": f"перевод {i}"}
+                for i in range(start, min(words, start + BATCH))
+            ])
+        db.commit()
+        word_ids = [
+            word_id for (word_id,) in
+            db.query(Word.id).filter(Word.word.like("db-bench-%")).order_by(Word.id).limit(words)
+        ]
+
+        now = datetime.now(timezone.utc)
+        for index in range(users):
+            kc_sub = f"db-bench-{index}"
+            if db.query(User.id).filter(User.kc_sub == kc_sub).scalar() is not None:
+                continue
+            user = User(kc_sub=kc_sub, username=kc_sub)
+            db.add(user)
+            db.commit()
+            for start in range(0, len(word_ids), BATCH):
+                db.execute(UserWord.__table__.insert(), [
+                    {
+                        "user_id": user.id,
+                        "word_id": word_id,
+                        "score": float(random.randint(0, 10)),
+                        "due_at": now + timedelta(days=random.uniform(-30, 30)),
+                    }
+                    for word_id in word_ids[start:start + BATCH]
+                ])
+            db.commit()
+    finally:
+        db.close()
+
+
+async def drive(users: int, concurrency: int, duration: float) -> dict:
+    import httpx
+    from fastapi import Request
+
+    from app.core.auth import get_current_user
+    from app.main import app
+
+    async def fake_user(request: Request) -> dict:
+        kc_sub = request.headers["x-bench-user"]
+        return {"sub": kc_sub, "username": kc_sub, "roles": []}
+
+    app.dependency_overrides[get_current_user] = fake_user
+    latencies = {route: [] for route in ROUTES}
+    errors = {route: 0 for route in ROUTES}
+    transport = httpx.ASGITransport(app=app)
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60) as client:
+        for index in range(users):
+            await client.get("/study", headers={"x-bench-user": f"db-bench-{index}"})
+
+        deadline = time.perf_counter() + duration
+
+        async def worker(number: int) -> None:
+            request_index = number
+            while time.perf_counter() < deadline:
+                route = ROUTES[request_index % len(ROUTES)]
+                headers = {"x-bench-user": f"db-bench-{request_index % users}"}
+                request_index += concurrency
+                started = time.perf_counter()
+                response = await client.get(route, headers=headers)
+                latencies[route].append(time.perf_counter() - started)
+                if response.status_code != 200:
+                    errors[route] += 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(number) for number in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    return {"elapsed": elapsed, "errors": errors, "latencies": latencies}
+
+
+def percentile(values: list[float], fraction: float) -> float:
+    values = sorted(values)
+    return values[int(fraction * (len(values) - 1))] if values else 0.0
+
+
+def run_mode(mode: str, args) -> dict:
+    env = dict(os.environ, DATABASE_ASYNC="1" if mode == "async" else "0")
+    output = subprocess.run(
+        [
+            sys.executable, "-m", "benchmarks.db_modes", "--worker",
+            "--users", str(args.users),
+            "--concurrency", str(args.concurrency),
+            "--duration", str(args.duration),
+        ],
+        env=env, check=True, capture_output=True, text=True,
+    ).stdout
+    return json.loads(output.splitlines()[-1])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--words", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--modes", nargs="+", default=["sync", "async"], choices=["sync", "async"])
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        result = asyncio.run(drive(args.users, args.concurrency, args.duration))
+        print(json.dumps(result))
+        return
+
+    seed(args.users, args.words)
+    print(f"{'режим':>6} {'маршрут':>8} {'запросов':>9} {'rps':>8} {'median, мс':>11} {'p95, мс':>9} {'ошибки':>7}")
+    for mode in args.modes:
+        result = run_mode(mode, args)
+        for route in ROUTES:
+            timings = result["latencies"][route]
+            print(
+                f"{mode:>6} {route:>8} {len(timings):>9} "
+                f"{len(timings) / result['elapsed']:>8.1f} "
+                f"{statistics.median(timings) * 1000:>11.2f} "
+                f"{percentile(timings, 0.95) * 1000:>9.2f} "
+                f"{result['errors'][route]:>7}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,344 @@
+"""Нагрузочный прогон /parse, /study, /study/progress и /words с локальными заглушками.
+
+Заполняет базу (SQLite или локальный Postgres) пользователями, словами и
+связями, поднимает фальшивый Keycloak с JWKS и задержкой ответа, заменяет
+переводчик на локальный с задержкой на слово и гоняет маршруты конкурентно
+через ASGI с настоящей проверкой JWT. По каждому маршруту печатает p50/p95/p99,
+пропускную способность, ошибки и число SQL-запросов на запрос.
+
+--save-baseline сохраняет результат в JSON, --compare печатает изменение
+относительно сохраненного. Базовый результат зависит от машины, поэтому
+в репозитории его нет — снимайте на своей до изменений.
+
+Запуск:
+    python -m benchmarks.load_test --users 20 --words 5000 --duration 20 --save-baseline base.json
+    python -m benchmarks.load_test --users 20 --words 5000 --duration 20 --compare base.json
+    DATABASE_URL=postgresql://... python -m benchmarks.load_test --concurrency 64
+"""
+import argparse
+import asyncio
+import contextvars
+import json
+import os
+import random
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+REALM = "bench"
+CLIENT_ID = "linguaparser-bench"
+KID = "bench-key"
+BATCH = 5000
+ROUTES = ("parse", "study", "progress", "words")
+
+
+def start_fake_keycloak(delay: float) -> tuple[ThreadingHTTPServer, str, str]:
+    """Поднимает JWKS-эндпоинт Keycloak; возвращает сервер, базовый URL и приватный ключ"""
+    from cryptography.hazmat.primitives import serialization
+    from cryptography.hazmat.primitives.asymmetric import rsa
+    from jose import jwk
+
+    private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    private_pem = private_key.private_bytes(
+        serialization.Encoding.PEM,
+        serialization.PrivateFormat.PKCS8,
+        serialization.NoEncryption(),
+    ).decode()
+    public_pem = private_key.public_key().public_bytes(
+        serialization.Encoding.PEM,
+        serialization.PublicFormat.SubjectPublicKeyInfo,
+    ).decode()
+    key = jwk.construct(public_pem, "RS256").to_dict()
+    key.update({"kid": KID, "use": "sig"})
+    body = json.dumps({"keys": [key]}).encode()
+
+    class JWKSHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            time.sleep(delay)
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), JWKSHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}", private_pem
+
+
+def issue_token(private_pem: str, issuer: str, kc_sub: str) -> str:
+    from jose import jwt
+
+    now = int(time.time())
+    claims = {
+        "sub": kc_sub,
+        "preferred_username": kc_sub,
+        "iss": issuer,
+        "azp": CLIENT_ID,
+        "iat": now,
+        "exp": now + 24 * 3600,
+        "realm_access": {"roles": ["user"]},
+    }
+    return jwt.encode(claims, private_pem, algorithm="RS256", headers={"kid": KID})
+
+
+def pseudo_word(index: int) -> str:
+    """Детерминированное «слово» только из букв, которого нет в словаре языка"""
+    letters = []
+    index += 26 * 26
+    while index:
+        index, rest = divmod(index, 26)
+        letters.append(chr(ord("a") + rest))
+    return "zq" + "".join(reversed(letters))
+
+
+def seed(users: int, words: int, per_user: int) -> dict[str, list[int]]:
+    """Создает слова и пользователей bench-user-N; возвращает id слов каждого пользователя"""
+    from app.core.database import Base, SessionLocal, engine
+    from app.models.user import User
+    from app.models.user_word import UserWord
+    from app.models.word import Word
+
+    Base.metadata.create_all(engine)
+    db = SessionLocal()
+    try:
+        existing = db.query(Word.id).filter(Word.word.like("zq%")).count()
+        for start in range(existing, words, BATCH):
+            db.execute(Word.__table__.insert(), [
+                {"word": pseudo_word(i), "translation": f"перевод {i}"}
+                for i in range(start, min(words, start + BATCH))
+            ])
+        db.commit()
+        word_ids = [
+            word_id for (word_id,) in
+            db.query(Word.id).filter(Word.word.like("zq%")).order_by(Word.id).limit(words)
+        ]
+
+        rng = random.Random(0)
+        now = datetime.now(timezone.utc)
+        user_words = {}
+        for index in range(users):
+            kc_sub = f"bench-user-{index}"
+            user_id = db.query(User.id).filter(User.kc_sub == kc_sub).scalar()
+            if user_id is None:
+                user = User(kc_sub=kc_sub, username=kc_sub)
+                db.add(user)
+                db.commit()
+                user_id = user.id
+                chosen = rng.sample(word_ids, min(per_user, len(word_ids)))
+                for start in range(0, len(chosen), BATCH):
+                    db.execute(UserWord.__table__.insert(), [
+                        {
+                            "user_id": user_id,
+                            "word_id": word_id,
+                            "score": float(rng.randint(0, 10)),
+                            "due_at": now + timedelta(days=rng.uniform(-30, 30)),
+                        }
+                        for word_id in chosen[start:start + BATCH]
+                    ])
+                db.commit()
+            user_words[kc_sub] = [
+                word_id for (word_id,) in
+                db.query(UserWord.word_id).filter(UserWord.user_id == user_id).limit(1000)
+            ]
+        return user_words
+    finally:
+        db.close()
+
+
+def make_fake_backend(latency: float):
+    from app.services.translation_backends import TranslationBackend
+
+    class FakeTranslationBackend(TranslationBackend):
+        """Переводчик-заглушка: фиксированная задержка на слово вместо Google"""
+
+        name = "fake"
+
+        def translate(self, word: str):
+            time.sleep(latency)
+            return f"перевод {word}"
+
+    return FakeTranslationBackend()
+
+
+def percentile(values: list[float], q: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(q * (len(values) - 1))))]
+
+
+async def drive(args, tokens: dict[str, str], user_words: dict[str, list[int]]) -> dict:
+    import httpx
+    from sqlalchemy import event
+    from sqlalchemy.engine import Engine
+
+    from app.main import app
+
+    current_route = contextvars.ContextVar("bench_route", default=None)
+    queries = {route: 0 for route in ROUTES}
+    queries_lock = threading.Lock()
+
+    # Контекст запроса доходит до потоков пула через run_blocking/run_sync
+    @event.listens_for(Engine, "before_cursor_execute")
+    def count_query(conn, cursor, statement, parameters, context, executemany):
+        route = current_route.get()
+        if route is not None:
+            with queries_lock:
+                queries[route] += 1
+
+    weights = [args.mix[route] for route in ROUTES]
+    vocabulary = [pseudo_word(i) for i in range(args.words)]
+    new_words = [pseudo_word(args.words + i) for i in range(args.new_words)]
+    latencies = {route: [] for route in ROUTES}
+    errors = {route: 0 for route in ROUTES}
+    subs = list(tokens)
+
+    async def request(client: httpx.AsyncClient, rng: random.Random, route: str) -> httpx.Response:
+        kc_sub = rng.choice(subs)
+        headers = {"Authorization": f"Bearer {tokens[kc_sub]}"}
+        if route == "parse":
+            text = " ".join(rng.choices(vocabulary, k=args.parse_words) + rng.sample(new_words, 5))
+            return await client.post("/parse", data={"text": text}, headers=headers)
+        if route == "study":
+            return await client.get("/study", headers=headers)
+        if route == "progress":
+            word_id = rng.choice(user_words[kc_sub])
+            action = rng.choice(("know", "dont_know"))
+            return await client.post(f"/study/progress/{word_id}", data={"action": action}, headers=headers)
+        return await client.get("/words", headers=headers)
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        for kc_sub in subs:
+            headers = {"Authorization": f"Bearer {tokens[kc_sub]}"}
+            await client.get("/study", headers=headers)
+
+        deadline = time.perf_counter() + args.duration
+
+        async def worker(number: int) -> None:
+            rng = random.Random(number)
+            while time.perf_counter() < deadline:
+                route = rng.choices(ROUTES, weights)[0]
+                current_route.set(route)
+                started = time.perf_counter()
+                response = await request(client, rng, route)
+                latencies[route].append(time.perf_counter() - started)
+                current_route.set(None)
+                if response.status_code >= 400:
+                    errors[route] += 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(number) for number in range(args.concurrency)))
+        elapsed = time.perf_counter() - started
+
+    event.remove(Engine, "before_cursor_execute", count_query)
+
+    report = {}
+    for route in ROUTES:
+        timings = latencies[route]
+        report[route] = {
+            "requests": len(timings),
+            "rps": len(timings) / elapsed,
+            "p50_ms": percentile(timings, 0.50) * 1000,
+            "p95_ms": percentile(timings, 0.95) * 1000,
+            "p99_ms": percentile(timings, 0.99) * 1000,
+            "errors": errors[route],
+            "queries_per_request": queries[route] / len(timings) if timings else 0.0,
+        }
+    return {
+        "config": {
+            key: getattr(args, key)
+            for key in ("users", "words", "per_user", "concurrency", "duration",
+                        "translate_latency", "jwks_latency", "parse_words")
+        } | {"mix": args.mix, "database": os.environ["DATABASE_URL"].split("://")[0]},
+        "elapsed": elapsed,
+        "routes": report,
+    }
+
+
+def print_report(result: dict, baseline: dict | None) -> None:
+    columns = ("requests", "rps", "p50_ms", "p95_ms", "p99_ms", "errors", "queries_per_request")
+    print(f"{'маршрут':>9} " + " ".join(f"{column:>20}" for column in columns))
+    for route, stats in result["routes"].items():
+        cells = []
+        for column in columns:
+            value = stats[column]
+            cell = f"{value:.1f}" if isinstance(value, float) else str(value)
+            if baseline and route in baseline["routes"] and column != "requests":
+                before = baseline["routes"][route][column]
+                if before:
+                    cell += f" ({(value - before) / before * 100:+.0f}%)"
+            cells.append(f"{cell:>20}")
+        print(f"{route:>9} " + " ".join(cells))
+
+
+def parse_mix(value: str) -> dict[str, float]:
+    mix = {route: 0.0 for route in ROUTES}
+    for part in value.split(","):
+        route, _, weight = part.partition("=")
+        if route not in mix:
+            raise argparse.ArgumentTypeError(f"неизвестный маршрут: {route}")
+        mix[route] = float(weight)
+    return mix
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--words", type=int, default=5000, help="слов в общем словаре")
+    parser.add_argument("--per-user", type=int, default=1000, help="слов у каждого пользователя")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=15.0)
+    parser.add_argument("--mix", type=parse_mix, default=parse_mix("parse=1,study=4,progress=4,words=2"))
+    parser.add_argument("--parse-words", type=int, default=200, help="слов в тексте одного /parse")
+    parser.add_argument("--new-words", type=int, default=2000, help="пул слов, которых нет в базе")
+    parser.add_argument("--translate-latency", type=float, default=0.05, help="задержка перевода слова, с")
+    parser.add_argument("--jwks-latency", type=float, default=0.1, help="задержка ответа JWKS, с")
+    parser.add_argument("--save-baseline", metavar="PATH")
+    parser.add_argument("--compare", metavar="PATH")
+    args = parser.parse_args()
+
+    server, keycloak_url, private_pem = start_fake_keycloak(args.jwks_latency)
+    # Настройки читаются при импорте app, поэтому окружение задается до него
+    os.environ.setdefault("DATABASE_URL", "sqlite:///./bench.db")
+    os.environ.update({
+        "KEYCLOAK_URL": keycloak_url,
+        "KEYCLOAK_REALM": REALM,
+        "KEYCLOAK_CLIENT_ID": CLIENT_ID,
+        "KEYCLOAK_ISSUER": f"{keycloak_url}/realms/{REALM}",
+        "TRANSLATION_BACKEND": "local",
+        "URL_CACHE_ENABLED": "false",
+    })
+
+    from app.api import routes
+
+    routes.translator.backend = make_fake_backend(args.translate_latency)
+    user_words = seed(args.users, args.words, args.per_user)
+    tokens = {
+        kc_sub: issue_token(private_pem, f"{keycloak_url}/realms/{REALM}", kc_sub)
+        for kc_sub in user_words
+    }
+
+    try:
+        result = asyncio.run(drive(args, tokens, user_words))
+    finally:
+        server.shutdown()
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+    print_report(result, baseline)
+    if args.save_baseline:
+        with open(args.save_baseline, "w", encoding="utf-8") as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+        print(f"Базовый результат сохранен в {args.save_baseline}")
+
+
+if __name__ == "__main__":
+    main()
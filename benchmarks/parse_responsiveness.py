@@ -0,0 +1,120 @@
+"""Проверка отзывчивости: пока идут медленные /parse, другие маршруты должны отвечать быстро.
+
+Поднимает локальный HTTP-сервер, который отдает страницу с задержкой, запускает
+несколько /parse по этому URL и параллельно опрашивает GET /.
+
+Запуск из корня репозитория:
+    DATABASE_URL=sqlite:///./bench.db TRANSLATION_BACKEND=local \\
+        python -m benchmarks.parse_responsiveness --parses 8 --delay 3
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+os.environ.setdefault("DATABASE_URL", "sqlite:///./bench.db")
+os.environ.setdefault("TRANSLATION_BACKEND", "local")
+
+import httpx
+
+from app.core.auth import get_current_user
+from app.core.database import Base, engine
+from app.main import app
+
+
+WORDS = (
+    "the quick brown fox jumps over the lazy dog while reading an article "
+    "about language learning and vocabulary practice every single day "
+)
+PAGE = (
+    "<html><head><style>body { color: red; }</style></head><body>"
+    "<script>var ignored = 1;</script>"
+    + "<p>" + WORDS * 200 + "</p>"
+    + "</body></html>"
+).encode()
+
+
+def start_slow_server(delay: float) -> tuple[ThreadingHTTPServer, str]:
+    class SlowHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            time.sleep(delay)
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(PAGE)))
+            self.end_headers()
+            self.wfile.write(PAGE)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), SlowHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/article"
+
+
+async def fake_user() -> dict:
+    return {"sub": "bench-user", "username": "bench", "roles": []}
+
+
+def percentile(values: list[float], q: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    index = min(len(values) - 1, int(round(q * (len(values) - 1))))
+    return values[index]
+
+
+async def run(args: argparse.Namespace) -> None:
+    Base.metadata.create_all(engine)
+    app.dependency_overrides[get_current_user] = fake_user
+    server, url = start_slow_server(args.delay)
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        stop = asyncio.Event()
+
+        async def probe() -> list[float]:
+            latencies = []
+            while not stop.is_set():
+                started = time.perf_counter()
+                await client.get("/")
+                latencies.append(time.perf_counter() - started)
+                await asyncio.sleep(args.probe_interval)
+            return latencies
+
+        async def parse() -> int:
+            response = await client.post("/parse", data={"url": url})
+            return response.status_code
+
+        probe_task = asyncio.create_task(probe())
+        started = time.perf_counter()
+        statuses = await asyncio.gather(*(parse() for _ in range(args.parses)))
+        elapsed = time.perf_counter() - started
+        stop.set()
+        latencies = await probe_task
+
+    server.shutdown()
+
+    print(f"/parse: {args.parses} запросов за {elapsed:.2f} с, статусы: {sorted(set(statuses))}")
+    print(f"GET / во время парсинга: {len(latencies)} запросов")
+    if latencies:
+        print(
+            f"  p50={statistics.median(latencies) * 1000:.1f} мс "
+            f"p95={percentile(latencies, 0.95) * 1000:.1f} мс "
+            f"max={max(latencies) * 1000:.1f} мс"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--parses", type=int, default=8, help="число одновременных /parse")
+    parser.add_argument("--delay", type=float, default=3.0, help="задержка ответа страницы, с")
+    parser.add_argument("--probe-interval", type=float, default=0.05, help="пауза между GET /, с")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
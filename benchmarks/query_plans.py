@@ -0,0 +1,169 @@
+"""Планы горячих запросов к user_words на заполненной базе PostgreSQL.
+
+Заполняет базу синтетическими пользователями и словами (один раз), выполняет
+EXPLAIN (ANALYZE, FORMAT JSON) для запросов страниц /study и /words и операций
+над карточками и проверяет, что user_words читается через индексы.
+
+Схема должна быть создана заранее (alembic upgrade head). Запуск:
+    DATABASE_URL=postgresql://... python -m benchmarks.query_plans \\
+        --users 200 --words 500000 --per-user 10000
+"""
+import argparse
+import json
+import sys
+import time
+
+from sqlalchemy import func, text
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.orm import Session
+
+from app.core.database import SessionLocal
+from app.models.user import User
+from app.models.user_word import UserWord
+from app.services.vocabulary import words_page_query
+
+
+def seed(db: Session, users: int, words: int, per_user: int) -> None:
+    """Заполняет базу одними SQL-запросами через generate_series"""
+    if db.query(func.count(User.id)).filter(User.kc_sub.like("bench-%")).scalar():
+        print("База уже заполнена, пропускаю")
+        return
+
+    started = time.perf_counter()
+    db.execute(text(
+        "INSERT INTO words (word, translation) "
+        "SELECT 'bench' || g, 'перевод' || g FROM generate_series(1, :words) g "
+        "ON CONFLICT DO NOTHING"
+    ), {"words": words})
+    db.execute(text(
+        "INSERT INTO users (kc_sub, username) "
+        "SELECT 'bench-' || g, 'bench' || g FROM generate_series(1, :users) g"
+    ), {"users": users})
+    db.execute(text(
+        "INSERT INTO user_words (user_id, word_id, score, last_reviewed) "
+        "SELECT u.id, w.id, floor(random() * 11), now() - random() * interval '90 days' "
+        "FROM users u "
+        "CROSS JOIN generate_series(1, :per_user) g "
+        "JOIN words w ON w.word = 'bench' || (((u.id * 7919 + g) % :words) + 1) "
+        "WHERE u.kc_sub LIKE 'bench-%' "
+        "ON CONFLICT DO NOTHING"
+    ), {"per_user": per_user, "words": words})
+    db.commit()
+    db.execute(text("ANALYZE"))
+    db.commit()
+    print(f"Заполнено за {time.perf_counter() - started:.1f} с")
+
+
+def hot_queries(db: Session, user_id: int, word_id: int) -> dict:
+    """Те же запросы, что строят сервисы и маршруты"""
+    return {
+        "study: due window": db.query(UserWord.word_id, UserWord.score, UserWord.due_at).filter(
+            UserWord.user_id == user_id,
+            UserWord.score < 7,
+        ).order_by(UserWord.due_at).limit(30),
+        "update_progress / delete / score": db.query(UserWord).filter(
+            UserWord.user_id == user_id,
+            UserWord.word_id == word_id,
+        ).limit(1),
+        "words page": words_page_query(db, user_id),
+        "words page: next": words_page_query(db, user_id, after="bench5"),
+    }
+
+
+def collect_scans(plan: dict, scans: list) -> list:
+    node = plan.get("Node Type")
+    if "Relation Name" in plan or "Index Name" in plan:
+        scans.append((node, plan.get("Relation Name"), plan.get("Index Name")))
+    for child in plan.get("Plans", []):
+        collect_scans(child, scans)
+    return scans
+
+
+INDEX_SCANS = ("Index Scan", "Index Only Scan", "Bitmap Index Scan")
+
+
+def user_words_indexes() -> set:
+    """Имена индексов user_words из модели, включая уникальные ограничения"""
+    table = UserWord.__table__
+    names = {index.name for index in table.indexes}
+    names.update(constraint.name for constraint in table.constraints if constraint.name)
+    names.add("user_words_pkey")
+    return names
+
+
+def _index_names(plan: dict) -> set:
+    """Индексы, которые читают узел и его потомки (Bitmap Heap Scan -> Bitmap Index Scan)"""
+    names = set()
+    if plan.get("Node Type") in INDEX_SCANS and plan.get("Index Name"):
+        names.add(plan["Index Name"])
+    for child in plan.get("Plans", []):
+        names |= _index_names(child)
+    return names
+
+
+def reads_through_index(plan: dict, relation: str, indexes: set) -> bool:
+    """Каждое чтение relation идет через один из indexes
+
+    Bitmap Heap Scan сам индекса не называет, поэтому проверяются его
+    дочерние Bitmap Index Scan.
+    """
+    if plan.get("Relation Name") == relation:
+        node = plan.get("Node Type")
+        if node in INDEX_SCANS:
+            if plan.get("Index Name") not in indexes:
+                return False
+        elif node == "Bitmap Heap Scan":
+            if not _index_names(plan) & indexes:
+                return False
+        else:
+            return False
+    return all(reads_through_index(child, relation, indexes) for child in plan.get("Plans", []))
+
+
+def explain(db: Session, query) -> tuple[dict, float]:
+    sql = str(query.statement.compile(
+        dialect=postgresql.dialect(),
+        compile_kwargs={"literal_binds": True},
+    ))
+    result = db.execute(text(f"EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {sql}")).scalar()
+    if isinstance(result, str):
+        result = json.loads(result)
+    return result[0]["Plan"], result[0]["Execution Time"]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--words", type=int, default=500_000)
+    parser.add_argument("--per-user", type=int, default=10_000)
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        if db.get_bind().dialect.name != "postgresql":
+            sys.exit("Нужна база PostgreSQL")
+
+        seed(db, args.users, args.words, args.per_user)
+        total = db.query(func.count(UserWord.id)).scalar()
+        print(f"user_words: {total} строк")
+
+        user_id = db.query(User.id).filter(User.kc_sub == "bench-1").scalar()
+        word_id = db.query(UserWord.word_id).filter(UserWord.user_id == user_id).limit(1).scalar()
+
+        indexes = user_words_indexes()
+        failed = False
+        for name, query in hot_queries(db, user_id, word_id).items():
+            plan, elapsed = explain(db, query)
+            scans = collect_scans(plan, [])
+            indexed = reads_through_index(plan, "user_words", indexes)
+            failed = failed or not indexed
+            print(f"\n{name}: {elapsed:.2f} мс, user_words через индекс: {'да' if indexed else 'НЕТ'}")
+            for node, relation, index in scans:
+                print(f"  {node:<22} {relation or '':<12} {index or ''}")
+        sys.exit(1 if failed else 0)
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
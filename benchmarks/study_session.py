@@ -0,0 +1,97 @@
+"""Время сборки сессии /study в зависимости от размера словаря пользователя.
+
+Для каждого размера создает отдельного пользователя с N словами и замеряет
+LearningService.get_study_session. При индексной выборке по due_at время
+не должно расти вместе с N.
+
+Запуск:
+    DATABASE_URL=sqlite:///./bench.db python -m benchmarks.study_session --sizes 1000 10000 100000
+"""
+import argparse
+import os
+import random
+import statistics
+import time
+from datetime import datetime, timedelta, timezone
+
+os.environ.setdefault("DATABASE_URL", "sqlite:///./bench.db")
+
+from sqlalchemy import func
+
+from app.core.database import Base, SessionLocal, engine
+from app.models.user import User
+from app.models.user_word import UserWord
+from app.models.word import Word
+from app.services.learning import LearningService
+
+
+BATCH = 5000
+
+
+def ensure_words(db, count: int) -> list[int]:
+    existing = db.query(func.count(Word.id)).filter(Word.word.like("study-bench-%")).scalar()
+    for start in range(existing, count, BATCH):
+        db.execute(Word.__table__.insert(), [
+            {"word": f"study-bench-{i}", "translation": f"перевод {i}"}
+            for i in range(start, min(count, start + BATCH))
+        ])
+    db.commit()
+    return [
+        word_id for (word_id,) in
+        db.query(Word.id).filter(Word.word.like("study-bench-%")).order_by(Word.id).limit(count)
+    ]
+
+
+def seed_user(db, size: int, word_ids: list[int]) -> int:
+    kc_sub = f"study-bench-{size}"
+    user = db.query(User).filter(User.kc_sub == kc_sub).first()
+    if user is not None:
+        return user.id
+
+    user = User(kc_sub=kc_sub, username=kc_sub)
+    db.add(user)
+    db.commit()
+
+    now = datetime.now(timezone.utc)
+    for start in range(0, size, BATCH):
+        db.execute(UserWord.__table__.insert(), [
+            {
+                "user_id": user.id,
+                "word_id": word_id,
+                "score": float(random.randint(0, 10)),
+                "due_at": now + timedelta(days=random.uniform(-30, 30)),
+            }
+            for word_id in word_ids[start:start + BATCH]
+        ])
+    db.commit()
+    return user.id
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--runs", type=int, default=50)
+    args = parser.parse_args()
+
+    Base.metadata.create_all(engine)
+    service = LearningService()
+    db = SessionLocal()
+    try:
+        word_ids = ensure_words(db, max(args.sizes))
+        print(f"{'слов у пользователя':>20} {'median, мс':>12} {'p95, мс':>10}")
+        for size in args.sizes:
+            user_id = seed_user(db, size, word_ids)
+            timings = []
+            for _ in range(args.runs):
+                started = time.perf_counter()
+                service.get_study_session(db, user_id)
+                timings.append((time.perf_counter() - started) * 1000)
+            timings.sort()
+            p95 = timings[int(0.95 * (len(timings) - 1))]
+            print(f"{size:>20} {statistics.median(timings):>12.2f} {p95:>10.2f}")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""Доля попаданий и скорость кэша переводов при нескольких воркерах.
+
+Каждый из --workers процессов, как воркер gunicorn, получает свою часть
+потока запросов на перевод (слова по закону Ципфа) и ходит сначала в
+кэш, а промахи кладет обратно. Для memory кэш у каждого процесса свой,
+для mmap — общий файл. Печатает долю попаданий и операций в секунду.
+
+Запуск:
+    python -m benchmarks.translation_cache --workers 4 --requests 200000
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+from multiprocessing import Pool
+
+from app.core.shared_cache import create_cache
+
+BATCH = 200
+
+
+def worker(args: tuple) -> tuple[int, int, float]:
+    kind, path, index, requests, vocabulary, size = args
+    cache = create_cache(kind, maxsize=size, path=path, slot_size=128)
+    rng = random.Random(index)
+    weights = [1 / (rank + 1) for rank in range(vocabulary)]
+    words = [f"word{number}" for number in rng.choices(range(vocabulary), weights, k=requests)]
+
+    hits = 0
+    started = time.perf_counter()
+    for start in range(0, len(words), BATCH):
+        batch = words[start:start + BATCH]
+        found = cache.get_many(batch)
+        hits += sum(word in found for word in batch)
+        cache.set_many({word: f"перевод {word}" for word in batch if word not in found})
+    return hits, len(words), time.perf_counter() - started
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--requests", type=int, default=200000, help="на каждый воркер")
+    parser.add_argument("--vocabulary", type=int, default=50000)
+    parser.add_argument("--size", type=int, default=20000)
+    parser.add_argument("--kinds", nargs="+", default=["memory", "mmap"], choices=["memory", "mmap", "local", "redis"])
+    args = parser.parse_args()
+
+    print(f"{'кэш':>8} {'попадания':>10} {'тыс. оп/с':>10}")
+    for kind in args.kinds:
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "translations.cache")
+            tasks = [
+                (kind, path, index, args.requests, args.vocabulary, args.size)
+                for index in range(args.workers)
+            ]
+            with Pool(args.workers) as pool:
+                results = pool.map(worker, tasks)
+        hits = sum(result[0] for result in results)
+        total = sum(result[1] for result in results)
+        rate = sum(result[1] / result[2] for result in results)
+        print(f"{kind:>8} {hits / total:>10.1%} {rate / 1000:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""Скорость извлечения слов: прежний extract_words против WordExtractor.
+
+Корпус берется из файлов --files или генерируется из случайных слов с
+пунктуацией, сокращениями и переносами. Для каждого варианта печатает
+токенов в секунду и число уникальных слов, которые ушли бы в перевод.
+
+Запуск:
+    python -m benchmarks.word_extraction --megabytes 20
+    python -m benchmarks.word_extraction --files corpus/*.txt
+"""
+import argparse
+import random
+import re
+import string
+import time
+
+from app.services.word_extraction import RuleLemmatizer, WordExtractor, create_lemmatizer
+
+
+LEGACY_PATTERN = re.compile(r'\b[a-zA-Z]+\b')
+FORMS = ("", "s", "ed", "ing", "'s", "n't")
+
+
+def legacy_extract_words(text: str) -> list[str]:
+    """TextParser.extract_words до перехода на WordExtractor"""
+    words = LEGACY_PATTERN.findall(text)
+    filtered_words = [
+            word.lower() for word in words
+            if len(word) >= 2 and word.isalpha()
+            ]
+    return list(set(filtered_words))
+
+
+def generate_corpus(megabytes: float, vocabulary: int, seed: int = 1) -> str:
+    rng = random.Random(seed)
+    stems = [
+        "".join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(3, 9)))
+        for _ in range(vocabulary)
+    ]
+    weights = [1 / (rank + 1) for rank in range(vocabulary)]
+    parts = []
+    size = 0
+    target = int(megabytes * 1_000_000)
+    while size < target:
+        sentence = []
+        for stem in rng.choices(stems, weights, k=rng.randint(5, 20)):
+            word = stem + rng.choice(FORMS)
+            if rng.random() < 0.1:
+                word = word.capitalize()
+            if rng.random() < 0.02:
+                word = word + "-" + rng.choice(stems)
+            sentence.append(word)
+        line = " ".join(sentence) + rng.choice(".!?,;") + ("\n" if rng.random() < 0.2 else " ")
+        parts.append(line)
+        size += len(line)
+    return "".join(parts)
+
+
+def measure(name: str, func, text: str, tokens: int, repeat: int) -> None:
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func(text)
+        best = min(best, time.perf_counter() - started)
+    print(f"{name:>24} {tokens / best / 1e6:>12.2f} {best * 1000:>10.1f} {len(result):>10}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--files", nargs="*")
+    parser.add_argument("--megabytes", type=float, default=10.0)
+    parser.add_argument("--vocabulary", type=int, default=50000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    if args.files:
+        text = "".join(open(path, encoding="utf-8", errors="replace").read() for path in args.files)
+    else:
+        text = generate_corpus(args.megabytes, args.vocabulary)
+    tokens = len(LEGACY_PATTERN.findall(text))
+    print(f"корпус: {len(text) / 1e6:.1f} млн символов, {tokens} токенов")
+    print(f"{'вариант':>24} {'млн ток/с':>12} {'мс':>10} {'слов':>10}")
+
+    measure("legacy extract_words", legacy_extract_words, text, tokens, args.repeat)
+    measure("без лемм и стоп-слов", WordExtractor(stop_words=False).count, text, tokens, args.repeat)
+    measure("правила", WordExtractor(RuleLemmatizer()).count, text, tokens, args.repeat)
+    try:
+        measure("simplemma", WordExtractor(create_lemmatizer("simplemma")).count, text, tokens, args.repeat)
+    except RuntimeError:
+        print(f"{'simplemma':>24} {'не установлен':>12}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,28 @@
+import os
+import tempfile
+
+# Настройки читаются при импорте app, поэтому окружение задается до него
+_tmp = tempfile.mkdtemp(prefix="linguaparser-tests-")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{_tmp}/test.db")
+os.environ.setdefault("TRANSLATION_BACKEND", "local")
+os.environ.setdefault("LOCAL_DICTIONARY_PATH", f"{_tmp}/dictionary.sqlite")
+os.environ.setdefault("URL_CACHE_ENABLED", "false")
+os.environ.setdefault("DATABASE_ASYNC", "false")
+os.environ.setdefault("WORD_RANKS_PATH", f"{_tmp}/word_ranks.txt")
+os.environ.setdefault("TRANSLATION_CACHE_BACKEND", "memory")
+
+import pytest
+
+from app.core.database import Base, SessionLocal, engine
+import app.models  # noqa: F401
+
+
+@pytest.fixture
+def db():
+    Base.metadata.create_all(engine)
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+        Base.metadata.drop_all(engine)
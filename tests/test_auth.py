@@ -0,0 +1,46 @@
+import asyncio
+
+import httpx
+import pytest
+from fastapi import HTTPException
+
+from app.core import auth
+from app.core.auth import JWKSCache
+
+
+class FailingClient:
+    def __init__(self):
+        self.calls = 0
+
+    async def get(self, url):
+        self.calls += 1
+        raise httpx.ConnectError("keycloak down")
+
+
+def test_jwks_failure_is_not_refetched_on_every_request(monkeypatch):
+    client = FailingClient()
+    monkeypatch.setattr(auth, "get_http_client", lambda: client)
+    cache = JWKSCache("http://keycloak/certs", ttl=300, min_refresh_interval=60)
+
+    async def run():
+        for _ in range(5):
+            with pytest.raises(HTTPException):
+                await cache.get("unknown-kid")
+
+    asyncio.run(run())
+    assert client.calls == 1
+    assert cache.stats()["failures"] == 1
+
+
+def test_jwks_stale_keys_served_while_keycloak_is_down(monkeypatch):
+    client = FailingClient()
+    monkeypatch.setattr(auth, "get_http_client", lambda: client)
+    cache = JWKSCache("http://keycloak/certs", ttl=0, min_refresh_interval=60)
+    cache._jwks = {"keys": [{"kid": "old"}]}
+
+    async def run():
+        return [await cache.get("new") for _ in range(5)]
+
+    results = asyncio.run(run())
+    assert all(result == {"keys": [{"kid": "old"}]} for result in results)
+    assert client.calls == 1
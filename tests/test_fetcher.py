@@ -0,0 +1,84 @@
+import asyncio
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+import pytest
+
+from app.services.fetcher import Fetcher
+
+
+class Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        port = self.server.server_address[1]
+        if self.path == "/moved":
+            # Переход на другой хост того же сервера
+            self.send_response(302)
+            self.send_header("Location", f"http://127.0.0.1:{port}/page")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+        elif self.path == "/loop":
+            self.send_response(302)
+            self.send_header("Location", "/loop")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+        else:
+            body = b"<p>hello world</p>"
+            self.send_response(200)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture(scope="module")
+def server():
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://localhost:{httpd.server_address[1]}"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def test_sync_redirect_takes_slot_of_each_host(server):
+    fetcher = Fetcher(max_redirects=2, per_host_limit=1)
+    with fetcher.stream_sync(f"{server}/moved") as response:
+        hosts = set(fetcher._sync_host_slots)
+        body = b"".join(fetcher.iter_body(response, 1024))
+
+    assert hosts == {"127.0.0.1"}
+    assert body == b"<p>hello world</p>"
+    assert fetcher._sync_host_slots == {}
+    assert fetcher.dns._cache.get("localhost")
+
+
+def test_async_redirect_limit(server):
+    fetcher = Fetcher(max_redirects=2)
+
+    async def run():
+        try:
+            async with fetcher.stream(f"{server}/loop"):
+                pass
+        finally:
+            await fetcher.aclose()
+
+    with pytest.raises(httpx.TooManyRedirects):
+        asyncio.run(run())
+    assert fetcher._host_slots == {}
+
+
+def test_async_fetch_maps_connection_errors():
+    fetcher = Fetcher()
+
+    async def run():
+        try:
+            async with fetcher.stream("http://127.0.0.1:1/"):
+                pass
+        finally:
+            await fetcher.aclose()
+
+    with pytest.raises(httpx.ConnectError):
+        asyncio.run(run())
@@ -0,0 +1,57 @@
+from datetime import datetime, timedelta, timezone
+from threading import Barrier, Thread
+
+from app.core.database import SessionLocal
+from app.models.parse_job import ParseJob
+from app.services.jobs import ParseJobService
+
+USER = {"sub": "jobs-user", "username": "jobs-user"}
+
+
+def make_service() -> ParseJobService:
+    return ParseJobService(pipeline=None, workers=1)
+
+
+def test_same_url_returns_existing_job(db):
+    service = make_service()
+    job, created = service._create_job(db, USER, "http://example.com/")
+    again, created_again = service._create_job(db, USER, "http://example.com/")
+    assert created and not created_again
+    assert again.id == job.id
+
+
+def test_concurrent_submits_create_one_job(db):
+    service = make_service()
+    service._create_job(db, USER, "http://warmup/")
+    barrier = Barrier(4)
+    results = []
+
+    def submit():
+        session = SessionLocal()
+        try:
+            barrier.wait()
+            job, created = service._create_job(session, USER, "http://race.example/")
+            results.append((job.id, created))
+        finally:
+            session.close()
+
+    threads = [Thread(target=submit) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len({job_id for job_id, _ in results}) == 1
+    assert sum(created for _, created in results) == 1
+
+
+def test_stale_active_job_is_reaped(db):
+    service = make_service()
+    job, _ = service._create_job(db, USER, "http://stale.example/")
+    long_ago = datetime.now(timezone.utc) - timedelta(days=1)
+    db.query(ParseJob).filter(ParseJob.id == job.id).update({"updated_at": long_ago, "status": "running"})
+    db.commit()
+
+    assert service.get_job(db, USER, job.id)["status"] == "failed"
+    fresh, created = service._create_job(db, USER, "http://stale.example/")
+    assert created and fresh.id != job.id
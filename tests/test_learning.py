@@ -0,0 +1,84 @@
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import text
+
+from app.models.user import User
+from app.models.user_word import UserWord
+from app.models.word import Word
+from app.services.learning import LearningService
+
+NOW = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+
+def card(**fields) -> UserWord:
+    defaults = {"score": 0.0, "ease": 2.5, "repetitions": 0, "interval_days": 0.0}
+    return UserWord(**{**defaults, **fields})
+
+
+def test_sm2_intervals_grow_with_correct_answers():
+    service = LearningService()
+    user_word = card()
+    intervals = []
+    for _ in range(4):
+        service._schedule(user_word, service.know_quality, NOW)
+        intervals.append(user_word.interval_days)
+    assert intervals[:2] == [1.0, 6.0]
+    assert intervals[2] > intervals[1] and intervals[3] > intervals[2]
+    assert user_word.due_at == NOW + timedelta(days=intervals[-1])
+
+
+def test_sm2_lapse_resets_and_lowers_ease():
+    service = LearningService()
+    user_word = card(repetitions=3, interval_days=15.0)
+    service._schedule(user_word, service.dont_know_quality, NOW)
+    assert user_word.repetitions == 0
+    assert user_word.interval_days == 0.0
+    assert user_word.due_at == NOW + timedelta(minutes=service.relearn_minutes)
+    assert user_word.ease < 2.5
+
+
+def test_sm2_ease_has_floor():
+    service = LearningService()
+    user_word = card(ease=service.min_ease)
+    service._schedule(user_word, 0, NOW)
+    assert user_word.ease == service.min_ease
+
+
+def seed_user(db, learned: int, active: int) -> int:
+    user = User(kc_sub="learner", username="learner")
+    db.add(user)
+    db.flush()
+    long_ago = NOW - timedelta(days=365)
+    for index in range(learned + active):
+        word = Word(word=f"word{index}", translation=f"слово{index}")
+        db.add(word)
+        db.flush()
+        is_learned = index < learned
+        db.add(UserWord(
+            user_id=user.id,
+            word_id=word.id,
+            score=10.0 if is_learned else 1.0,
+            due_at=long_ago if is_learned else NOW,
+        ))
+    db.commit()
+    return user.id
+
+
+def test_study_session_skips_learned_words(db):
+    service = LearningService()
+    user_id = seed_user(db, learned=50, active=5)
+    cards = service.get_study_session(db, user_id)
+    active_ids = {
+        word_id for (word_id,) in
+        db.query(UserWord.word_id).filter(UserWord.user_id == user_id, UserWord.score < 7)
+    }
+    assert {card["id"] for card in cards} >= active_ids
+
+
+def test_study_window_uses_partial_index(db):
+    user_id = seed_user(db, learned=5, active=5)
+    plan = db.execute(text(
+        "EXPLAIN QUERY PLAN SELECT word_id FROM user_words "
+        "WHERE user_id = :user_id AND score < 7 ORDER BY due_at LIMIT 30"
+    ), {"user_id": user_id}).fetchall()
+    assert any("idx_user_words_user_due_active" in row[-1] for row in plan)
@@ -0,0 +1,16 @@
+from app.services.parser import HTMLWordStream, TextParser
+
+
+def test_words_split_between_chunks_are_joined():
+    parser = TextParser()
+    words = list(parser.iter_html_words(["<p>hello wo", "rld and gar", "den</p>"]))
+    assert words == ["hello", "world", "and", "garden"]
+
+
+def test_long_run_without_boundary_does_not_grow_carry():
+    parser = TextParser()
+    stream = HTMLWordStream(parser.extractor, "stdlib")
+    for _ in range(100):
+        stream.feed("a" * 10000)
+        assert len(stream._carry) <= stream.max_carry
+    stream.close()
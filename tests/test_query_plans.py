@@ -0,0 +1,31 @@
+from benchmarks.query_plans import reads_through_index, user_words_indexes
+
+INDEXES = user_words_indexes()
+
+
+def test_bitmap_heap_scan_over_expected_index_is_indexed():
+    plan = {
+        "Node Type": "Limit",
+        "Plans": [{
+            "Node Type": "Bitmap Heap Scan",
+            "Relation Name": "user_words",
+            "Plans": [{"Node Type": "Bitmap Index Scan", "Index Name": "uq_user_words_user_word"}],
+        }],
+    }
+    assert reads_through_index(plan, "user_words", INDEXES)
+
+
+def test_index_only_scan_is_indexed():
+    plan = {"Node Type": "Index Only Scan", "Relation Name": "user_words", "Index Name": "uq_user_words_user_word"}
+    assert reads_through_index(plan, "user_words", INDEXES)
+
+
+def test_seq_scan_and_foreign_index_are_not_indexed():
+    seq = {"Node Type": "Seq Scan", "Relation Name": "user_words"}
+    other = {
+        "Node Type": "Bitmap Heap Scan",
+        "Relation Name": "user_words",
+        "Plans": [{"Node Type": "Bitmap Index Scan", "Index Name": "words_pkey"}],
+    }
+    assert not reads_through_index(seq, "user_words", INDEXES)
+    assert not reads_through_index(other, "user_words", INDEXES)
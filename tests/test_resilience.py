@@ -0,0 +1,50 @@
+import time
+
+from app.core.resilience import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, backoff_delay
+
+
+def failing_breaker(**kwargs) -> CircuitBreaker:
+    breaker = CircuitBreaker("test", threshold=0.5, window=4, min_calls=4, **kwargs)
+    for success in (True, False, True, False):
+        breaker.record(success)
+    return breaker
+
+
+def test_breaker_opens_on_error_share():
+    breaker = failing_breaker(reset_timeout=60)
+
+    assert breaker.state == OPEN
+    assert not breaker.allow()
+
+
+def test_breaker_waits_for_min_calls():
+    breaker = CircuitBreaker("test", threshold=0.5, window=10, min_calls=4)
+    for _ in range(3):
+        breaker.record(False)
+
+    assert breaker.state == CLOSED
+
+
+def test_half_open_breaker_lets_one_probe_through():
+    breaker = failing_breaker(reset_timeout=0.01)
+    time.sleep(0.02)
+
+    assert breaker.state == HALF_OPEN
+    assert breaker.allow()
+    assert not breaker.allow()
+    breaker.record(True)
+    assert breaker.state == CLOSED
+
+
+def test_failed_probe_opens_breaker_again():
+    breaker = failing_breaker(reset_timeout=0.05)
+    time.sleep(0.06)
+
+    assert breaker.allow()
+    breaker.record(False)
+    assert breaker.state == OPEN
+    assert not breaker.allow()
+
+
+def test_backoff_delay_is_capped():
+    assert all(0 <= backoff_delay(attempt, 0.1, 0.5) <= 0.5 for attempt in range(10))
@@ -0,0 +1,88 @@
+import fcntl
+import os
+import time
+
+import pytest
+
+from app.core import shared_cache
+from app.core.shared_cache import LocalKV, MmapCache, RedisCache
+
+
+@pytest.fixture
+def cache_path(tmp_path):
+    return str(tmp_path / "translations.cache")
+
+
+def test_mmap_cache_is_shared_between_instances(cache_path):
+    writer = MmapCache(cache_path, slots=64)
+    reader = MmapCache(cache_path, slots=64)
+    try:
+        writer.set_many({"word": "слово", "cat": "кошка"})
+
+        assert reader.get_many(["word", "cat", "dog"]) == {"word": "слово", "cat": "кошка"}
+        reader.pop("cat")
+        assert writer.get("cat") is None
+    finally:
+        writer.close()
+        reader.close()
+
+
+def test_mmap_cache_expires_and_skips_oversized_values(cache_path):
+    cache = MmapCache(cache_path, slots=16, slot_size=64)
+    try:
+        cache.set("old", "старое", expires_at=time.monotonic() - 1)
+        cache.set("long", "x" * 100)
+
+        assert cache.get("old") is None
+        assert cache.get("long") is None
+        assert cache.stats()["skipped"] == 1
+    finally:
+        cache.close()
+
+
+def test_closed_cache_leaves_fork_hook(cache_path):
+    cache = MmapCache(cache_path, slots=16)
+    assert cache in shared_cache._live_caches
+
+    cache.close()
+    cache.close()
+
+    assert cache.closed
+    assert cache not in shared_cache._live_caches
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="нужен fork")
+def test_child_gets_own_file_lock_after_fork(cache_path):
+    cache = MmapCache(cache_path, slots=16)
+    closed = MmapCache(cache_path, slots=16)
+    closed.close()
+    fcntl.flock(cache._fd, fcntl.LOCK_EX)
+    try:
+        pid = os.fork()
+        if pid == 0:
+            code = 1
+            try:
+                # Со своим дескриптором ребенок не может взять занятую родителем блокировку
+                fcntl.flock(cache._fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                code = 0
+            os._exit(code)
+        _, status = os.waitpid(pid, 0)
+    finally:
+        fcntl.flock(cache._fd, fcntl.LOCK_UN)
+        cache.close()
+
+    assert os.waitstatus_to_exitcode(status) == 0
+
+
+class BrokenKV(LocalKV):
+    def scan_iter(self, match):
+        raise ConnectionError("нет соединения")
+
+
+def test_redis_cache_clear_survives_outage():
+    cache = RedisCache(client=BrokenKV())
+
+    cache.clear()
+
+    assert cache.stats()["errors"] == 1
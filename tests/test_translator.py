@@ -0,0 +1,128 @@
+import asyncio
+import threading
+import time
+from typing import Dict, List, Tuple
+
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from app.core.config import settings
+from app.core.database import async_database_url
+from app.core.resilience import CircuitBreaker
+from app.models.word import Word
+from app.services.translation_backends import GoogleBackend, TranslationBackend
+from app.services.translator import PendingWords, TranslationService
+
+
+class RecordingBackend(TranslationBackend):
+    name = "recording"
+
+    def __init__(self):
+        self.threads = []
+
+    def translate_batch(self, words: List[str]) -> Tuple[Dict[str, str], List[str]]:
+        self.threads.append(threading.get_ident())
+        return {word: f"{word}-ru" for word in words}, []
+
+
+def test_atranslate_words_keeps_backend_off_event_loop(db):
+    db.add(Word(word="known", translation="известное"))
+    db.commit()
+    backend = RecordingBackend()
+    service = TranslationService(backend)
+
+    async def run():
+        engine = create_async_engine(async_database_url(settings.database_url))
+        try:
+            async with AsyncSession(engine) as session:
+                translations = await service.atranslate_words(["Known", "fresh"], session)
+                return translations, threading.get_ident()
+        finally:
+            await engine.dispose()
+
+    translations, loop_thread = asyncio.run(run())
+
+    assert translations == {"Known": "известное", "fresh": "fresh-ru"}
+    assert backend.threads and loop_thread not in backend.threads
+    stored = db.query(Word).filter(Word.word == "fresh").one()
+    assert stored.translation == "fresh-ru"
+
+
+def test_pending_words_merge_users_and_drop_oldest():
+    pending = PendingWords(maxsize=2)
+    pending.add(["a"], [1])
+    pending.add(["b", "a"], [2, None])
+    pending.add(["c"])
+
+    assert pending.take(10) == {"a": ({1, 2}, 0), "c": (set(), 0)}
+    assert pending.stats()["dropped"] == 1
+
+
+def test_pending_words_give_up_after_max_attempts():
+    pending = PendingWords(maxsize=10, max_attempts=2)
+    pending.add(["word"], [1], attempts=1)
+    pending.add(["word"], [1], attempts=2)
+
+    assert len(pending) == 0
+    assert pending.stats()["given_up"] == 1
+
+
+class FlakyGoogle(GoogleBackend):
+    """GoogleBackend без сети: down — провайдер лежит, broken — слова, которые не переводятся"""
+
+    def __init__(self, breaker: CircuitBreaker):
+        super().__init__("en", "ru", workers=2, breaker=breaker, retries=0, backoff=0.0, negative_ttl=0.05)
+        self.down = False
+        self.broken = set()
+        self.requested = []
+
+    def _request(self, word):
+        self.requested.append(word)
+        if self.down or word in self.broken:
+            raise ConnectionError("нет ответа")
+        return f"{word}-ru"
+
+
+def test_negative_cached_word_does_not_stall_recovery(db):
+    backend = FlakyGoogle(CircuitBreaker("test_pending", min_calls=2, window=2, reset_timeout=0.01))
+    service = TranslationService(backend)
+    backend.failed.set("stuck", True)
+    service.pending.add(["stuck", "alpha", "beta"], [1])
+
+    by_user = service.retranslate_pending(db, limit=10)
+
+    assert sorted(by_user[1]) == ["alpha", "beta"]
+    assert "stuck" not in backend.requested
+    assert service.pending.take(10) == {"stuck": ({1}, 0)}
+
+
+def test_pending_words_recover_after_outage(db):
+    backend = FlakyGoogle(CircuitBreaker("test_outage", min_calls=2, window=2, reset_timeout=0.05))
+    service = TranslationService(backend)
+    backend.down = True
+
+    service.translate_words(["alpha", "beta", "gamma"], db, user_id=1)
+    assert not backend.available()
+    assert len(service.pending) == 3
+    assert service.retranslate_pending(db, limit=10) == {}
+
+    backend.down = False
+    time.sleep(0.06)
+    by_user = service.retranslate_pending(db, limit=10)
+
+    assert sorted(by_user[1]) == ["alpha", "beta", "gamma"]
+    assert len(service.pending) == 0
+
+
+def test_word_failing_on_its_own_is_given_up(db):
+    backend = FlakyGoogle(CircuitBreaker("test_broken", min_calls=100, window=100))
+    service = TranslationService(backend)
+    service.pending.max_attempts = 2
+    backend.broken.add("broken")
+    service.pending.add(["broken"], [1])
+
+    for _ in range(2):
+        time.sleep(0.06)
+        service.retranslate_pending(db, limit=10)
+
+    assert len(service.pending) == 0
+    assert service.pending.stats()["given_up"] == 1
@@ -0,0 +1,48 @@
+from app.models.user import User
+from app.models.user_word import UserWord
+from app.models.word import Word
+from app.services.vocabulary import get_words_page
+
+
+def seed(db, words, kc_sub="reader") -> int:
+    user = User(kc_sub=kc_sub, username=kc_sub)
+    db.add(user)
+    db.flush()
+    for text in words:
+        word = db.query(Word).filter(Word.word == text).first()
+        if word is None:
+            word = Word(word=text, translation=f"перевод {text}")
+            db.add(word)
+            db.flush()
+        db.add(UserWord(user_id=user.id, word_id=word.id, score=0.0))
+    db.commit()
+    return user.id
+
+
+def test_keyset_pages_cover_all_words_in_order(db):
+    words = [f"w{index:03d}" for index in range(25)]
+    user_id = seed(db, reversed(words))
+
+    seen = []
+    after = None
+    while True:
+        page = get_words_page(db, user_id, after=after, limit=10)
+        seen += [word["word"] for word in page["words"]]
+        after = page["next_after"]
+        if after is None:
+            break
+    assert seen == words
+
+
+def test_last_full_page_has_no_next_cursor(db):
+    user_id = seed(db, ["alpha", "beta"])
+    page = get_words_page(db, user_id, limit=2)
+    assert [word["word"] for word in page["words"]] == ["alpha", "beta"]
+    assert page["next_after"] is None
+
+
+def test_pages_are_scoped_to_user(db):
+    first = seed(db, ["apple", "pear"], kc_sub="first")
+    seed(db, ["plum"], kc_sub="second")
+    page = get_words_page(db, first)
+    assert [word["word"] for word in page["words"]] == ["apple", "pear"]
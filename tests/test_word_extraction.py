@@ -0,0 +1,51 @@
+import pytest
+
+from app.services.word_extraction import STOP_WORDS, RuleLemmatizer, WordExtractor
+from app.services.word_ranks import WordRanks
+
+
+@pytest.mark.parametrize("word, short", [("used", "us"), ("evening", "even"), ("hated", "hat"), ("hates", "hat")])
+def test_rules_do_not_cut_word_to_shorter_word(word, short):
+    lemmas = RuleLemmatizer().lemmatize([word, short])
+
+    assert lemmas[word] != short
+
+
+@pytest.mark.parametrize("word, lemma", [("used", "use"), ("hated", "hate"), ("stopped", "stop"), ("getting", "get")])
+def test_e_restoration_and_undoubling_come_first(word, lemma):
+    lemmas = RuleLemmatizer().lemmatize([word, lemma])
+
+    assert lemmas[word] == lemma
+
+
+def test_shared_stem_is_confirmed_by_forms():
+    lemmas = RuleLemmatizer().lemmatize(["walks", "walked", "walking"])
+
+    assert set(lemmas.values()) == {"walk"}
+
+
+def test_unconfirmed_word_stays_as_is():
+    assert RuleLemmatizer().lemmatize(["hoped"]) == {"hoped": "hoped"}
+
+
+def test_us_is_a_stop_word():
+    assert "us" in STOP_WORDS
+    assert "us" not in WordExtractor(RuleLemmatizer()).count("They told us it was used")
+
+
+RANKS = WordRanks({
+    "care": 400, "car": 500, "united": 600, "hope": 700, "walk": 1000,
+    "unit": 1200, "walked": 2000, "hoped": 3000, "caring": 5000, "hop": 8000,
+})
+
+
+@pytest.mark.parametrize("word, lemma", [("caring", "care"), ("united", "united"), ("hoped", "hope"), ("walked", "walk")])
+def test_rank_table_confirms_only_close_ranks(word, lemma):
+    assert RuleLemmatizer(RANKS).lemmatize([word]) == {word: lemma}
+
+
+def test_form_missing_from_rank_table_uses_known_lemma():
+    # WordRanks.build уже свел формы к леммам, так что walking в таблице нет
+    ranks = WordRanks({"walk": 1000})
+
+    assert RuleLemmatizer(ranks).lemmatize(["walking"]) == {"walking": "walk"}
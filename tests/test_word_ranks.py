@@ -0,0 +1,18 @@
+from app.services.word_ranks import WordRanks
+
+
+def test_without_rank_table_nothing_is_skipped():
+    selected, skipped = WordRanks().prioritize(["alpha", "beta"], skip_top=5000)
+
+    assert selected == ["alpha", "beta"]
+    assert skipped == 0
+
+
+def test_prioritize_skips_top_orders_by_rank_and_caps():
+    ranks = WordRanks({"the": 1, "house": 300, "garden": 900})
+    words = ["garden", "zyzzyva", "the", "house"]
+
+    selected, skipped = ranks.prioritize(words, skip_top=100, limit=2)
+
+    assert skipped == 1
+    assert selected == ["house", "garden"]